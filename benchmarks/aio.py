@@ -0,0 +1,150 @@
+from __future__ import print_function, unicode_literals
+
+"""Measure the event loop latency of a stand-in annotation server while it
+handles concurrent large documents, with blocking calls and with
+pynaf.aio.NAFExecutor.
+
+The server reads a length prefixed document, loads it, adds a term per
+word and sends back the serialization. A probe task in the server loop
+sleeps for a millisecond repeatedly and records how late it wakes up.
+
+The benchmark needs Python 3 and pynaf importable, so from a checkout run
+PYTHONPATH=. python3 benchmarks/aio.py
+It prints the documents served per second and the 99th percentile and
+maximum probe lag for each mode.
+"""
+
+import asyncio
+import struct
+import time
+
+from pynaf import NAFDocument
+from pynaf.aio import NAFExecutor
+
+WORDS = 20000
+CLIENTS = 8
+REQUESTS = 4
+PROBE = 0.001
+HEADER = struct.Struct("!Q")
+
+
+def make_document():
+    """ Return the serialization of a document of WORDS words."""
+    document = NAFDocument(language="en")
+    document.add_words(
+        ["token"] * WORDS, ["w{0}".format(index) for index in range(WORDS)])
+    return document.to_string()
+
+
+def annotate(document):
+    """ The blocking annotation made by the server."""
+    words = [word.get("id") for word in document.get_words()]
+    document.add_terms(
+        ["t{0}".format(index) for index in range(len(words))],
+        pos=["N"] * len(words), words=[[wid] for wid in words])
+
+
+async def read_message(reader):
+    size, = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return await reader.readexactly(size)
+
+
+def write_message(writer, data):
+    writer.write(HEADER.pack(len(data)))
+    writer.write(data)
+
+
+def make_handler(executor):
+    """ Return a connection handler, blocking if executor is None."""
+    async def handle(reader, writer):
+        try:
+            while True:
+                try:
+                    data = await read_message(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                if executor is None:
+                    document = NAFDocument(input_stream=data)
+                    annotate(document)
+                    result = document.to_string()
+                else:
+                    document = await executor.load(data)
+                    await executor.run(annotate, document)
+                    result = await executor.serialize(document)
+                write_message(writer, result)
+                await writer.drain()
+        finally:
+            writer.close()
+    return handle
+
+
+async def probe(lags, stop):
+    """ Record how late a short sleep wakes up until stop is set."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE)
+        lags.append(time.perf_counter() - start - PROBE)
+
+
+def run_clients(port, data):
+    """ Send the requests from a thread with its own event loop."""
+    async def client():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for _ in range(REQUESTS):
+            write_message(writer, data)
+            await writer.drain()
+            await read_message(reader)
+        writer.close()
+
+    async def clients():
+        await asyncio.gather(*[client() for _ in range(CLIENTS)])
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(clients())
+    finally:
+        loop.close()
+
+
+async def measure(executor, data):
+    """ Serve the clients and return (elapsed seconds, lags)."""
+    server = await asyncio.start_server(
+        make_handler(executor), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    lags = []
+    stop = asyncio.Event()
+    prober = asyncio.ensure_future(probe(lags, stop))
+    start = time.perf_counter()
+    await asyncio.get_running_loop().run_in_executor(
+        None, run_clients, port, data)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await prober
+    server.close()
+    await server.wait_closed()
+    return elapsed, sorted(lags)
+
+
+def main():
+    data = make_document()
+    print("{0} clients x {1} requests of {2} words ({3} bytes)".format(
+        CLIENTS, REQUESTS, WORDS, len(data)))
+    print("{0:>10} {1:>10} {2:>12} {3:>12}".format(
+        "mode", "docs/s", "p99 lag ms", "max lag ms"))
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        for mode, executor in (("blocking", None),
+                               ("executor", NAFExecutor(4))):
+            elapsed, lags = loop.run_until_complete(measure(executor, data))
+            if executor is not None:
+                executor.close()
+            print("{0:>10} {1:>10.1f} {2:>12.1f} {3:>12.1f}".format(
+                mode, CLIENTS * REQUESTS / elapsed,
+                lags[int(len(lags) * 0.99)] * 1000, lags[-1] * 1000))
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from __future__ import print_function, unicode_literals
+
+"""Compare adding the entities and coreference layers to a document by
+loading and writing it again against splicing them with LayerAppender.
+
+From a checkout, with the repository on the path:
+PYTHONPATH=. python benchmarks/append.py
+For each document size it prints the size of the file and the seconds of
+a full rewrite and of a splice.
+"""
+
+import timeit
+
+from pynaf import NAFDocument
+from pynaf.append import LayerAppender
+from generator import build, generate
+
+SIZES = (10000, 100000)
+REPEAT = 3
+
+
+def prepare(size):
+    """ Return a serialized document without entities and coreferences and
+    the function that adds them."""
+    content = generate(size)
+    entities = content["entities"]
+    coreferences = content["coreferences"]
+    content["entities"] = []
+    content["coreferences"] = []
+
+    def add(document):
+        document.add_linguistic_processors(
+            "entities", "ner", "1.0", "2000-01-01T00:00:00Z",
+            "2000-01-01T00:00:00Z", "localhost")
+        for entity in entities:
+            document.add_entity(*entity)
+        for coreference in coreferences:
+            document.add_coreference(*coreference)
+    return build(content).to_string(), add
+
+
+def rewrite(data, add):
+    document = NAFDocument(input_stream=data)
+    add(document)
+    return document.to_string()
+
+
+def append(data, add):
+    appender = LayerAppender(data)
+    add(appender.document)
+    return appender.to_string()
+
+
+def main():
+    print("{0:>8} {1:>12} {2:>12} {3:>12}".format(
+        "words", "bytes", "rewrite", "append"))
+    for size in SIZES:
+        data, add = prepare(size)
+        results = [min(timeit.repeat(
+            lambda: function(data, add), number=1, repeat=REPEAT))
+            for function in (rewrite, append)]
+        print("{0:>8} {1:>12} {2:>12.4f} {3:>12.4f}".format(
+            size, len(data), *results))
+
+
+if __name__ == "__main__":
+    main()
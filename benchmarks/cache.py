@@ -0,0 +1,66 @@
+from __future__ import print_function, unicode_literals
+
+"""Compare cold and warm loads of NAF files through the sidecar cache.
+
+The sidecars are written to a temporary directory that is removed at the
+end. The cache is built with min_size=0 so every size uses a sidecar; the
+sizes where warm beats no cache show where to set min_size. From a
+checkout: PYTHONPATH=. python benchmarks/cache.py
+"""
+
+import os
+import shutil
+import tempfile
+import timeit
+
+from pynaf import NAFDocument
+from pynaf.cache import DocumentCache
+
+SIZES = (1000, 10000, 100000)
+REPEAT = 5
+
+
+def build_document(size):
+    """ Build a document with size words, terms and dependencies."""
+    document = NAFDocument(language="en")
+    wids = ["w{0}".format(index) for index in range(size)]
+    tids = ["t{0}".format(index) for index in range(size)]
+    document.add_words(
+        ["token"] * size, wids,
+        sent=[str(index // 20) for index in range(size)],
+        offset=[str(index * 6) for index in range(size)])
+    document.add_terms(tids, pos=["N"] * size, lemma=["token"] * size,
+                       words=[[wid] for wid in wids])
+    document.add_dependencies(tids[:-1], tids[1:], ["mod"] * (size - 1))
+    return document
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        print("{0:>8} {1:>12} {2:>12} {3:>12}".format(
+            "words", "no cache", "cold", "warm"))
+        for size in SIZES:
+            file_name = os.path.join(directory, "{0}.naf".format(size))
+            with open(file_name, "wb") as output:
+                build_document(size).write(output, "utf-8")
+            cache = DocumentCache(
+                os.path.join(directory, "cache"), min_size=0)
+            uncached = min(timeit.repeat(
+                lambda: NAFDocument(file_name=file_name),
+                number=1, repeat=REPEAT))
+            cold = min(timeit.repeat(
+                lambda: cache.clear() or NAFDocument(
+                    file_name=file_name, cache=cache),
+                number=1, repeat=REPEAT))
+            warm = min(timeit.repeat(
+                lambda: NAFDocument(file_name=file_name, cache=cache),
+                number=1, repeat=REPEAT))
+            print("{0:>8} {1:>12.4f} {2:>12.4f} {3:>12.4f}".format(
+                size, uncached, cold, warm))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
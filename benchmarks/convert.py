@@ -0,0 +1,75 @@
+from __future__ import print_function, unicode_literals
+
+"""Compare the time and peak memory of converting a NAF document to KAF by
+loading the whole tree against the streaming converter.
+
+Each conversion runs in its own process, so the growth of the peak
+resident memory is its own; it needs the resource module of Unix. From a
+checkout: PYTHONPATH=. python benchmarks/convert.py
+"""
+
+import os
+import resource
+import shutil
+import tempfile
+import time
+from multiprocessing import Process, Queue
+
+from lxml import etree
+
+from pynaf import KAFDocument, NAFDocument
+from pynaf.convert import Converter
+from generator import build, generate
+
+SIZES = (10000, 100000)
+
+
+def load_whole(path, output_path):
+    document = NAFDocument(file_name=path)
+    Converter(NAFDocument, KAFDocument).rename(document.root)
+    with open(output_path, "wb") as output:
+        output.write(etree.tostring(
+            document.root, encoding="utf-8", pretty_print=True))
+
+
+def stream(path, output_path):
+    with open(output_path, "wb") as output:
+        Converter(NAFDocument, KAFDocument).convert(path, output)
+
+
+def measure(function, path, output_path, results):
+    """ Run a conversion and report its time and the growth of the peak
+    resident memory of the process."""
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    function(path, output_path)
+    elapsed = time.time() - start
+    results.put((elapsed, resource.getrusage(
+        resource.RUSAGE_SELF).ru_maxrss - before))
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        print("{0:>8} {1:>10} {2:>10} {3:>12}".format(
+            "words", "mode", "seconds", "peak KB"))
+        for size in SIZES:
+            path = os.path.join(directory, "{0}.naf".format(size))
+            with open(path, "wb") as output:
+                output.write(build(generate(size)).to_string())
+            for name, function in (("whole", load_whole),
+                                   ("streaming", stream)):
+                results = Queue()
+                process = Process(target=measure, args=(
+                    function, path, path + ".kaf", results))
+                process.start()
+                elapsed, memory = results.get()
+                process.join()
+                print("{0:>8} {1:>10} {2:>10.2f} {3:>12}".format(
+                    size, name, elapsed, memory))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
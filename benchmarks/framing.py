@@ -0,0 +1,60 @@
+from __future__ import print_function, unicode_literals
+
+"""Compare starting a process for each document against a persistent
+worker fed with a framed stream.
+
+The workers are new Python processes that import pynaf, so PYTHONPATH
+must name the checkout for them too:
+PYTHONPATH=. python benchmarks/framing.py
+"""
+
+import subprocess
+import sys
+import time
+
+from pynaf import NAFDocument
+from pynaf.framing import DOCUMENT, Frame, run_pipeline, worker_command
+
+DOCUMENTS = 50
+WORDS = 200
+# Any importable function of a document will do, the stages only load
+# the document and write it back
+FUNCTION = "operator:truth"
+SCRIPT = ("import sys; from pynaf import NAFDocument; "
+          "stdin = getattr(sys.stdin, 'buffer', sys.stdin); "
+          "stdout = getattr(sys.stdout, 'buffer', sys.stdout); "
+          "document = NAFDocument(input_stream=stdin.read()); "
+          "stdout.write(document.to_string(pretty_print=False))")
+
+
+def make_document():
+    document = NAFDocument(language="en")
+    document.add_words(
+        ["token"] * WORDS, ["w{0}".format(index) for index in range(WORDS)])
+    return document.to_string()
+
+
+def main():
+    data = make_document()
+    start = time.time()
+    for _ in range(DOCUMENTS):
+        process = subprocess.Popen(
+            [sys.executable, "-c", SCRIPT],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        process.communicate(data)
+    per_process = time.time() - start
+
+    start = time.time()
+    frames = (Frame(DOCUMENT, str(index), data) for index in range(DOCUMENTS))
+    for _ in run_pipeline([worker_command(FUNCTION)], frames):
+        pass
+    persistent = time.time() - start
+    print("{0} documents of {1} words".format(DOCUMENTS, WORDS))
+    print("{0:>20} {1:>10.1f} docs/s".format(
+        "process per document", DOCUMENTS / per_process))
+    print("{0:>20} {1:>10.1f} docs/s".format(
+        "persistent worker", DOCUMENTS / persistent))
+
+
+if __name__ == "__main__":
+    main()
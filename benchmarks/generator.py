@@ -0,0 +1,207 @@
+from __future__ import print_function, unicode_literals
+
+"""Generate synthetic NAF or KAF documents of a given size.
+
+The documents have raw text, words with offsets and sentences, terms,
+dependency trees, chunks, named entities, coreference chains and a
+constituency tree per sentence, with the proportions of a typical
+newswire document. Generation is deterministic for a given seed.
+
+The benchmarks and the tests import build and generate from this module.
+To write a file from a checkout:
+PYTHONPATH=. python benchmarks/generator.py --tokens 10000 -o document.naf
+"""
+
+import argparse
+import random
+
+from pynaf import KAFDocument, NAFDocument
+
+VOCABULARY = (
+    ("DT", "O", ("the", "a", "this", "every")),
+    ("JJ", "G", ("large", "new", "old", "local", "public", "final")),
+    ("NN", "N", ("report", "company", "market", "city", "week", "plan",
+                 "government", "price", "team", "study")),
+    ("NNP", "R", ("Smith", "Berlin", "Acme", "Garcia", "Toronto", "Nile")),
+    ("VBD", "V", ("said", "reported", "announced", "opened", "rejected")),
+    ("IN", "P", ("in", "of", "for", "with", "after")),
+    ("RB", "A", ("also", "later", "again", "quickly")),
+)
+# Part of speech sequences the sentences are made of
+PHRASES = (
+    ("NP", (0, 1, 2)), ("NP", (0, 2)), ("NP", (3,)), ("NP", (3, 3)),
+    ("VP", (4,)), ("VP", (6, 4)), ("PP", (5, 0, 2)), ("PP", (5, 3)),
+)
+ENTITY_TYPES = ("PERSON", "LOCATION", "ORGANIZATION")
+FUNCTIONS = ("nsubj", "dobj", "prep", "pobj", "amod", "det", "advmod")
+
+
+def generate(tokens=1000, seed=0, sentence_phrases=(2, 8),
+             coreference_ratio=0.5):
+    """ Return the content of a synthetic document as a dict of layers,
+    ready to be given to build.
+
+    :param tokens: The approximate number of words; the last sentence is
+    completed, so the result may have a few more.
+    :param seed: The seed of the random generator.
+    :param sentence_phrases: The minimum and maximum number of phrases of a
+    sentence.
+    :param coreference_ratio: The proportion of entities that are mentions
+    of a coreference chain.
+    """
+    rng = random.Random(seed)
+    content = {
+        "raw": None, "words": [], "terms": [], "dependencies": [],
+        "chunks": [], "entities": [], "coreferences": [], "trees": []}
+    words = content["words"]
+    terms = content["terms"]
+    text = []
+    offset = 0
+    node = 0
+    mentions = []
+    sentence = 0
+    while len(words) < tokens:
+        sentence += 1
+        phrases = [PHRASES[rng.randrange(len(PHRASES))]
+                   for _ in range(rng.randint(*sentence_phrases))]
+        non_terminals = [("nter{0}".format(node), "S")]
+        terminals = []
+        edges = []
+        root = non_terminals[0][0]
+        node += 1
+        sentence_terms = []
+        for phrase, pattern in phrases:
+            phrase_terms = []
+            for category in pattern:
+                pos, term_type, forms = VOCABULARY[category]
+                form = forms[rng.randrange(len(forms))]
+                index = len(words) + 1
+                wid = "w{0}".format(index)
+                tid = "t{0}".format(index)
+                words.append((form, wid, {
+                    "sent": str(sentence), "para": "1",
+                    "offset": str(offset), "length": str(len(form))}))
+                terms.append((tid, term_type, form.lower(), pos, [wid]))
+                text.append(form)
+                offset += len(form) + 1
+                phrase_terms.append(tid)
+            sentence_terms.append((phrase, phrase_terms))
+            head = phrase_terms[-1] if phrase != "PP" else phrase_terms[0]
+            content["chunks"].append((
+                "c{0}".format(len(content["chunks"]) + 1), head, phrase,
+                phrase_terms))
+            if phrase == "NP" and pattern[-1] == 3:
+                eid = "e{0}".format(len(content["entities"]) + 1)
+                content["entities"].append((
+                    eid, ENTITY_TYPES[rng.randrange(len(ENTITY_TYPES))],
+                    [phrase_terms]))
+                if rng.random() < coreference_ratio:
+                    mentions.append(phrase_terms)
+
+            phrase_node = "nter{0}".format(node)
+            node += 1
+            non_terminals.append((phrase_node, phrase))
+            edges.append(
+                (phrase_node, root, "yes" if phrase == "VP" else None))
+            for tid in phrase_terms:
+                terminal = "ter{0}".format(node)
+                node += 1
+                terminals.append((terminal, [tid]))
+                edges.append((terminal, phrase_node,
+                              "yes" if tid == head else None))
+
+        # Dependencies: the verb, or the first phrase, heads the sentence,
+        # phrase heads depend on it and the rest of terms on their phrase
+        # head.
+        heads = [(phrase, phrase_terms[-1] if phrase != "PP" else
+                  phrase_terms[0]) for phrase, phrase_terms in sentence_terms]
+        root_term = next(
+            (tid for phrase, tid in heads if phrase == "VP"), heads[0][1])
+        for phrase, phrase_terms in sentence_terms:
+            head = phrase_terms[-1] if phrase != "PP" else phrase_terms[0]
+            if head != root_term:
+                content["dependencies"].append((
+                    root_term, head,
+                    FUNCTIONS[rng.randrange(len(FUNCTIONS))]))
+            for tid in phrase_terms:
+                if tid != head:
+                    content["dependencies"].append((
+                        head, tid, FUNCTIONS[rng.randrange(len(FUNCTIONS))]))
+        content["trees"].append((
+            non_terminals, terminals,
+            [("tre{0}".format(index + 1), source, target, head)
+             if head else ("tre{0}".format(index + 1), source, target)
+             for index, (source, target, head) in enumerate(edges)]))
+        text[-1] += "."
+        offset += 1
+
+    rng.shuffle(mentions)
+    while len(mentions) > 1:
+        size = min(len(mentions), rng.randint(2, 4))
+        chain, mentions = mentions[:size], mentions[size:]
+        chain.sort(key=lambda mention: int(mention[0][1:]))
+        content["coreferences"].append((
+            "co{0}".format(len(content["coreferences"]) + 1), chain))
+    content["coreferences"].sort(key=lambda chain: int(chain[1][0][0][1:]))
+    content["raw"] = " ".join(text)
+    return content
+
+
+def build(content, document_class=NAFDocument):
+    """ Build a document with the content given by generate.
+
+    :param content: The dict of layers given by generate.
+    :param document_class: NAFDocument or KAFDocument.
+    """
+    document = document_class(language="en")
+    document.add_linguistic_processors(
+        "text", "pynaf-generator", "1.0", "2000-01-01T00:00:00Z",
+        "2000-01-01T00:00:00Z", "localhost")
+    document.add_raw_text(content["raw"])
+    words = content["words"]
+    document.add_words(
+        [form for form, _, _ in words], [wid for _, wid, _ in words],
+        **dict((name, [attributes[name] for _, _, attributes in words])
+               for name in ("sent", "para", "offset", "length")))
+    terms = content["terms"]
+    document.add_terms(
+        [term[0] for term in terms], term_type=[term[1] for term in terms],
+        lemma=[term[2] for term in terms],
+        pos=[term[3] for term in terms],
+        words=[term[4] for term in terms])
+    dependencies = content["dependencies"]
+    document.add_dependencies(
+        [origen for origen, _, _ in dependencies],
+        [to for _, to, _ in dependencies],
+        [rfunc for _, _, rfunc in dependencies])
+    for cid, head, phrase, chunk_terms in content["chunks"]:
+        document.add_chunk(cid, head, phrase, terms=chunk_terms)
+    for eid, entity_type, references in content["entities"]:
+        document.add_entity(eid, entity_type, references)
+    for coid, references in content["coreferences"]:
+        document.add_coreference(coid, references)
+    for non_terminals, terminals, edges in content["trees"]:
+        document.add_constituency_tree(non_terminals, terminals, edges)
+    return document
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic NAF or KAF document.")
+    parser.add_argument("--tokens", type=int, default=1000,
+                        help="Approximate number of words.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kaf", action="store_true",
+                        help="Write KAF instead of NAF.")
+    parser.add_argument("-o", "--output", required=True,
+                        help="The file to write.")
+    arguments = parser.parse_args(argv)
+    document = build(
+        generate(arguments.tokens, arguments.seed),
+        KAFDocument if arguments.kaf else NAFDocument)
+    with open(arguments.output, "wb") as output:
+        document.write(output, document.encoding)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+from __future__ import print_function, unicode_literals
+
+"""Measure the time of the integrity check for documents of growing size,
+to show it grows linearly, and compare it with the parse of the document.
+
+The last column, the check time per word, stays flat when the check is
+linear. From a checkout: PYTHONPATH=. python benchmarks/integrity.py
+"""
+
+import timeit
+
+from pynaf import NAFDocument
+from generator import build, generate
+
+SIZES = (1000, 10000, 100000)
+REPEAT = 5
+
+
+def main():
+    print("{0:>8} {1:>12} {2:>12} {3:>14}".format(
+        "words", "parse ms", "check ms", "check us/word"))
+    for size in SIZES:
+        data = build(generate(size)).to_string()
+        parse = min(timeit.repeat(
+            lambda: NAFDocument(input_stream=data), number=1, repeat=REPEAT))
+        document = NAFDocument(input_stream=data)
+        assert not document.check_integrity()
+        check = min(timeit.repeat(
+            document.check_integrity, number=1, repeat=REPEAT))
+        print("{0:>8} {1:>12.1f} {2:>12.1f} {3:>14.2f}".format(
+            size, parse * 1000, check * 1000, check * 1e6 / size))
+
+
+if __name__ == "__main__":
+    main()
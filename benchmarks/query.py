@@ -0,0 +1,68 @@
+from __future__ import print_function, unicode_literals
+
+"""Compare a rule based extractor that filters the terms and entities of a
+document many times by scanning the layers against the same filters
+answered by find_terms and find_entities.
+
+Each query time includes building the attribute indexes of a freshly
+parsed document. From a checkout: PYTHONPATH=. python benchmarks/query.py
+"""
+
+import timeit
+
+from pynaf import NAFDocument
+from generator import build, generate
+
+SIZES = (1000, 10000, 50000)
+REPEAT = 3
+# Filters run on each document, as the rules of an extractor would
+RULES = 10
+
+
+def scan(document):
+    pos = document.POS_ATTRIBUTE
+    lemma = document.LEMMA_ATTRIBUTE
+    entity_type = document.NAMED_ENTITY_TYPE_ATTRIBUTE
+    found = 0
+    for _ in range(RULES):
+        found += len([term for term in document.get_terms()
+                      if term.get(pos) == "NNP"])
+        found += len([term for term in document.get_terms()
+                      if term.get(pos) == "DT" and term.get(lemma) == "the"])
+        found += len([term for term in document.get_terms()
+                      if term.get(pos) in ("NN", "NNS")])
+        found += len([entity for entity in document.get_entities()
+                      if entity.get(entity_type) == "ORGANIZATION"])
+    return found
+
+
+def query(document):
+    found = 0
+    for _ in range(RULES):
+        found += len(document.find_terms(pos="NNP"))
+        found += len(document.find_terms(pos="DT", lemma="the"))
+        found += len(document.find_terms(pos=("NN", "NNS")))
+        found += len(document.find_entities("ORGANIZATION"))
+    return found
+
+
+def main():
+    print("{0:>8} {1:>10} {2:>10}".format("words", "scan ms", "query ms"))
+    for size in SIZES:
+        data = build(generate(size)).to_string()
+        times = []
+        for function in (scan, query):
+            # A fresh document each time, so the query time includes
+            # building the indexes
+            documents = [NAFDocument(input_stream=data)
+                         for _ in range(REPEAT)]
+            times.append(min(
+                timeit.timeit(lambda: function(document), number=1)
+                for document in documents))
+        assert scan(documents[0]) == query(documents[0])
+        print("{0:>8} {1:>10.1f} {2:>10.1f}".format(
+            size, times[0] * 1000, times[1] * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# coding: utf-8
+from __future__ import print_function, unicode_literals
+
+"""Compare extracting the text of some words through get_raw_text against
+a memory mapped raw text view.
+
+The documents are written to a temporary file so they can be mapped.
+From a checkout: PYTHONPATH=. python benchmarks/rawtext.py
+"""
+
+import os
+import tempfile
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from pynaf import NAFDocument
+
+SIZES = (100000, 1000000)
+WORDS = 1000
+REPEAT = 3
+
+
+def write_document(path, size):
+    """ Write a document with size words of non ASCII raw text."""
+    forms = ["niño", "café", "año", "señal"]
+    words = [forms[index % len(forms)] for index in range(size)]
+    offsets = []
+    offset = 0
+    for word in words:
+        offsets.append(str(offset))
+        offset += len(word) + 1
+    document = NAFDocument(language="es")
+    document.add_raw_text(" ".join(words))
+    document.add_words(
+        words, ["w{0}".format(index) for index in range(size)],
+        offset=offsets, length=[str(len(word)) for word in words])
+    with open(path, "wb") as output:
+        document.write(output, "utf-8")
+
+
+def with_string(document, words):
+    raw_text = document.get_raw_text()
+    for word in words:
+        offset = int(word.get("offset"))
+        raw_text[offset:offset + int(word.get("length"))]
+
+
+def with_view(document, words):
+    raw_text = document.get_raw_text_view()
+    for word in words:
+        raw_text.word(word)
+
+
+def peak_memory(function):
+    """ Return the peak of Python allocations made by function, in bytes,
+    or None if tracemalloc is not available."""
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "document.naf")
+    print("Seconds and peak bytes allocated to extract {0} words after "
+          "loading".format(WORDS))
+    print("{0:>8} {1:>12} {2:>12} {3:>12} {4:>12}".format(
+        "words", "string", "view", "string mem", "view mem"))
+    try:
+        for size in SIZES:
+            write_document(path, size)
+            document = NAFDocument(file_name=path, memory_map=True)
+            words = document.get_words()
+            words = words[::max(1, len(words) // WORDS)]
+            times = []
+            memory = []
+            for function in (with_string, with_view):
+                def run():
+                    # Include building the view and its index
+                    document._raw_view = None
+                    function(document, words)
+                times.append(min(timeit.repeat(
+                    run, number=1, repeat=REPEAT)))
+                memory.append(peak_memory(run))
+            print("{0:>8} {1:>12.4f} {2:>12.4f} {3:>12} {4:>12}".format(
+                size, times[0], times[1], memory[0], memory[1]))
+    finally:
+        os.remove(path)
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+from __future__ import print_function, unicode_literals
+
+"""Compare the serialization of NAF documents with the previous recursive
+indentation against the lxml pretty print and compact modes.
+
+Times are the best of REPEAT runs on the same document. From a checkout:
+PYTHONPATH=. python benchmarks/serialization.py
+"""
+
+import timeit
+
+from lxml import etree
+
+from pynaf import NAFDocument, _indent_element
+
+SIZES = (1000, 10000, 100000)
+REPEAT = 5
+
+
+def build_document(size):
+    """ Build a document with size words, terms and dependencies."""
+    document = NAFDocument(language="en")
+    for index in range(size):
+        wid = "w{0}".format(index)
+        tid = "t{0}".format(index)
+        document.add_word("token", wid, sent=str(index // 20),
+                          offset=str(index * 6), length="5")
+        document.add_term(tid, pos="N", lemma="token", words=[wid])
+        if index:
+            document.add_dependency("t{0}".format(index - 1), tid, "mod")
+    return document
+
+
+def indent_and_serialize(document):
+    """ The serialization used before, that indents the live tree."""
+    _indent_element(document.root, 0)
+    return etree.tostring(document.root, encoding=document.encoding)
+
+
+def main():
+    print("{0:>8} {1:>12} {2:>12} {3:>12}".format(
+        "words", "indent", "pretty", "compact"))
+    for size in SIZES:
+        results = []
+        for function in (
+                lambda: indent_and_serialize(document),
+                lambda: document.to_string(),
+                lambda: document.to_string(pretty_print=False)):
+            document = build_document(size)
+            results.append(min(timeit.repeat(
+                function, number=1, repeat=REPEAT)))
+        print("{0:>8} {1:>12.4f} {2:>12.4f} {3:>12.4f}".format(
+            size, *results))
+
+
+if __name__ == "__main__":
+    main()
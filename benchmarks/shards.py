@@ -0,0 +1,38 @@
+from __future__ import print_function, unicode_literals
+
+"""Measure splitting a document into shards of sentences and merging them
+back, for documents of growing size, to show both grow linearly.
+
+Shards hold SENTENCES sentences each. From a checkout:
+PYTHONPATH=. python benchmarks/shards.py
+"""
+
+import timeit
+
+from pynaf import NAFDocument
+from pynaf.shards import merge_shards, split_document
+from generator import build, generate
+
+SIZES = (10000, 100000)
+SENTENCES = 50
+REPEAT = 3
+
+
+def main():
+    print("{0:>8} {1:>8} {2:>10} {3:>10} {4:>14}".format(
+        "words", "shards", "split ms", "merge ms", "merge us/word"))
+    for size in SIZES:
+        document = NAFDocument(input_stream=build(generate(size)).to_string())
+        shards = split_document(document, SENTENCES)
+        split = min(timeit.repeat(
+            lambda: split_document(document, SENTENCES), number=1,
+            repeat=REPEAT))
+        merge = min(timeit.repeat(
+            lambda: merge_shards(shards), number=1, repeat=REPEAT))
+        print("{0:>8} {1:>8} {2:>10.1f} {3:>10.1f} {4:>14.2f}".format(
+            size, len(shards), split * 1000, merge * 1000,
+            merge * 1e6 / size))
+
+
+if __name__ == "__main__":
+    main()
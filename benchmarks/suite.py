@@ -0,0 +1,275 @@
+from __future__ import print_function, unicode_literals
+
+"""Time parsing, every add_* method, every get_* lookup and serialization
+of synthetic documents at several sizes and write the results as JSON.
+
+Each result is the best of REPEAT runs of an operation over the whole
+document: for add_word, for example, the time to add all the words one by
+one to an empty document. Results of different commits can be compared by
+their "format", "size" and "operation" keys.
+
+To write the results of the current checkout:
+PYTHONPATH=. python benchmarks/suite.py --sizes 1000 10000 -o results.json
+"""
+
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+from timeit import default_timer
+
+from lxml import etree
+
+from pynaf import KAFDocument, NAFDocument, _indent_element
+from generator import build, generate
+
+SIZES = (1000, 10000, 100000)
+REPEAT = 3
+
+
+def best_time(function, setup=None, repeat=REPEAT):
+    """ Return the best time of repeat calls to function, each one given
+    the result of a new call to setup, if any."""
+    best = None
+    for _ in range(repeat):
+        if setup is None:
+            start = default_timer()
+            function()
+        else:
+            argument = setup()
+            start = default_timer()
+            function(argument)
+        elapsed = default_timer() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def add_operations(content):
+    """ Return (name, calls, function of an empty document) for each add_*
+    method."""
+    words = content["words"]
+    terms = content["terms"]
+    dependencies = content["dependencies"]
+
+    def add_word(document):
+        for form, wid, attributes in words:
+            document.add_word(form, wid, **attributes)
+
+    def add_words(document):
+        document.add_words(
+            [form for form, _, _ in words], [wid for _, wid, _ in words],
+            **dict((name, [attributes[name] for _, _, attributes in words])
+                   for name in ("sent", "para", "offset", "length")))
+
+    def add_term(document):
+        for tid, term_type, lemma, pos, term_words in terms:
+            document.add_term(tid, pos, lemma, term_type=term_type,
+                              words=term_words)
+
+    def add_terms(document):
+        document.add_terms(
+            [term[0] for term in terms],
+            term_type=[term[1] for term in terms],
+            lemma=[term[2] for term in terms],
+            pos=[term[3] for term in terms],
+            words=[term[4] for term in terms])
+
+    def add_dependency(document):
+        for origen, to, rfunc in dependencies:
+            document.add_dependency(origen, to, rfunc)
+
+    def add_dependencies(document):
+        document.add_dependencies(
+            [origen for origen, _, _ in dependencies],
+            [to for _, to, _ in dependencies],
+            [rfunc for _, _, rfunc in dependencies])
+
+    def add_chunk(document):
+        for cid, head, phrase, chunk_terms in content["chunks"]:
+            document.add_chunk(cid, head, phrase, terms=chunk_terms)
+
+    def add_entity(document):
+        for eid, entity_type, references in content["entities"]:
+            document.add_entity(eid, entity_type, references)
+
+    def add_coreference(document):
+        for coid, references in content["coreferences"]:
+            document.add_coreference(coid, references)
+
+    def add_constituency_tree(document):
+        for non_terminals, terminals, edges in content["trees"]:
+            document.add_constituency_tree(non_terminals, terminals, edges)
+
+    def add_raw_text(document):
+        document.add_raw_text(content["raw"])
+
+    return (
+        ("add_raw_text", 1, add_raw_text),
+        ("add_word", len(words), add_word),
+        ("add_words", len(words), add_words),
+        ("add_term", len(terms), add_term),
+        ("add_terms", len(terms), add_terms),
+        ("add_dependency", len(dependencies), add_dependency),
+        ("add_dependencies", len(dependencies), add_dependencies),
+        ("add_chunk", len(content["chunks"]), add_chunk),
+        ("add_entity", len(content["entities"]), add_entity),
+        ("add_coreference", len(content["coreferences"]), add_coreference),
+        ("add_constituency_tree", len(content["trees"]),
+         add_constituency_tree),
+    )
+
+
+def get_operations(content):
+    """ Return (name, calls, function of a parsed document) for each get_*
+    method. Id lookups include building the id index."""
+    wids = [wid for _, wid, _ in content["words"]]
+    tids = [term[0] for term in content["terms"]]
+    cids = [chunk[0] for chunk in content["chunks"]]
+    eids = [entity[0] for entity in content["entities"]]
+    coids = [coreference[0] for coreference in content["coreferences"]]
+
+    def lookup(method, ids):
+        def run(document):
+            function = getattr(document, method)
+            for element_id in ids:
+                function(element_id)
+        return run
+
+    def scan(method):
+        return lambda document: getattr(document, method)()
+
+    def per_element(method, elements):
+        def run(document):
+            function = getattr(document, method)
+            for element in getattr(document, elements)():
+                function(element)
+        return run
+
+    return (
+        ("get_raw_text", 1, scan("get_raw_text")),
+        ("get_words", len(wids), scan("get_words")),
+        ("get_words_by_id", len(wids), lookup("get_words_by_id", wids)),
+        ("get_terms", len(tids), scan("get_terms")),
+        ("get_term", len(tids), lookup("get_term", tids)),
+        ("get_terms_words", len(tids),
+         per_element("get_terms_words", "get_terms")),
+        ("get_dependencies", len(content["dependencies"]),
+         scan("get_dependencies")),
+        ("get_chunks", len(cids), scan("get_chunks")),
+        ("get_chunk", len(cids), lookup("get_chunk", cids)),
+        ("get_chunk_terms", len(cids),
+         per_element("get_chunk_terms", "get_chunks")),
+        ("get_entities", len(eids), scan("get_entities")),
+        ("get_entity", len(eids), lookup("get_entity", eids)),
+        ("get_entity_references", len(eids),
+         per_element("get_entity_references", "get_entities")),
+        ("get_coreference", len(coids), scan("get_coreference")),
+        ("get_coreference_cluster", len(coids),
+         lookup("get_coreference_cluster", coids)),
+        ("get_coreference_mentions", len(coids),
+         per_element("get_coreference_mentions", "get_coreference")),
+        ("get_constituency_trees", len(content["trees"]),
+         scan("get_constituency_trees")),
+        ("get_span_resolver", 1, scan("get_span_resolver")),
+        ("get_dependency_graph", 1, scan("get_dependency_graph")),
+        ("get_constituency_tree_views", 1,
+         scan("get_constituency_tree_views")),
+    )
+
+
+def serialization_operations():
+    """ Return (name, calls, function of a parsed document) for each
+    serialization."""
+    def indent(document):
+        _indent_element(document.root, 0)
+        etree.tostring(document.root, encoding=document.encoding)
+
+    return (
+        ("to_string", 1, lambda document: document.to_string()),
+        ("to_string_compact", 1,
+         lambda document: document.to_string(pretty_print=False)),
+        ("write", 1, lambda document: document.write(
+            io.BytesIO(), document.encoding)),
+        ("_indent", 1, indent),
+    )
+
+
+def run_size(size, document_class, repeat=REPEAT):
+    """ Return the results of every operation for a document of size
+    words."""
+    content = generate(size)
+    data = build(content, document_class).to_string()
+    words = len(content["words"])
+    results = []
+
+    def record(operation, calls, seconds):
+        results.append({
+            "format": document_class.KAF_TAG, "size": size, "words": words,
+            "operation": operation, "calls": calls, "seconds": seconds,
+            "seconds_per_call": seconds / calls if calls else None})
+
+    record("build", 1, best_time(lambda: build(
+        content, document_class), repeat=repeat))
+    record("parse", 1, best_time(lambda: document_class(
+        input_stream=data), repeat=repeat))
+    for name, calls, function in add_operations(content):
+        record(name, calls, best_time(
+            function, lambda: document_class(language="en"), repeat))
+    for name, calls, function in get_operations(content) + \
+            serialization_operations():
+        record(name, calls, best_time(
+            function, lambda: document_class(input_stream=data), repeat))
+    return results
+
+
+def revision():
+    """ Return the git commit of the working tree, or None."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            stderr=subprocess.STDOUT).decode("ascii").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark pynaf on synthetic documents.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help="Numbers of words of the documents.")
+    parser.add_argument("--repeat", type=int, default=REPEAT,
+                        help="Runs of each operation; the best is kept.")
+    parser.add_argument("--kaf", action="store_true",
+                        help="Benchmark KAF instead of NAF.")
+    parser.add_argument("-o", "--output",
+                        help="The JSON file to write, by default stdout.")
+    arguments = parser.parse_args(argv)
+    document_class = KAFDocument if arguments.kaf else NAFDocument
+
+    results = []
+    for size in arguments.sizes:
+        print("size {0}".format(size), file=sys.stderr)
+        results.extend(run_size(size, document_class, arguments.repeat))
+    report = {
+        "revision": revision(),
+        "python": platform.python_version(),
+        "lxml": ".".join(str(part) for part in etree.LXML_VERSION),
+        "platform": platform.platform(),
+        "repeat": arguments.repeat,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": results,
+    }
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
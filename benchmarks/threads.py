@@ -0,0 +1,96 @@
+from __future__ import print_function, unicode_literals
+
+"""Measure the throughput of loading NAF documents with threads and check
+that parser settings do not leak between threads.
+
+The isolation check runs before the timings and its outcome is printed
+first. From a checkout: PYTHONPATH=. python benchmarks/threads.py
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from pynaf import NAFDocument
+from pynaf.corpus import load_documents
+
+DOCUMENTS = 64
+WORDS = 5000
+THREADS = (1, 2, 4, 8)
+
+DTD = """<!ELEMENT NAF (nafHeader, raw, text)>
+<!ATTLIST NAF xml:lang CDATA #IMPLIED version CDATA #IMPLIED>
+<!ELEMENT nafHeader EMPTY>
+<!ELEMENT raw EMPTY>
+<!ELEMENT text (wf*)>
+<!ELEMENT wf (#PCDATA)>
+<!ATTLIST wf id ID #REQUIRED>
+"""
+
+
+def write_corpus(directory):
+    """ Write the test documents and return their paths."""
+    with open(os.path.join(directory, "naf.dtd"), "w") as output:
+        output.write(DTD)
+    document = NAFDocument(language="en")
+    document.add_words(
+        ["token"] * WORDS, ["w{0}".format(index) for index in range(WORDS)])
+    valid = b'<!DOCTYPE NAF SYSTEM "naf.dtd">\n' + document.to_string()
+    document.add_word("token", "bad", sent="1")
+    invalid = b'<!DOCTYPE NAF SYSTEM "naf.dtd">\n' + document.to_string()
+    paths = []
+    for index in range(DOCUMENTS):
+        path = os.path.join(directory, "{0}.naf".format(index))
+        with open(path, "wb") as output:
+            output.write(invalid if index % 2 else valid)
+        paths.append(path)
+    return paths
+
+
+def check_isolation(paths):
+    """ Load documents with and without DTD validation at the same time
+    and check each thread keeps its own settings."""
+    failures = []
+
+    def load(validate):
+        for index, path in enumerate(paths):
+            try:
+                NAFDocument(file_name=path, dtd_validation=validate)
+                invalid = False
+            except Exception:
+                invalid = True
+            expected = validate and index % 2 == 1
+            if invalid != expected:
+                failures.append((validate, path))
+
+    threads = [threading.Thread(target=load, args=(index % 2 == 0,))
+               for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return failures
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        paths = write_corpus(directory)
+        failures = check_isolation(paths)
+        print("parser settings isolation: {0}".format(
+            "ok" if not failures else "{0} failures".format(len(failures))))
+        print("{0:>8} {1:>12}".format("threads", "docs/s"))
+        for threads in THREADS:
+            start = time.time()
+            for _ in load_documents(paths, threads):
+                pass
+            elapsed = time.time() - start
+            print("{0:>8} {1:>12.1f}".format(threads, len(paths) / elapsed))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+from __future__ import print_function, unicode_literals
+
+"""Measure the validation throughput of a corpus against a DTD compiled
+for every document, as validateExternalDTD did, and compiled once.
+
+The corpus is written to a temporary directory with its DTD. From a
+checkout: PYTHONPATH=. python benchmarks/validation.py
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from lxml import etree
+
+from pynaf import NAFDocument
+from pynaf.validation import validate_documents
+
+DOCUMENTS = 200
+WORDS = 500
+THREADS = (1, 2, 4)
+# Element declarations repeated to make the DTD as big as the NAF one
+PADDING = 200
+
+DTD = """<!ELEMENT NAF (nafHeader, raw, text)>
+<!ATTLIST NAF xml:lang CDATA #IMPLIED version CDATA #IMPLIED>
+<!ELEMENT nafHeader EMPTY>
+<!ELEMENT raw (#PCDATA)>
+<!ELEMENT text (wf*)>
+<!ELEMENT wf (#PCDATA)>
+<!ATTLIST wf id ID #REQUIRED>
+"""
+
+
+def write_corpus(directory):
+    """ Write the schema and the documents and return their paths."""
+    schema = os.path.join(directory, "naf.dtd")
+    with open(schema, "w") as output:
+        output.write(DTD)
+        for index in range(PADDING):
+            output.write(
+                "<!ELEMENT unused{0} (#PCDATA)>\n"
+                "<!ATTLIST unused{0} id ID #REQUIRED>\n".format(index))
+    document = NAFDocument(language="en")
+    document.add_words(
+        ["token"] * WORDS, ["w{0}".format(index) for index in range(WORDS)])
+    data = document.to_string()
+    paths = []
+    for index in range(DOCUMENTS):
+        path = os.path.join(directory, "{0}.naf".format(index))
+        with open(path, "wb") as output:
+            output.write(data)
+        paths.append(path)
+    return schema, paths
+
+
+def compile_each_time(schema, paths):
+    for path in paths:
+        etree.DTD(schema).validate(etree.parse(path))
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        schema, paths = write_corpus(directory)
+        print("{0:>24} {1:>12}".format("mode", "docs/s"))
+        start = time.time()
+        compile_each_time(schema, paths)
+        print("{0:>24} {1:>12.1f}".format(
+            "compiled per document", DOCUMENTS / (time.time() - start)))
+        for threads in THREADS:
+            start = time.time()
+            for result in validate_documents(paths, schema, threads=threads):
+                assert result.valid, result.errors
+            print("{0:>24} {1:>12.1f}".format(
+                "cached, {0} threads".format(threads),
+                DOCUMENTS / (time.time() - start)))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
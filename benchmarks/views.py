@@ -0,0 +1,96 @@
+from __future__ import print_function, unicode_literals
+
+"""Compare a feature extraction loop that reads the attributes of the
+terms and words with element.get against the same loop over views, and
+the memory of keeping the views against keeping dicts of the attributes.
+
+The memory column is measured with tracemalloc and is left out where it
+is missing. From a checkout: PYTHONPATH=. python benchmarks/views.py
+"""
+
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from pynaf import NAFDocument
+from generator import build, generate
+
+WORDS = 50000
+# Times each attribute is read, as in feature templates that look at the
+# same token from several windows
+READS = 5
+REPEAT = 3
+
+
+def elements(document):
+    lemma = document.LEMMA_ATTRIBUTE
+    pos = document.POS_ATTRIBUTE
+    words_index = dict(
+        (word.get(document.WORD_ID_ATTRIBUTE), word)
+        for word in document.get_words())
+    total = 0
+    for term in document.get_terms():
+        for _ in range(READS):
+            targets = document.get_terms_words(term)
+            word = words_index[targets[0].get(document.TARGET_ID_ATTRIBUTE)]
+            total += len(term.get(lemma)) + len(term.get(pos)) + \
+                int(word.get("offset")) + int(word.get("length"))
+    return total
+
+
+def views(document):
+    words_index = dict((word.id, word) for word in document.iter_words())
+    total = 0
+    for term in document.iter_terms():
+        for _ in range(READS):
+            word = words_index[term.span[0]]
+            total += len(term.lemma) + len(term.pos) + word.offset + \
+                word.length
+    return total
+
+
+def memory(function):
+    """ Return the bytes allocated by the result of a function, or None if
+    tracemalloc is not available."""
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    result = function()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    document = NAFDocument(input_stream=build(generate(WORDS)).to_string())
+    assert elements(document) == views(document)
+    for name, function in (("element.get", elements), ("views", views)):
+        print("{0:>12} {1:>8.3f} s".format(name, min(timeit.repeat(
+            lambda: function(document), number=1, repeat=REPEAT))))
+
+    def term_dicts():
+        return [{"id": term.get(document.TERM_ID_ATTRIBUTE),
+                 "lemma": term.get(document.LEMMA_ATTRIBUTE),
+                 "pos": term.get(document.POS_ATTRIBUTE),
+                 "span": tuple(target.get(document.TARGET_ID_ATTRIBUTE)
+                               for target in document.get_terms_words(term))}
+                for term in document.get_terms()]
+
+    def term_views():
+        terms = list(document.iter_terms())
+        for term in terms:
+            term.id, term.lemma, term.pos, term.span
+        return terms
+
+    for name, function in (("dicts", term_dicts), ("views", term_views)):
+        size = memory(function)
+        if size is not None:
+            print("{0:>12} {1:>8.1f} MB kept".format(name, size / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,89 @@ from __future__ import unicode_literals
 
 """Module for manage NAF formatted files. """
 
+import mmap
+import warnings
+from itertools import repeat
 from logging import getLogger
+from threading import local
 from lxml import etree
 
+from pynaf.constituency import ConstituencyTree
+from pynaf.graph import DependencyGraph
+from pynaf.instrumentation import PARSE
+from pynaf.integrity import check_integrity
+from pynaf.query import AttributeIndex
+from pynaf.rawtext import RawText
+from pynaf.sentences import iter_sentences
+from pynaf.spans import SpanResolver
+from pynaf.validation import DTD, get_validator, validate
+from pynaf.views import CorefMention, Dependency, Entity, Term, Word
+
 __author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
 
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+_thread_parsers = local()
+
+
+def get_parser(dtd_validation=False):
+    """ Return the parser of the current thread for the given options.
+
+    lxml parsers must not be shared between threads, and setting the lxml
+    default parser changes it for the whole process, so each thread keeps
+    its own parser for each combination of options.
+    :param dtd_validation: Validate the documents against their DTD.
+    """
+    parsers = getattr(_thread_parsers, "parsers", None)
+    if parsers is None:
+        parsers = _thread_parsers.parsers = {}
+    parser = parsers.get(dtd_validation)
+    if parser is None:
+        parser = parsers[dtd_validation] = etree.XMLParser(
+            remove_comments=False, remove_blank_text=True,
+            dtd_validation=dtd_validation)
+    return parser
+
+
+def _columns(columns):
+    """ Return the columns of a bulk builder as lists, raising ValueError
+    if they do not have the same length, so no item is silently lost.
+
+    :param columns: Pairs of column name and iterable of values.
+    """
+    lists = [(name, list(column)) for name, column in columns]
+    if len(set(len(column) for _, column in lists)) > 1:
+        raise ValueError("Columns of different lengths: {0}".format(", ".join(
+            "{0} {1}".format(name, len(column)) for name, column in lists)))
+    return [column for _, column in lists]
+
+
+def _indent_element(elem, level):
+    """ Indent an element in place, for the deprecated NAFDocument._indent.
+
+    :param elem: Element to indent.
+    :param level: Level of indentation.
+    """
+    i = "\n" + level * "  "
+    child = None
+    if len(elem):
+        if not elem.text or not elem.text.strip():
+            elem.text = i + "  "
+        if not elem.tail or not elem.tail.strip():
+            elem.tail = i
+        for child in elem:
+            _indent_element(child, level+1)
+        # This seeks for the las child processed in for, is not a code
+        # indentation error
+        if child is not None and (not child.tail) or (not child.tail.strip()):
+            child.tail = i
+    else:
+        if level is not None and (not elem.tail or not elem.tail.strip()):
+            elem.tail = i
+
 
 class NAFDocument:
     """ Manage a NAF document.
@@ -101,27 +179,74 @@ class NAFDocument:
                                  "source", "confidence")
     valid_externalRef_attributes = ("resource", "reference")
 
+    # The pynaf.instrumentation.Instrumentation attached to new documents
+    instrumentation = None
+
     def __init__(self, file_name=None, input_stream=None, language=None,
                  version="2.0", header=None, encoding="utf-8",
-                 dtd_validation=False):
-        """ Prepare the document basic structure."""
+                 dtd_validation=False, cache=None, instrumentation=None,
+                 memory_map=False):
+        """ Prepare the document basic structure.
+
+        :param cache: A pynaf.cache.DocumentCache used to load file_name.
+        :param instrumentation: A pynaf.instrumentation.Instrumentation that
+        measures the parse and the operations of the document. By default
+        the instrumentation of the class, if any.
+        :param memory_map: Read file_name through a read only memory map, or
+        keep the input_stream bytes, to give views of the raw text without
+        copying it. See get_raw_text_view.
+        """
+        if instrumentation is None:
+            instrumentation = self.instrumentation
+        parsed = bool(file_name or input_stream)
+        if instrumentation is not None and parsed:
+            start = instrumentation.clock()
         self.encoding = encoding
         self.logger = getLogger(__name__)
-        parser = etree.XMLParser(
-            remove_comments=False, dtd_validation=dtd_validation)
-        etree.set_default_parser(parser)
-
-        if file_name:
-            self.tree = etree.parse(file_name)
+        self._id_index = None
+        self._attribute_index = {}
+        self._span_resolver = None
+        self._dependency_graph = None
+        self._constituency_tree_views = None
+        self._source = None
+        self._raw_view = None
+        parser = get_parser(dtd_validation)
+
+        if file_name and memory_map:
+            with open(file_name, "rb") as mapped_file:
+                self._source = mmap.mmap(
+                    mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if file_name and cache is not None:
+            self.tree = cache.parse(file_name, parser, dtd_validation)
+            self.root = self.tree.getroot()
+        elif file_name and self._source is not None:
+            try:
+                # The DTD and entities are resolved from the file location
+                self.root = etree.fromstring(
+                    self._source, parser, base_url=file_name)
+                self.tree = etree.ElementTree(self.root)
+            except ValueError:
+                # The Python 2 memory maps cannot be parsed directly
+                self.tree = etree.parse(file_name, parser)
+                self.root = self.tree.getroot()
+        elif file_name:
+            self.tree = etree.parse(file_name, parser)
             self.root = self.tree.getroot()
         elif input_stream:
-            if isinstance(input_stream, unicode):
+            if isinstance(input_stream, text_type):
                 input_stream = input_stream.encode(encoding)
-            self.root = etree.fromstring(input_stream)
+            if memory_map:
+                self._source = input_stream
+            self.root = etree.fromstring(input_stream, parser)
             self.tree = etree.ElementTree(self.root)
         else:
             self.root = etree.Element(self.KAF_TAG, self.NS)
             self.tree = etree.ElementTree(self.root)
+        if instrumentation is not None:
+            if parsed:
+                instrumentation.record(
+                    PARSE, instrumentation.clock() - start, self)
+            instrumentation.attach(self)
         if language:
             self.root.attrib[self.LANGUAGE_ATTRIBUTE] = language
 
@@ -129,7 +254,7 @@ class NAFDocument:
             self.root.set(self.VERSION_ATTRIBUTE, version)
 
         headers = self.tree.find(self.KAF_HEADER_TAG)
-        if headers is not None and len(headers):
+        if headers is not None:
             self.kaf_header = headers
         else:
             # create nafheader element and put it in the beginning of
@@ -137,53 +262,53 @@ class NAFDocument:
             self.kaf_header = etree.Element(self.KAF_HEADER_TAG)
             self.root.insert(0, self.kaf_header)
 
-        if header:
+        if header is not None:
             self.set_header(header)
 
         raw_layer = self.tree.find(self.RAW_LAYER_TAG)
-        if raw_layer is not None and len(raw_layer):
+        if raw_layer is not None:
             self.raw = raw_layer
         else:
             self.raw = etree.SubElement(self.root, self.RAW_LAYER_TAG)
 
         text_layer = self.tree.find(self.TEXT_LAYER_TAG)
-        if text_layer is not None and len(text_layer):
+        if text_layer is not None:
             self.text = text_layer
         else:
             self.text = etree.SubElement(self.root, self.TEXT_LAYER_TAG)
 
         terms_layer = self.tree.find(self.TERMS_LAYER_TAG)
-        if text_layer is not None and len(terms_layer):
+        if terms_layer is not None:
             self.terms = terms_layer
         else:
             self.terms = None
 
         dependencies_layer = self.tree.find(self.DEPENDENCY_LAYER_TAG)
-        if dependencies_layer is not None and len(dependencies_layer):
+        if dependencies_layer is not None:
             self.dependencies = dependencies_layer
         else:
             self.dependencies = None
 
         chunks_layer = self.tree.find(self.CHUNKS_LAYER_TAG)
-        if chunks_layer is not None and len(chunks_layer):
+        if chunks_layer is not None:
             self.chunks = chunks_layer
         else:
             self.chunks = None
 
         constituency_layer = self.tree.find(self.CONSTITUENCY_LAYER)
-        if constituency_layer is not None and len(constituency_layer):
+        if constituency_layer is not None:
             self.constituency = constituency_layer
         else:
             self.constituency = None
 
         named_entities_layer = self.tree.find(self.NAMED_ENTITIES_LAYER_TAG)
-        if named_entities_layer is not None and len(named_entities_layer):
+        if named_entities_layer is not None:
             self.entities = named_entities_layer
         else:
             self.entities = None
 
         coreference_layer = self.tree.find(self.COREFERENCE_LAYER_TAG)
-        if coreference_layer is not None and len(coreference_layer):
+        if coreference_layer is not None:
             self.coreference = coreference_layer
         else:
             self.coreference = None
@@ -200,7 +325,7 @@ class NAFDocument:
         :param kaf_header: A dict that contains header elements and
         their attributes
         """
-        if self.kaf_header:
+        if self.kaf_header is not None:
             for element in kaf_header:
                 self.kaf_header.append(element)
             self.kaf_header.attrib.update(kaf_header.attrib)
@@ -252,6 +377,9 @@ class NAFDocument:
             self.raw = etree.SubElement(self.root, self.RAW_LAYER_TAG)
 
         self.raw.text = etree.CDATA(raw_text)
+        self._source = None
+        self._raw_view = None
+        self._changed()
 
     def get_raw_text(self):
         """ Return the raw text of the
@@ -263,6 +391,23 @@ class NAFDocument:
         except:
             return None
 
+    def get_raw_text_view(self):
+        """ Return a pynaf.rawtext.RawText of the raw text, that gives the
+        text between character offsets decoding only that slice.
+
+        Documents loaded with memory_map give a view of the original bytes,
+        so the text is never copied; otherwise, or if those bytes are not the
+        text as parsed, the view is made from an encoded copy of the text.
+        """
+        if self._raw_view is None:
+            if self._source is not None:
+                self._raw_view = RawText.from_document(
+                    self._source, self.__class__)
+            if self._raw_view is None:
+                self._raw_view = RawText.from_string(
+                    self.get_raw_text() or "")
+        return self._raw_view
+
     def add_word(self, word, wid, **kwargs):
         """Add a word to the KAF file.
         A word have the next parameters/attributes;
@@ -278,25 +423,71 @@ class NAFDocument:
         # Prepare the word attributes
         word_attributes = dict(
             (k, v)
-            for (k, v) in kwargs.iteritems()
+            for (k, v) in kwargs.items()
             if k in self.valid_word_attributes)
         word_attributes[self.WORD_ID_ATTRIBUTE] = wid
         # Create a text sub-node for the word and set its attributes
         element = etree.SubElement(
             self.text, self.WORD_OCCURRENCE_TAG, word_attributes)
         element.text = word
+        self._index_element(self.WORD_OCCURRENCE_TAG, wid, element)
+        self._changed()
+        return element
+
+    def add_words(self, words, wids, **kwargs):
+        """Add a sequence of words to the KAF file in a single pass. The
+        result is the same as calling add_word for each word. It is not
+        faster: on 100k words both take the same time within noise, spent
+        creating the lxml elements. It saves the per-word index bookkeeping
+        and takes the attributes as columns.
+        :param words: The word forms.
+        :param wids: The unique ids of the word forms.
+        :param kwargs: The word optional parameters given as columns, with a
+        value for each word, or None to omit it. See add_word.
+        :raises ValueError: If the columns have different lengths.
+        """
+        names = [k for k in kwargs if k in self.valid_word_attributes]
+        columns = _columns(
+            [("words", words)] + [(name, kwargs[name]) for name in names] +
+            [("wids", wids)])
+        words = columns.pop(0)
+        names.append(self.WORD_ID_ATTRIBUTE)
+        text = self.text
+        sub_element = etree.SubElement
+        tag = self.WORD_OCCURRENCE_TAG
+        for word, values in zip(words, zip(*columns)):
+            word_attributes = dict(zip(names, values))
+            if None in values:
+                word_attributes = dict(
+                    (k, v) for (k, v) in word_attributes.items()
+                    if v is not None)
+            sub_element(text, tag, word_attributes).text = word
+        # Rebuild the id index on next use instead of holding every element
+        self._id_index = None
+        self._attribute_index = {}
+        self._changed()
 
     def get_words(self):
         """ Return all the words in the document"""
         return self.text[:]
 
+    def iter_words(self):
+        """ Yield a pynaf.views.Word for each word in the document"""
+        for word in self.text.iterchildren(self.WORD_OCCURRENCE_TAG):
+            yield Word(word, self.__class__)
+
+    def iter_sentences(self):
+        """ Yield a pynaf.sentences.Sentence for each sentence, with its
+        words, the terms over them, the dependencies inside it and the
+        entities and chunks anchored in it. Each layer is read once.
+        """
+        return iter_sentences(self)
+
     def get_words_by_id(self, wid):
         """ Return all the words in the document
         :param wid: WID of the word to retrieve.
         """
-        results = self.text.find("{0}[@{1}='{2}']".format(
-            self.WORD_OCCURRENCE_TAG, self.WORD_ID_ATTRIBUTE, wid))
-        return results and results[0]
+        return self._get_id_index(self.WORD_OCCURRENCE_TAG).get(wid)
 
     def add_term(self, tid, pos=None, lemma=None, morphofeat=None,
                  term_type=None, words=(), ner=None, external_refs=()):
@@ -341,8 +532,67 @@ class NAFDocument:
                 etree.SubElement(
                     span, self.TARGET_TAG, {self.TARGET_ID_ATTRIBUTE: word})
         self.add_external_refs(term, external_refs)
+        self._index_element(self.TERM_OCCURRENCE_TAG, tid, term)
+        self._changed()
         return term
 
+    def add_terms(self, tids, pos=None, lemma=None, morphofeat=None,
+                  term_type=None, words=None, ner=None):
+        """Add a sequence of terms to the kaf file in a single pass. The
+        result is the same as calling add_term for each term, in the same
+        time within noise on 100k terms.
+        Each parameter is a column with a value for each term, see add_term.
+        Columns not given are omitted.
+        :param tids: unique identifiers
+        :param pos: part of speech column
+        :param lemma: lemma column
+        :param morphofeat: PennTreebank part of speech tag column
+        :param term_type: type of the term column
+        :param words: column of lists of ids of the bounded words
+        :param ner: Term NER attribute column
+        :raises ValueError: If the columns have different lengths.
+        """
+        names = []
+        given = [("tids", tids)]
+        for name, argument, column in (
+                (self.POS_ATTRIBUTE, "pos", pos),
+                (self.LEMMA_ATTRIBUTE, "lemma", lemma),
+                (self.TYPE_ATTRIBUTE, "term_type", term_type),
+                (self.MORPHOFEAT_ATTRIBUTE, "morphofeat", morphofeat),
+                (self.NER_ATTRIBUTE, "ner", ner)):
+            if column is not None:
+                names.append(name)
+                given.append((argument, column))
+        if words is not None:
+            given.append(("words", words))
+        columns = _columns(given)
+        tids = columns.pop(0)
+        words = columns[-1] if words is not None else ()
+        if self.terms is None:
+            self.terms = etree.SubElement(self.root, self.TERMS_LAYER_TAG)
+
+        terms = self.terms
+        sub_element = etree.SubElement
+        tag = self.TERM_OCCURRENCE_TAG
+        id_attribute = self.TERM_ID_ATTRIBUTE
+        span_tag = self.SPAN_TAG
+        target_tag = self.TARGET_TAG
+        target_id_attribute = self.TARGET_ID_ATTRIBUTE
+        rows = zip(*columns) if columns else repeat(())
+        for tid, values in zip(tids, rows):
+            term_attributes = {id_attribute: tid}
+            for name, value in zip(names, values):
+                if value:
+                    term_attributes[name] = value
+            term = sub_element(terms, tag, term_attributes)
+            if words and values[-1]:
+                span = sub_element(term, span_tag)
+                for word in values[-1]:
+                    sub_element(span, target_tag, {target_id_attribute: word})
+        self._id_index = None
+        self._attribute_index = {}
+        self._changed()
+
     def add_external_refs(self, elem, external_refs=()):
         if external_refs:
             span = elem.find(self.EXTERNAL_REFERENCES_TAG)
@@ -351,7 +601,7 @@ class NAFDocument:
             for external_ref in external_refs:
                 ref_attributes = dict(
                     (k, v)
-                    for (k, v) in external_ref.iteritems()
+                    for (k, v) in external_ref.items()
                     if k in self.valid_externalRef_attributes)
                 keys = ref_attributes.keys()
                 for attribute in self.valid_externalRef_attributes:
@@ -367,13 +617,39 @@ class NAFDocument:
         return self.root.findall(
             "{0}/{1}".format(self.TERMS_LAYER_TAG, self.TERM_OCCURRENCE_TAG))
 
+    def iter_terms(self):
+        """ Yield a pynaf.views.Term for each term in the document"""
+        if self.terms is None:
+            return
+        for term in self.terms.iterchildren(self.TERM_OCCURRENCE_TAG):
+            yield Term(term, self.__class__)
+
+    def find_terms(self, pos=None, lemma=None, morphofeat=None,
+                   term_type=None, ner=None):
+        """ Return the terms, in document order, that match every given
+        attribute. Each attribute is a value or a list, tuple or set of
+        accepted values; attributes left to None are not checked.
+
+        The terms are looked up in inverted indexes from attribute value to
+        terms, built on first use and kept up to date by add_term, so
+        repeated queries do not scan the terms layer.
+        :param pos: part of speech
+        :param lemma: lemma of the term
+        :param morphofeat: PennTreebank part of speech tag
+        :param term_type: type of the term
+        :param ner: Term NER attribute
+        """
+        return self._find(self.TERM_OCCURRENCE_TAG, (
+            (self.POS_ATTRIBUTE, pos), (self.LEMMA_ATTRIBUTE, lemma),
+            (self.MORPHOFEAT_ATTRIBUTE, morphofeat),
+            (self.TYPE_ATTRIBUTE, term_type), (self.NER_ATTRIBUTE, ner)))
+
     def get_term(self, termId):
         """ Get the term.
         :param termId: Id of the Term node wanted.
 
         """
-        return self.root.xpath(
-            "//{0}[@id='{1}']".format(self.TERM_OCCURRENCE_TAG, termId))[0]
+        return self._get_id_index(self.TERM_OCCURRENCE_TAG)[termId]
 
     def get_terms_words(self, term):
         """ Get the words that forms the term.
@@ -415,7 +691,7 @@ class NAFDocument:
                 - obj2: The relation between a predicate and the second
                 non-clausal complement in ditransitive constructions.
         """
-        if not self.dependencies:
+        if self.dependencies is None:
             self.dependencies = etree.SubElement(
                 self.root, self.DEPENDENCY_LAYER_TAG)
 
@@ -423,9 +699,39 @@ class NAFDocument:
             self.DEPENDENCY_FROM_ATTRIBUTE: origen,
             self.DEPENDENCY_TO_ATTRIBUTE: to,
             self.DEPENDENCY_FUNCTION_ATTRIBUTE: rfunc}
-        return etree.SubElement(
+        dependency = etree.SubElement(
             self.dependencies, self.DEPENDENCY_OCCURRENCE_TAG,
             dependency_attributes)
+        self._changed()
+        return dependency
+
+    def add_dependencies(self, origens, tos, rfuncs):
+        """Add a sequence of dependency relations in a single pass. The
+        result is the same as calling add_dependency for each relation, in
+        the same time within noise on 100k relations.
+        :param origens: term ids of the source elements
+        :param tos: term ids of the target elements
+        :param rfuncs: relational functions, see add_dependency.
+        :raises ValueError: If the columns have different lengths.
+        """
+        origens, tos, rfuncs = _columns(
+            (("origens", origens), ("tos", tos), ("rfuncs", rfuncs)))
+        if self.dependencies is None:
+            self.dependencies = etree.SubElement(
+                self.root, self.DEPENDENCY_LAYER_TAG)
+
+        dependencies = self.dependencies
+        sub_element = etree.SubElement
+        tag = self.DEPENDENCY_OCCURRENCE_TAG
+        from_attribute = self.DEPENDENCY_FROM_ATTRIBUTE
+        to_attribute = self.DEPENDENCY_TO_ATTRIBUTE
+        function_attribute = self.DEPENDENCY_FUNCTION_ATTRIBUTE
+        for origen, to, rfunc in zip(origens, tos, rfuncs):
+            sub_element(dependencies, tag, {
+                from_attribute: origen,
+                to_attribute: to,
+                function_attribute: rfunc})
+        self._changed()
 
     def get_dependencies(self):
         """Return all the words in the document"""
@@ -433,6 +739,15 @@ class NAFDocument:
             "{0}/{1}".format(
                 self.DEPENDENCY_LAYER_TAG, self.DEPENDENCY_OCCURRENCE_TAG))
 
+    def iter_dependencies(self):
+        """ Yield a pynaf.views.Dependency for each dependency in the
+        document"""
+        if self.dependencies is None:
+            return
+        for dependency in self.dependencies.iterchildren(
+                self.DEPENDENCY_OCCURRENCE_TAG):
+            yield Dependency(dependency, self.__class__)
+
     def add_chunk(self, cid, head, phrase, case=None, terms=()):
         """"Add a chunk to the kaf document.
         Chunks are noun or prepositional phrases, spanning terms.
@@ -449,7 +764,7 @@ class NAFDocument:
         :param terms: terms that form the chunk.
         """
         # Secure the root
-        if not self.chunks:
+        if self.chunks is None:
             self.chunks = etree.SubElement(self.root, self.CHUNKS_LAYER_TAG)
             # Prepare the attributes
         chunk_attributes = {
@@ -467,13 +782,21 @@ class NAFDocument:
             for term in terms:
                 etree.SubElement(
                     spans, self.TARGET_TAG, {self.TARGET_ID_ATTRIBUTE: term})
+        self._index_element(self.CHUNK_OCCURRENCE_TAG, cid, chunk)
+        self._changed()
         return chunk
 
     def get_chunks(self):
         """Return all the chunks of the text"""
         return self.root.findall(
             "{0}/{1}".format(
-                self.DEPENDENCY_LAYER_TAG, self.DEPENDENCY_OCCURRENCE_TAG))
+                self.CHUNKS_LAYER_TAG, self.CHUNK_OCCURRENCE_TAG))
+
+    def get_chunk(self, cid):
+        """ Get the chunk.
+        :param cid: Id of the chunk node wanted.
+        """
+        return self._get_id_index(self.CHUNK_OCCURRENCE_TAG).get(cid)
 
     def get_chunk_terms(self, chunk):
         """Return all the terms of a chunk.
@@ -512,6 +835,20 @@ class NAFDocument:
         return constituent.findall(
             "{0}/{1}".format(self.SPAN_TAG, self.TARGET_TAG))
 
+    def get_constituency_tree_views(self):
+        """Return a ConstituencyTree for each constituency tree in the
+        document, with parent, children, head and word span navigation. They
+        are built once and kept until the document changes.
+        """
+        if self._constituency_tree_views is None:
+            term_spans = dict(
+                (tid, span.words) for tid, span in
+                self.get_span_resolver().terms.items())
+            self._constituency_tree_views = [
+                ConstituencyTree(self, tree, term_spans)
+                for tree in self.get_constituency_trees()]
+        return self._constituency_tree_views
+
     def add_constituency_tree(self, no_terminals, terminals, edges):
         """ Create and attach the tree to the document and include al
         no-terminals, terminals and edges that conforms the tree.
@@ -557,6 +894,7 @@ class NAFDocument:
 
             etree.SubElement(tree, self.CONSTITUENCY_EDGES, attrib)
 
+        self._changed()
         return tree
 
     def add_entity(self, eid, entity_type, references=()):
@@ -587,6 +925,8 @@ class NAFDocument:
                         span, self.TARGET_TAG, {
                             self.TARGET_ID_ATTRIBUTE: token
                         })
+        self._index_element(self.NAMED_ENTITY_OCCURRENCE_TAG, eid, entity)
+        self._changed()
         return entity
 
     def get_entities(self):
@@ -596,6 +936,30 @@ class NAFDocument:
                 self.NAMED_ENTITIES_LAYER_TAG,
                 self.NAMED_ENTITY_OCCURRENCE_TAG))
 
+    def iter_entities(self):
+        """ Yield a pynaf.views.Entity for each Named Entity in the
+        document"""
+        if self.entities is None:
+            return
+        for entity in self.entities.iterchildren(
+                self.NAMED_ENTITY_OCCURRENCE_TAG):
+            yield Entity(entity, self.__class__)
+
+    def find_entities(self, entity_type=None):
+        """ Return the entities, in document order, of a type or of any of a
+        list, tuple or set of types. See find_terms.
+
+        :param entity_type: The type of the entity.
+        """
+        return self._find(self.NAMED_ENTITY_OCCURRENCE_TAG, (
+            (self.NAMED_ENTITY_TYPE_ATTRIBUTE, entity_type),))
+
+    def get_entity(self, eid):
+        """ Get the entity.
+        :param eid: Id of the entity node wanted.
+        """
+        return self._get_id_index(self.NAMED_ENTITY_OCCURRENCE_TAG).get(eid)
+
     def get_entity_references(self, named_entity):
         """Return all the terms of a  Named Entities in the document.
         :param named_entity: The entity whose references are wanted."""
@@ -626,15 +990,18 @@ class NAFDocument:
         if references:
             for reference in references:
                 if forms:
-                    form = forms.next()
-                    comment = etree.Comment(
-                        form.decode("utf-8").replace("-", " - "))
+                    form = next(forms)
+                    if isinstance(form, bytes):
+                        form = form.decode("utf-8")
+                    comment = etree.Comment(form.replace("-", " - "))
                     entity.append(comment)
                 if heads:
-                    head = heads.next()
+                    head = next(heads)
+                    if isinstance(head, bytes):
+                        head = head.decode("utf-8")
                 span = etree.SubElement(entity, self.SPAN_TAG)
                 for token in reference:
-                    if heads and token == head.decode("utf-8"):
+                    if heads and token == head:
                         etree.SubElement(
                             span, self.TARGET_TAG, 
                             {self.TARGET_ID_ATTRIBUTE: token, 
@@ -645,6 +1012,8 @@ class NAFDocument:
                             span, self.TARGET_TAG, {
                                 self.TARGET_ID_ATTRIBUTE: token})
         self.add_external_refs(entity, external_refs)
+        self._index_element(self.COREFERENCE_OCCURRENCE_TAG, coid, entity)
+        self._changed()
         return entity
 
     def get_coreference(self):
@@ -654,60 +1023,207 @@ class NAFDocument:
                 self.COREFERENCE_LAYER_TAG,
                 self.COREFERENCE_OCCURRENCE_TAG))
 
+    def get_coreference_cluster(self, coid):
+        """ Get the coreference cluster.
+        :param coid: Id of the coreference node wanted.
+        """
+        return self._get_id_index(self.COREFERENCE_OCCURRENCE_TAG).get(coid)
+
     def get_coreference_mentions(self, named_entity):
         """Return all the terms of a  Named Entities in the document.
         :param named_entity: The entity whose references are wanted."""
         return named_entity.findall("{0}".format(self.SPAN_TAG))
 
+    def iter_coreference_mentions(self):
+        """ Yield a pynaf.views.CorefMention for each mention of every
+        coreference cluster in the document, cluster by cluster"""
+        if self.coreference is None:
+            return
+        for cluster in self.coreference.iterchildren(
+                self.COREFERENCE_OCCURRENCE_TAG):
+            coid = cluster.get(self.COREFERENCE_ID_ATTRIBUTE)
+            for mention in cluster.iterchildren(self.SPAN_TAG):
+                yield CorefMention(mention, self.__class__, coid)
+
     def get_reference_span(self, reference):
         """Return all the terms of a reference in the document.
 
         :param reference: The reference node whose terms are wanted."""
         return reference.findall(self.TARGET_TAG)
 
+    def _get_id_index(self, tag):
+        """ Return the id to element map of a layer, building the index of
+        every layer the first time it is needed.
+
+        :param tag: The occurrence tag of the layer elements.
+        """
+        if self._id_index is None:
+            self._id_index = {}
+            for layer, occurrence_tag, id_attribute in (
+                    (self.text, self.WORD_OCCURRENCE_TAG,
+                     self.WORD_ID_ATTRIBUTE),
+                    (self.terms, self.TERM_OCCURRENCE_TAG,
+                     self.TERM_ID_ATTRIBUTE),
+                    (self.chunks, self.CHUNK_OCCURRENCE_TAG,
+                     self.CHUNK_ID_ATTRIBUTE),
+                    (self.entities, self.NAMED_ENTITY_OCCURRENCE_TAG,
+                     self.NAMED_ENTITY_ID_ATTRIBUTE),
+                    (self.coreference, self.COREFERENCE_OCCURRENCE_TAG,
+                     self.COREFERENCE_ID_ATTRIBUTE)):
+                index = {}
+                if layer is not None:
+                    for element in layer.iterchildren(occurrence_tag):
+                        index[element.get(id_attribute)] = element
+                self._id_index[occurrence_tag] = index
+        return self._id_index[tag]
+
+    def _index_element(self, tag, element_id, element):
+        """ Keep the id and attribute indexes, if already built, up to date
+        with a new element.
+
+        :param tag: The occurrence tag of the element.
+        :param element_id: The id of the element.
+        :param element: The new element.
+        """
+        if self._id_index is not None:
+            self._id_index[tag][element_id] = element
+        attribute_index = self._attribute_index.get(tag)
+        if attribute_index is not None:
+            attribute_index.add(element)
+
+    def _find(self, tag, conditions):
+        """ Return the elements of a layer that match every condition, using
+        the attribute index of the layer.
+
+        :param tag: The occurrence tag of the layer elements.
+        :param conditions: Pairs of attribute name and accepted value or
+        values, None for no condition.
+        """
+        attribute_index = self._attribute_index.get(tag)
+        if attribute_index is None:
+            layer = self.terms if tag == self.TERM_OCCURRENCE_TAG \
+                else self.entities
+            attribute_index = self._attribute_index[tag] = AttributeIndex(
+                layer, tag)
+        return attribute_index.select(dict(
+            (attribute, value) for attribute, value in conditions
+            if value is not None))
+
+    def _changed(self):
+        """ Drop the structures derived from the document content after a
+        change. They are built again on next use.
+        """
+        self._span_resolver = None
+        self._dependency_graph = None
+        self._constituency_tree_views = None
+
+    def get_span_resolver(self):
+        """ Return the spans of every term, entity, chunk and coreference
+        mention resolved to words, offsets and raw text. It is built once
+        and kept until the document changes.
+        """
+        if self._span_resolver is None:
+            self._span_resolver = SpanResolver(self)
+        return self._span_resolver
+
+    def get_dependency_graph(self):
+        """ Return the dependency graph of the document. It is built once
+        and kept until the document changes.
+        """
+        if self._dependency_graph is None:
+            self._dependency_graph = DependencyGraph(self)
+        return self._dependency_graph
+
     def _indent(self, elem, level=0):
         """ Include indentation in the output making it more human readable.
 
+        Deprecated: it changes the text and tail of the elements. to_string
+        and write indent while serializing, and lxml.etree.indent indents a
+        detached element.
         :param elem: Element to indent.
         :param level: Level of indentation.
         """
-        i = "\n" + level * "  "
-        child = None
-        if len(elem):
-            if not elem.text or not elem.text.strip():
-                elem.text = i + "  "
-            if not elem.tail or not elem.tail.strip():
-                elem.tail = i
-            for child in elem:
-                self._indent(child, level+1)
-            # This seeks for the las child processed in for, is not a code
-            # indentation error
-            if child is not None and (not child.tail) or (not child.tail.strip()):
-                child.tail = i
-        else:
-            if level is not None and (not elem.tail or not elem.tail.strip()):
-                elem.tail = i
+        warnings.warn(
+            "NAFDocument._indent is deprecated, use to_string or "
+            "lxml.etree.indent", DeprecationWarning, stacklevel=2)
+        _indent_element(elem, level)
 
     def validateExternalDTD(self, source):
         """  Validate the current NAF document against the DTD.
+        DTD files are compiled once and reused, see
+        pynaf.validation.get_validator.
         :param source: The DTD source
         :return True or False
         """
-        self.dtd = etree.DTD(source)
+        if isinstance(source, (bytes, text_type)):
+            self.dtd = get_validator(source, DTD)
+        else:
+            self.dtd = etree.DTD(source)
         return self.dtd.validate(self.root)
 
-    def write(self, output, encoding):
+    def validate(self, source, kind=None):
+        """ Validate the current document against a DTD, RelaxNG or XML
+        Schema file, compiled once and reused, and return a
+        pynaf.validation.ValidationResult with the errors.
+        :param source: The path of the schema.
+        :param kind: "dtd", "relaxng" or "xsd". By default guessed from the
+        extension of source.
+        """
+        return validate(self, source, kind)
+
+    def check_integrity(self):
+        """ Check that every id is present and unique and that every span
+        target, dependency, chunk head and constituency edge points to an
+        existing element, in time linear in the size of the document.
+        Return the list of pynaf.integrity.IntegrityProblem found, empty if
+        there are none.
+        """
+        return check_integrity(self)
+
+    def to_string(self, encoding=None, pretty_print=True):
+        """ Serialize the document without modifying the tree.
+
+        The indentation is made by lxml while serializing, so the elements
+        text and tail are left untouched and repeated calls do not redo any
+        work.
+        :param encoding: The encoding of the output. By default the one of
+        the document.
+        :param pretty_print: Indent the output. If False the document is
+        written compact, without any added whitespace.
+        """
+        return etree.tostring(
+            self.root, encoding=encoding or self.encoding,
+            pretty_print=pretty_print)
+
+    def write(self, output, encoding, pretty_print=True):
         """Write document into a file.
         :param output: The output target for the document. May be a file type
          object or a file name.
         :param encoding: The encoding of the output.
+        :param pretty_print: Indent the output.
         """
-        self._indent(self.root)
-        output.write(etree.tostring(self.root, encoding=encoding,))
+        output.write(self.to_string(encoding, pretty_print))
 
     def __str__(self):
-        self._indent(self.root)
-        return etree.tostring(self.root, encoding=self.encoding)
+        return self.to_string()
+
+    def __getstate__(self):
+        """ Pickle the document as its compact serialization.
+
+        The timed wrappers of an attached instrumentation, the indexes and
+        the memory map are left behind; the unpickled document is measured
+        only by the instrumentation of its class, if any.
+        """
+        return {"encoding": self.encoding,
+                "document": self.to_string(pretty_print=False)}
+
+    def __setstate__(self, state):
+        """ Parse a document pickled by __getstate__.
+
+        :param state: The dict returned by __getstate__.
+        """
+        self.__init__(input_stream=state["document"], version=None,
+                      encoding=state["encoding"])
 
 
 class KAFDocument(NAFDocument):
@@ -0,0 +1,314 @@
+from __future__ import print_function, unicode_literals
+
+"""Command line tools for NAF corpora.
+
+    python -m pynaf run module:function corpus_directory -o output_directory
+    python -m pynaf pipeline corpus_directory module:first module:second \
+        -o output_directory
+    python -m pynaf validate naf.dtd corpus_directory
+    python -m pynaf check corpus_directory
+    python -m pynaf convert kaf_directory naf_directory --to naf
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from pynaf import NAFDocument, KAFDocument
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+def _document_class(arguments):
+    return KAFDocument if arguments.kaf else NAFDocument
+
+
+def run_command(arguments):
+    """ Apply a function to every document of a corpus directory."""
+    from pynaf import corpus
+
+    function = corpus.load_function(arguments.function)
+    memory_limit = arguments.memory_limit and arguments.memory_limit << 20
+    errors = 0
+    for result in corpus.run(
+            function, corpus.find_files(arguments.input, arguments.pattern),
+            input_directory=arguments.input, output_directory=arguments.output,
+            processes=arguments.processes, chunksize=arguments.chunksize,
+            ordered=arguments.ordered,
+            maxtasksperchild=arguments.max_tasks_per_child,
+            memory_limit=memory_limit,
+            document_class=_document_class(arguments),
+            encoding=arguments.encoding):
+        if result.error:
+            errors += 1
+            print("{0}: ERROR\n{1}".format(result.path, result.error),
+                  file=sys.stderr)
+        elif arguments.verbose:
+            print("{0}: {1!r}".format(result.path, result.value))
+    return 1 if errors else 0
+
+
+def worker_command(arguments):
+    """ Apply a function to each document of a framed standard input."""
+    from pynaf import corpus, framing
+
+    framing.serve(
+        corpus.load_function(arguments.function),
+        document_class=_document_class(arguments),
+        encoding=arguments.encoding)
+    return 0
+
+
+def pipeline_command(arguments):
+    """ Send every document of a corpus directory through a pipeline of
+    worker processes."""
+    from pynaf import corpus, framing
+
+    def frames():
+        for path in corpus.find_files(arguments.input, arguments.pattern):
+            name = os.path.relpath(path, arguments.input)
+            try:
+                with open(path, "rb") as document:
+                    data = document.read()
+            except (IOError, OSError) as error:
+                yield framing.Frame(
+                    framing.ERROR, name, str(error).encode("utf-8"))
+            else:
+                yield framing.Frame(framing.DOCUMENT, name, data)
+
+    commands = [
+        framing.worker_command(
+            function, _document_class(arguments), arguments.encoding)
+        for function in arguments.functions]
+    errors = 0
+    for frame in framing.run_pipeline(commands, frames()):
+        if frame.kind == framing.ERROR:
+            errors += 1
+            print("{0}: ERROR\n{1}".format(
+                frame.name, frame.data.decode("utf-8", "replace")),
+                file=sys.stderr)
+            continue
+        if arguments.output:
+            try:
+                output_path = corpus.output_path(
+                    arguments.output, arguments.input,
+                    os.path.join(arguments.input, frame.name))
+            except ValueError as error:
+                errors += 1
+                print("{0}: ERROR {1}".format(frame.name, error),
+                      file=sys.stderr)
+                continue
+            if not os.path.isdir(os.path.dirname(output_path)):
+                os.makedirs(os.path.dirname(output_path))
+            with open(output_path, "wb") as output:
+                output.write(frame.data)
+        if arguments.verbose:
+            print("{0}: ok".format(frame.name))
+    return 1 if errors else 0
+
+
+def validate_command(arguments):
+    """ Validate every document of a corpus directory against a schema."""
+    from pynaf import corpus, validation
+
+    start = time.time()
+    total = invalid = 0
+    for result in validation.validate_documents(
+            corpus.find_files(arguments.input, arguments.pattern),
+            arguments.schema, arguments.kind, arguments.threads):
+        total += 1
+        if not result.valid:
+            invalid += 1
+            print("{0}: INVALID".format(result.source), file=sys.stderr)
+            for error in result.errors[:arguments.max_errors]:
+                print("    {0}".format(error), file=sys.stderr)
+        elif arguments.verbose:
+            print("{0}: valid".format(result.source))
+    elapsed = time.time() - start
+    print("{0} documents, {1} invalid, {2:.1f} documents/s".format(
+        total, invalid, total / elapsed if elapsed else 0.0),
+        file=sys.stderr)
+    return 1 if invalid else 0
+
+
+def check_command(arguments):
+    """ Check the referential integrity of every document of a corpus
+    directory."""
+    from pynaf import corpus
+
+    document_class = _document_class(arguments)
+    total = broken = 0
+    for path in corpus.find_files(arguments.input, arguments.pattern):
+        total += 1
+        try:
+            problems = document_class(path).check_integrity()
+        except Exception as error:
+            broken += 1
+            print("{0}: ERROR {1}".format(path, error), file=sys.stderr)
+            continue
+        if problems:
+            broken += 1
+            print("{0}: {1} problems".format(path, len(problems)),
+                  file=sys.stderr)
+            for problem in problems[:arguments.max_errors]:
+                print("    {0}".format(problem.describe()), file=sys.stderr)
+        elif arguments.verbose:
+            print("{0}: ok".format(path))
+    print("{0} documents, {1} with problems".format(total, broken),
+          file=sys.stderr)
+    return 1 if broken else 0
+
+
+def convert_command(arguments):
+    """ Convert every document of a corpus directory between KAF and NAF."""
+    from pynaf import corpus, convert
+
+    if arguments.to == "naf":
+        source_class, target_class = KAFDocument, NAFDocument
+    else:
+        source_class, target_class = NAFDocument, KAFDocument
+    pattern = arguments.pattern or "*.{0}".format(
+        source_class.KAF_TAG.lower())
+    start = time.time()
+    total = errors = 0
+    for result in convert.convert_corpus(
+            corpus.find_files(arguments.input, pattern), arguments.input,
+            arguments.output, source_class, target_class,
+            processes=arguments.processes, encoding=arguments.encoding):
+        total += 1
+        if result.error:
+            errors += 1
+            print("{0}: ERROR\n{1}".format(result.path, result.error),
+                  file=sys.stderr)
+        elif arguments.verbose:
+            print("{0}: {1}".format(result.path, result.value))
+    elapsed = time.time() - start
+    print("{0} documents, {1} errors, {2:.1f} documents/s".format(
+        total, errors, total / elapsed if elapsed else 0.0),
+        file=sys.stderr)
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pynaf")
+    parser.add_argument(
+        "--kaf", action="store_true", help="Process KAF instead of NAF.")
+    parser.add_argument(
+        "--encoding", default="utf-8", help="Encoding of the output files.")
+    commands = parser.add_subparsers(dest="command")
+    # Python 3 subcommands are optional unless told otherwise
+    commands.required = True
+
+    run_parser = commands.add_parser(
+        "run", help="Apply a function to every document of a corpus.")
+    run_parser.add_argument(
+        "function", help="The function to apply, as module:function.")
+    run_parser.add_argument("input", help="The corpus directory.")
+    run_parser.add_argument(
+        "-o", "--output", help="Directory where the documents are written.")
+    run_parser.add_argument(
+        "-p", "--pattern", default="*.naf", help="File name pattern.")
+    run_parser.add_argument(
+        "-j", "--processes", type=int, help="Number of worker processes.")
+    run_parser.add_argument(
+        "--chunksize", type=int, default=16,
+        help="Documents sent to a worker at once.")
+    run_parser.add_argument(
+        "--ordered", action="store_true",
+        help="Report the results in corpus order.")
+    run_parser.add_argument(
+        "--max-tasks-per-child", type=int,
+        help="Chunks processed by a worker before it is recycled.")
+    run_parser.add_argument(
+        "--memory-limit", type=int,
+        help="Memory limit of each worker in megabytes.")
+    run_parser.add_argument(
+        "-v", "--verbose", action="store_true",
+        help="Print the result of every document.")
+    run_parser.set_defaults(handler=run_command)
+
+    worker_parser = commands.add_parser(
+        "worker", help="Apply a function to each document of a framed "
+                       "stream read from stdin and write them to stdout.")
+    worker_parser.add_argument(
+        "function", help="The function to apply, as module:function.")
+    worker_parser.set_defaults(handler=worker_command)
+
+    pipeline_parser = commands.add_parser(
+        "pipeline", help="Send every document of a corpus through a "
+                         "pipeline of persistent worker processes.")
+    pipeline_parser.add_argument("input", help="The corpus directory.")
+    pipeline_parser.add_argument(
+        "functions", nargs="+",
+        help="The function of each worker, as module:function, in order.")
+    pipeline_parser.add_argument(
+        "-o", "--output", help="Directory where the documents are written.")
+    pipeline_parser.add_argument(
+        "-p", "--pattern", default="*.naf", help="File name pattern.")
+    pipeline_parser.add_argument(
+        "-v", "--verbose", action="store_true",
+        help="Print the name of every document.")
+    pipeline_parser.set_defaults(handler=pipeline_command)
+
+    validate_parser = commands.add_parser(
+        "validate", help="Validate every document of a corpus against a "
+                         "DTD, RelaxNG or XML Schema file.")
+    validate_parser.add_argument("schema", help="The schema file.")
+    validate_parser.add_argument("input", help="The corpus directory.")
+    validate_parser.add_argument(
+        "--kind", choices=("dtd", "relaxng", "xsd"),
+        help="The schema language. By default guessed from the extension.")
+    validate_parser.add_argument(
+        "-p", "--pattern", default="*.naf", help="File name pattern.")
+    validate_parser.add_argument(
+        "-j", "--threads", type=int, default=1,
+        help="Number of threads, 0 for one per CPU.")
+    validate_parser.add_argument(
+        "--max-errors", type=int, default=5,
+        help="Errors shown for each invalid document.")
+    validate_parser.add_argument(
+        "-v", "--verbose", action="store_true",
+        help="Print the valid documents too.")
+    validate_parser.set_defaults(handler=validate_command)
+
+    check_parser = commands.add_parser(
+        "check", help="Check that the ids of every document of a corpus "
+                      "are unique and its references point to them.")
+    check_parser.add_argument("input", help="The corpus directory.")
+    check_parser.add_argument(
+        "-p", "--pattern", default="*.naf", help="File name pattern.")
+    check_parser.add_argument(
+        "--max-errors", type=int, default=5,
+        help="Problems shown for each document.")
+    check_parser.add_argument(
+        "-v", "--verbose", action="store_true",
+        help="Print the correct documents too.")
+    check_parser.set_defaults(handler=check_command)
+
+    convert_parser = commands.add_parser(
+        "convert", help="Convert every document of a corpus between KAF "
+                        "and NAF.")
+    convert_parser.add_argument("input", help="The corpus directory.")
+    convert_parser.add_argument(
+        "output", help="Directory where the documents are written.")
+    convert_parser.add_argument(
+        "--to", choices=("naf", "kaf"), default="naf",
+        help="The format of the output.")
+    convert_parser.add_argument(
+        "-p", "--pattern",
+        help="File name pattern. By default *.kaf or *.naf, the extension "
+             "of the other format.")
+    convert_parser.add_argument(
+        "-j", "--processes", type=int, help="Number of worker processes.")
+    convert_parser.add_argument(
+        "-v", "--verbose", action="store_true",
+        help="Print every converted document.")
+    convert_parser.set_defaults(handler=convert_command)
+
+    arguments = parser.parse_args(argv)
+    return arguments.handler(arguments)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+from __future__ import unicode_literals
+
+"""Asynchronous loading and saving of NAF documents for asyncio services.
+
+Parsing, serialization and annotation functions run in a thread pool, so
+the event loop keeps serving other requests while a large document is
+processed; lxml releases the GIL during most of that work. This module needs
+Python 3.7 or later and is not imported by pynaf.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from weakref import WeakKeyDictionary
+
+from pynaf import NAFDocument
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+class NAFExecutor(object):
+    """ Run the blocking work on documents in a bounded thread pool.
+
+    At most max_concurrency jobs are submitted to the pool at the same time;
+    the rest wait in the event loop, where cancelling them costs nothing. A
+    job cancelled after it has started runs to its end in its thread, but
+    its result is discarded, and it keeps its place in the limit until then.
+    An executor may be used from several event loops, one after another or
+    in different threads; the limit is counted for each loop on its own, so
+    the pool may get max_concurrency jobs from each of them. A document must
+    not be used by two jobs at the same time.
+    """
+
+    def __init__(self, max_workers=4, max_concurrency=None,
+                 document_class=NAFDocument, executor=None):
+        """ Prepare the executor.
+
+        :param max_workers: The number of threads of the pool.
+        :param max_concurrency: The maximum number of jobs in the pool,
+        running or queued. By default max_workers.
+        :param document_class: The class of the loaded documents.
+        :param executor: A concurrent.futures executor to use instead of a
+        new pool. It is not shut down by close.
+        """
+        self.document_class = document_class
+        self.max_concurrency = max_concurrency or max_workers
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers)
+        self._semaphores = WeakKeyDictionary()
+
+    async def run(self, function, *args, **kwargs):
+        """ Run a blocking function in the pool and return its result.
+
+        :param function: The function to call.
+        :param args: The positional arguments of the function.
+        :param kwargs: The keyword arguments of the function.
+        """
+        loop = asyncio.get_running_loop()
+        # An asyncio semaphore belongs to the loop that first waits on it
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(
+                self.max_concurrency)
+        await semaphore.acquire()
+        try:
+            job = self._executor.submit(partial(function, *args, **kwargs))
+        except BaseException:
+            semaphore.release()
+            raise
+        # Release when the thread is done, not when the waiter is cancelled
+        job.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(semaphore.release))
+        return await asyncio.wrap_future(job)
+
+    async def load(self, source=None, file_name=None, **kwargs):
+        """ Load a document without blocking the event loop.
+
+        :param source: The document as bytes or text, or a stream whose read
+        method is a coroutine, like asyncio.StreamReader or an aiohttp
+        request content.
+        :param file_name: The path of a file to load instead of source.
+        :param kwargs: Other arguments of the document class.
+        """
+        read = getattr(source, "read", None)
+        if read is not None:
+            source = await read()
+        if file_name is not None:
+            return await self.run(
+                self.document_class, file_name=file_name, **kwargs)
+        return await self.run(
+            self.document_class, input_stream=source, **kwargs)
+
+    async def serialize(self, document, encoding=None, pretty_print=True):
+        """ Return the serialized document without blocking the event loop.
+
+        :param document: The document to serialize.
+        :param encoding: The encoding of the result, by default that of the
+        document.
+        :param pretty_print: Indent the elements.
+        """
+        return await self.run(
+            document.to_string, encoding, pretty_print=pretty_print)
+
+    async def write(self, document, output, encoding=None,
+                    pretty_print=True):
+        """ Write a document to a file without blocking the event loop.
+
+        :param document: The document to write.
+        :param output: A file object opened in binary mode.
+        :param encoding: The encoding of the file.
+        :param pretty_print: Indent the elements.
+        """
+        await self.run(
+            document.write, output, encoding, pretty_print=pretty_print)
+
+    def close(self, wait=True):
+        """ Shut down the pool if it was created by the executor.
+
+        :param wait: Wait for the running jobs to end.
+        """
+        if self._own_executor:
+            self._executor.shutdown(wait)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exception):
+        self.close(wait=False)
@@ -0,0 +1,158 @@
+from __future__ import unicode_literals
+
+"""Addition of new layers to a serialized NAF document without serializing
+it again. """
+
+import re
+
+from lxml import etree
+
+from pynaf import NAFDocument
+from pynaf.rawtext import ATTRIBUTES, declared_encoding
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+INDENT = "  "
+
+
+class LayerAppender(object):
+    """ Splice new layers and an updated header into a serialized document.
+
+    The original document is kept as bytes. Only its header is parsed; the
+    new layers are built in `document`, an empty document that shares that
+    header, with the usual add_* methods. When written, the bytes of the
+    header are replaced by the updated header, the new layers are inserted
+    before the end of the root element and every other byte is copied
+    through, so the cost does not depend on the size of the untouched
+    layers. With a document written by pynaf the result is the same as
+    loading it, adding the layers and writing it again, except that parts
+    the parser would normalize, like CDATA sections, are kept as they were.
+
+    Layers already in the original document cannot be extended. The
+    encoding of the document must be ASCII compatible.
+    """
+
+    def __init__(self, source, document_class=NAFDocument):
+        """ Read a document and parse its header.
+
+        :param source: The serialized document as bytes, a file name or a
+        file type object opened in binary mode.
+        :param document_class: The class whose constants define the format,
+        NAFDocument or KAFDocument.
+        """
+        if isinstance(source, bytes):
+            self.data = source
+        elif hasattr(source, "read"):
+            self.data = source.read()
+        else:
+            with open(source, "rb") as input_file:
+                self.data = input_file.read()
+        self.document_class = document_class
+        self.encoding = declared_encoding(self.data)
+        if "\x00".encode(self.encoding) != b"\x00":
+            raise ValueError(
+                "Encoding {0} is not ASCII compatible".format(self.encoding))
+
+        root_tag = document_class.KAF_TAG.encode("ascii")
+        root = re.compile(br"<" + root_tag + ATTRIBUTES + br">").search(
+            self.data)
+        if root is None:
+            raise ValueError("Root element {0} not found".format(
+                document_class.KAF_TAG))
+        self._end = self.data.rfind(b"</" + root_tag)
+        if self._end < root.end():
+            raise ValueError("End of the root element not found")
+
+        header_tag = document_class.KAF_HEADER_TAG.encode("ascii")
+        header = re.compile(
+            br"<" + header_tag + ATTRIBUTES + br"(/?)>").search(
+                self.data, root.end(), self._end)
+        self._header_found = header is not None
+        if header is None:
+            self._header_start = self._header_end = root.end()
+            header_element = None
+        else:
+            self._header_start = header.start()
+            if header.group(1):
+                self._header_end = header.end()
+            else:
+                close = b"</" + header_tag + b">"
+                self._header_end = self.data.index(close, header.end()) + \
+                    len(close)
+            header_element = etree.fromstring(self.data[
+                self._header_start:self._header_end].decode(self.encoding))
+        self.document = document_class(
+            header=header_element, encoding=self.encoding)
+
+    def add_linguistic_processors(self, *args, **kwargs):
+        """ Add a linguistic processor to the header, see
+        NAFDocument.add_linguistic_processors."""
+        self.document.add_linguistic_processors(*args, **kwargs)
+
+    def has_layer(self, layer_tag):
+        """ Tell if the original document has a layer.
+
+        :param layer_tag: The tag of the layer.
+        """
+        return re.search(
+            br"<" + layer_tag.encode("ascii") + br"[\s/>]",
+            self.data) is not None
+
+    def _new_layers(self):
+        """ Return the layers added to the document, rejecting the ones of
+        the original document."""
+        document = self.document
+        layers = []
+        for layer in document.root:
+            if layer is document.kaf_header:
+                continue
+            if layer is document.raw and not layer.text:
+                continue
+            if layer is document.text and not len(layer):
+                continue
+            if self.has_layer(layer.tag):
+                raise ValueError(
+                    "Layer {0} already in the document".format(layer.tag))
+            layers.append(layer)
+        return layers
+
+    def _serialize(self, element):
+        """ Serialize an element indented as a child of the root."""
+        etree.indent(element, INDENT, level=1)
+        element.tail = None
+        return etree.tostring(
+            element, encoding=self.encoding, xml_declaration=False)
+
+    def chunks(self):
+        """ Return the sequence of bytes of the result."""
+        data = self.data
+        layers = self._new_layers()
+        indent = INDENT.encode(self.encoding)
+        chunks = [data[:self._header_start]]
+        if not self._header_found:
+            chunks.append(b"\n" + indent)
+        chunks.append(self._serialize(self.document.kaf_header))
+        chunks.append(data[self._header_end:self._end])
+        for layer in layers:
+            chunks.append(indent)
+            chunks.append(self._serialize(layer))
+            chunks.append(b"\n")
+        chunks.append(data[self._end:])
+        return chunks
+
+    def to_string(self):
+        """ Return the result as bytes."""
+        return b"".join(self.chunks())
+
+    def write(self, output):
+        """ Write the result.
+
+        :param output: A file type object opened in binary mode, or a file
+        name.
+        """
+        if hasattr(output, "write"):
+            for chunk in self.chunks():
+                output.write(chunk)
+        else:
+            with open(output, "wb") as output_file:
+                self.write(output_file)
@@ -0,0 +1,219 @@
+from __future__ import unicode_literals
+
+"""Columnar views of NAF layers as NumPy structured arrays.
+
+Offsets and lengths are decoded once into integer fields, with -1 for the
+missing ones, and cross-layer references are stored as indexes into the
+arrays of the referenced layer, so span and offset arithmetic can be
+vectorized across whole documents. from_arrays builds back the same
+layers. Requires numpy.
+"""
+
+from collections import OrderedDict
+
+import numpy
+
+from pynaf import NAFDocument
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+MISSING = -1
+
+WORD_INTEGER_FIELDS = (("offset", numpy.int64), ("length", numpy.int64))
+# Sentence, paragraph and page ids are kept as text, as they need not be
+# numbers
+WORD_TEXT_FIELDS = ("sent", "para", "page")
+
+
+def _text_dtype(values):
+    """ Return a fixed width unicode dtype wide enough for the values."""
+    return "U{0}".format(max([len(value) for value in values] or [1]) or 1)
+
+
+def _integer(value):
+    """ Decode an optional numeric attribute."""
+    if value is None or value == "":
+        return MISSING
+    return int(value)
+
+
+def _word_fields(words):
+    """ Return the names of the optional word attributes, in the order they
+    have in the first word that has any, followed by the rest."""
+    names = [name for name, _ in WORD_INTEGER_FIELDS]
+    names.extend(WORD_TEXT_FIELDS)
+    for word in words:
+        present = [name for name in word.attrib if name in names]
+        if present:
+            return present + [name for name in names if name not in present]
+    return names
+
+
+def words_array(document):
+    """ Return the text layer as a structured array with the fields id,
+    form, offset, length, sent, para and page.
+
+    offset and length are integers, -1 if missing, and sent, para and page
+    text, empty if missing. The optional fields follow the order of the
+    attributes of the words, so from_arrays writes them in that order.
+
+    :param document: The NAFDocument whose words are wanted.
+    """
+    words = document.get_words()
+    integer_fields = dict(WORD_INTEGER_FIELDS)
+    fields = _word_fields(words)
+    columns = [
+        [word.get(document.WORD_ID_ATTRIBUTE) for word in words],
+        [word.text or "" for word in words]]
+    for name in fields:
+        if name in integer_fields:
+            columns.append([_integer(word.get(name)) for word in words])
+        else:
+            columns.append([word.get(name) or "" for word in words])
+    dtype = [("id", _text_dtype(columns[0])),
+             ("form", _text_dtype(columns[1]))]
+    dtype.extend(
+        (name, integer_fields[name]) if name in integer_fields
+        else (name, _text_dtype(column))
+        for name, column in zip(fields, columns[2:]))
+    array = numpy.empty(len(words), dtype=dtype)
+    for (name, _), column in zip(dtype, columns):
+        array[name] = column
+    return array
+
+
+def terms_array(document, words=None):
+    """ Return the terms layer as a structured array with the fields id,
+    lemma, pos, morphofeat, type, ner, word_start, word_end and span.
+
+    span holds the indexes in the words array of the term words, in order,
+    padded with -1 up to the longest span. word_start and word_end are the
+    half open range from the first to the last of them, for range
+    arithmetic; it covers the gaps of discontinuous spans. Terms without
+    span have -1 in both.
+
+    :param document: The NAFDocument whose terms are wanted.
+    :param words: The words array of the document, if already built.
+    """
+    if words is None:
+        words = words_array(document)
+    word_index = dict((wid, index) for index, wid in enumerate(words["id"]))
+    attribute_names = (
+        document.LEMMA_ATTRIBUTE, document.POS_ATTRIBUTE,
+        document.MORPHOFEAT_ATTRIBUTE, document.TYPE_ATTRIBUTE,
+        document.NER_ATTRIBUTE)
+    columns = [[] for _ in range(len(attribute_names) + 1)]
+    starts = []
+    ends = []
+    spans = []
+    for term in document.get_terms():
+        columns[0].append(term.get(document.TERM_ID_ATTRIBUTE))
+        for column, name in zip(columns[1:], attribute_names):
+            column.append(term.get(name) or "")
+        indexes = [
+            word_index[target.get(document.TARGET_ID_ATTRIBUTE)]
+            for target in document.get_terms_words(term)]
+        spans.append(indexes)
+        if indexes:
+            starts.append(min(indexes))
+            ends.append(max(indexes) + 1)
+        else:
+            starts.append(MISSING)
+            ends.append(MISSING)
+    width = max([len(span) for span in spans] or [1]) or 1
+    dtype = [(name, _text_dtype(column)) for name, column in zip(
+        ("id", "lemma", "pos", "morphofeat", "type", "ner"), columns)]
+    dtype.extend((("word_start", numpy.int64), ("word_end", numpy.int64),
+                  ("span", numpy.int64, (width,))))
+    array = numpy.empty(len(starts), dtype=dtype)
+    for (name, _), column in zip(dtype, columns):
+        array[name] = column
+    array["word_start"] = starts
+    array["word_end"] = ends
+    array["span"] = [span + [MISSING] * (width - len(span)) for span in spans]
+    return array
+
+
+def dependencies_array(document, terms=None):
+    """ Return the deps layer as a structured array with the fields head,
+    dependent and rfunc. head and dependent are indexes of the terms array.
+
+    :param document: The NAFDocument whose dependencies are wanted.
+    :param terms: The terms array of the document, if already built.
+    """
+    if terms is None:
+        terms = terms_array(document)
+    term_index = dict((tid, index) for index, tid in enumerate(terms["id"]))
+    dependencies = document.get_dependencies()
+    functions = [
+        dependency.get(document.DEPENDENCY_FUNCTION_ATTRIBUTE) or ""
+        for dependency in dependencies]
+    array = numpy.empty(len(dependencies), dtype=[
+        ("head", numpy.int64), ("dependent", numpy.int64),
+        ("rfunc", _text_dtype(functions))])
+    array["head"] = [
+        term_index[dependency.get(document.DEPENDENCY_FROM_ATTRIBUTE)]
+        for dependency in dependencies]
+    array["dependent"] = [
+        term_index[dependency.get(document.DEPENDENCY_TO_ATTRIBUTE)]
+        for dependency in dependencies]
+    array["rfunc"] = functions
+    return array
+
+
+def to_arrays(document):
+    """ Return the words, terms and dependencies arrays of a document.
+
+    :param document: The NAFDocument to convert.
+    """
+    words = words_array(document)
+    terms = terms_array(document, words)
+    return words, terms, dependencies_array(document, terms)
+
+
+def from_arrays(words, terms=None, dependencies=None,
+                document_class=NAFDocument, raw_text=None, **kwargs):
+    """ Build a document from the arrays produced by to_arrays. Its text,
+    terms and deps layers are the same as those of the converted document,
+    with the word attributes in the order of the fields of the words array
+    and the id last, as add_word writes them; on Python 2, where lxml sorts
+    the attributes of new elements, in alphabetical order. Values left out
+    are those the arrays mark as missing.
+
+    :param words: The words array.
+    :param terms: The terms array, optional.
+    :param dependencies: The dependencies array, optional.
+    :param document_class: The class of the document to build.
+    :param raw_text: The raw text of the document, optional.
+    :param kwargs: Arguments for the document constructor, like language.
+    """
+    document = document_class(**kwargs)
+    if raw_text is not None:
+        document.add_raw_text(raw_text)
+    integer_fields = dict(WORD_INTEGER_FIELDS)
+    columns = OrderedDict()
+    for name in words.dtype.names[2:]:
+        if name in integer_fields:
+            columns[name] = [None if value == MISSING else "{0}".format(value)
+                             for value in words[name].tolist()]
+        else:
+            columns[name] = [value or None for value in words[name].tolist()]
+    document.add_words(
+        words["form"].tolist(), words["id"].tolist(), **columns)
+    if terms is not None:
+        word_ids = words["id"].tolist()
+        spans = [[word_ids[index] for index in span if index != MISSING]
+                 for span in terms["span"].tolist()]
+        document.add_terms(
+            terms["id"].tolist(), pos=terms["pos"].tolist(),
+            lemma=terms["lemma"].tolist(),
+            morphofeat=terms["morphofeat"].tolist(),
+            term_type=terms["type"].tolist(), words=spans,
+            ner=terms["ner"].tolist())
+        if dependencies is not None:
+            term_ids = terms["id"]
+            document.add_dependencies(
+                term_ids[dependencies["head"]].tolist(),
+                term_ids[dependencies["dependent"]].tolist(),
+                dependencies["rfunc"].tolist())
+    return document
@@ -0,0 +1,198 @@
+from __future__ import unicode_literals
+
+"""Sidecar cache of parsed NAF files.
+
+The cache keeps, for each file, the document as parsed and re-serialized
+without formatting whitespace, together with a key made from the file
+modification time and size, or from its content, and whether the file was
+validated against its DTD. While the file does not change, later loads are
+built from the sidecar with a plain parser, skipping encoding conversion and
+blank text removal of the original. A load that asks for DTD validation only
+uses a sidecar stored by a validated load, so it runs the same checks as an
+uncached load; changes of the DTD itself are not noticed.
+
+The sidecar is XML, parsed again on each load, not a binary form of the
+layers: rebuilding the elements from a marshalled form through the lxml API
+measured about four times slower than letting libxml2 parse it.
+
+Reading the sidecar and checking its key has a fixed cost that small files do
+not pay back: on the included benchmark a warm load only gains from about 10k
+words, some 2 MB of NAF. Files under min_size bytes are therefore parsed
+directly, without writing or consulting a sidecar.
+"""
+
+import hashlib
+import os
+import tempfile
+from threading import local
+
+from lxml import etree
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+MAGIC = b"PYNAFC2\n"
+SUFFIX = ".nafc"
+MIN_SIZE = 1 << 21
+
+
+class DocumentCache(object):
+    """ A size bounded directory of sidecar files.
+
+    When the cache grows over max_size bytes the least recently used
+    sidecars are removed.
+    """
+
+    def __init__(self, directory, max_size=1 << 30, key="mtime",
+                 enabled=True, min_size=MIN_SIZE):
+        """ Prepare the cache.
+
+        :param directory: The directory where the sidecars are stored.
+        :param max_size: The maximum size of the cache in bytes.
+        :param key: How an unchanged file is recognized: "mtime" uses the
+        modification time and size of the file, "content" a hash of its
+        content.
+        :param enabled: If False every load is parsed from the file and
+        nothing is stored.
+        :param min_size: Files smaller than this number of bytes are always
+        parsed from the file and get no sidecar.
+        """
+        if key not in ("mtime", "content"):
+            raise ValueError("Unknown cache key {0}".format(key))
+        self.directory = directory
+        self.max_size = max_size
+        self.key = key
+        self.enabled = enabled
+        self.min_size = min_size
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._parsers = local()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _sidecar_parser(self):
+        """ Return the parser of the sidecars for the current thread."""
+        parser = getattr(self._parsers, "parser", None)
+        if parser is None:
+            parser = self._parsers.parser = etree.XMLParser(
+                remove_comments=False, collect_ids=False, huge_tree=True)
+        return parser
+
+    def _sidecar(self, file_name):
+        """ Return the sidecar path of a file."""
+        name = hashlib.sha1(
+            os.path.abspath(file_name).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + SUFFIX)
+
+    def _file_key(self, file_name):
+        """ Return the key that identifies the current state of a file."""
+        if self.key == "content":
+            digest = hashlib.sha1()
+            with open(file_name, "rb") as source:
+                for block in iter(lambda: source.read(1 << 20), b""):
+                    digest.update(block)
+            return digest.hexdigest().encode("ascii")
+        stat = os.stat(file_name)
+        return "{0!r}:{1}".format(
+            stat.st_mtime, stat.st_size).encode("ascii")
+
+    def parse(self, file_name, parser=None, dtd_validation=False):
+        """ Return the ElementTree of a file, from its sidecar if the file is
+        unchanged.
+
+        :param file_name: The path of the NAF file.
+        :param parser: The parser used when the file must be parsed.
+        :param dtd_validation: If the parser validates against the DTD. Only
+        sidecars of validated files are then used.
+        """
+        if not self.enabled or os.path.getsize(file_name) < self.min_size:
+            return etree.parse(file_name, parser)
+        key = self._file_key(file_name)
+        sidecar = self._sidecar(file_name)
+        try:
+            with open(sidecar, "rb") as cached:
+                data = cached.read()
+        except (IOError, OSError):
+            data = None
+        if data is not None:
+            for validated in (True, False) if not dtd_validation else (True,):
+                header = self._header(key, validated)
+                if data.startswith(header):
+                    self.hits += 1
+                    os.utime(sidecar, None)
+                    return etree.ElementTree(etree.fromstring(
+                        data[len(header):], self._sidecar_parser()))
+        self.misses += 1
+        tree = etree.parse(file_name, parser)
+        self._store(sidecar, self._header(key, dtd_validation) +
+                    etree.tostring(tree, encoding="utf-8"))
+        return tree
+
+    @staticmethod
+    def _header(key, validated):
+        """ Return the first line of a sidecar.
+
+        :param key: The key of the file.
+        :param validated: If the file was validated against its DTD.
+        """
+        return MAGIC + key + (b" dtd\n" if validated else b"\n")
+
+    def _store(self, sidecar, data):
+        """ Write a sidecar atomically and evict old ones if needed."""
+        descriptor, temporal = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(descriptor, "wb") as output:
+            output.write(data)
+        os.rename(temporal, sidecar)
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        else:
+            self._size += len(data)
+        if self._size > self.max_size:
+            self._evict()
+
+    def _entries(self):
+        """ Return (last use, size, path) of every sidecar."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        """ Remove the least recently used sidecars until the cache fits in
+        max_size."""
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+
+    def invalidate(self, file_name):
+        """ Remove the sidecar of a file.
+
+        :param file_name: The path of the NAF file.
+        """
+        try:
+            os.remove(self._sidecar(file_name))
+        except OSError:
+            pass
+        self._size = None
+
+    def clear(self):
+        """ Remove every sidecar."""
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._size = 0
@@ -0,0 +1,223 @@
+from __future__ import unicode_literals
+
+"""Navigation of the constituency trees of a NAF document. """
+
+from array import array
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+NO_NODE = -1
+YES = "yes"
+
+
+class ConstituencyTree(object):
+    """ A constituency tree materialized from its nt, t and edge elements.
+
+    Nodes are numbered in document order and their parent, head child,
+    depth and word span are kept in integer arrays, so navigation does not
+    search the document.
+    """
+
+    def __init__(self, document, tree, term_spans=None):
+        """ Build the tree in a single pass over the tree element.
+
+        :param document: The NAFDocument of the tree.
+        :param tree: The tree element.
+        :param term_spans: Dict of term id to the sorted word indexes of the
+        term. By default taken from the document span resolver.
+        """
+        if term_spans is None:
+            resolver = document.get_span_resolver()
+            term_spans = dict(
+                (tid, span.words) for tid, span in resolver.terms.items())
+        self.node_ids = []
+        self.labels = []
+        self.terminal_terms = []
+        edges = []
+        target_id = document.TARGET_ID_ATTRIBUTE
+        for element in tree:
+            tag = element.tag
+            if tag == document.CONSTITUENCY_NON_TERMINALS:
+                self.node_ids.append(
+                    element.get(document.CONSTITUENCY_ID_ATTRIBUTE))
+                self.labels.append(
+                    element.get(document.CONSTITUENCY_LABEL_ATTRIBUTE))
+                self.terminal_terms.append(())
+            elif tag == document.CONSTITUENCY_TERMINALS:
+                self.node_ids.append(
+                    element.get(document.CONSTITUENCY_ID_ATTRIBUTE))
+                self.labels.append(None)
+                self.terminal_terms.append(tuple(
+                    target.get(target_id) for target in
+                    document.get_constituent_terminal_words(element)))
+            elif tag == document.CONSTITUENCY_EDGES:
+                edges.append((
+                    element.get(document.CONSTITUENCY_EDGE_FORM_ATTRIBUTE),
+                    element.get(document.CONSTITUENCY_EDGE_TO_ATTRIBUTE),
+                    element.get(document.CHUNK_HEAD_ATTRIBUTE) == YES))
+        self.node_index = dict(
+            (node_id, index) for index, node_id in enumerate(self.node_ids))
+
+        size = len(self.node_ids)
+        node_index = self.node_index
+        self.parents = array("l", [NO_NODE]) * size
+        self.head_children = array("l", [NO_NODE]) * size
+        self.child_offsets = array("l", [0]) * (size + 1)
+        links = []
+        for child_id, parent_id, head in edges:
+            child = node_index[child_id]
+            parent = node_index[parent_id]
+            self.parents[child] = parent
+            if head:
+                self.head_children[parent] = child
+            links.append((parent, child))
+            self.child_offsets[parent + 1] += 1
+        for index in range(size):
+            self.child_offsets[index + 1] += self.child_offsets[index]
+        self.child_list = array("l", [0]) * len(links)
+        filled = array("l", self.child_offsets[:-1])
+        for parent, child in links:
+            self.child_list[filled[parent]] = child
+            filled[parent] += 1
+
+        self.depths = array("l", [NO_NODE]) * size
+        for start in range(size):
+            chain = []
+            seen = set()
+            index = start
+            while index != NO_NODE and self.depths[index] == NO_NODE \
+                    and index not in seen:
+                seen.add(index)
+                chain.append(index)
+                index = self.parents[index]
+            depth = 0 if index == NO_NODE or index in seen \
+                else self.depths[index] + 1
+            for index in reversed(chain):
+                self.depths[index] = depth
+                depth += 1
+
+        # Word spans, as half open ranges of word indexes, propagated from
+        # the terminals to the root. NO_NODE marks nodes without words.
+        self.span_starts = array("l", [NO_NODE]) * size
+        self.span_ends = array("l", [NO_NODE]) * size
+        for index, terms in enumerate(self.terminal_terms):
+            words = [word for tid in terms for word in term_spans[tid]]
+            if words:
+                self.span_starts[index] = min(words)
+                self.span_ends[index] = max(words) + 1
+        for index in sorted(range(size), key=self.depths.__getitem__,
+                            reverse=True):
+            parent = self.parents[index]
+            start = self.span_starts[index]
+            if parent == NO_NODE or start == NO_NODE:
+                continue
+            if self.span_starts[parent] == NO_NODE or \
+                    start < self.span_starts[parent]:
+                self.span_starts[parent] = start
+            if self.span_ends[index] > self.span_ends[parent]:
+                self.span_ends[parent] = self.span_ends[index]
+
+    def roots(self):
+        """ Return the ids of the nodes without parent."""
+        return [
+            node_id for node_id, parent in zip(self.node_ids, self.parents)
+            if parent == NO_NODE]
+
+    def label(self, node_id):
+        """ Return the label of a non terminal node, None for terminals.
+
+        :param node_id: The id of the node.
+        """
+        return self.labels[self.node_index[node_id]]
+
+    def is_terminal(self, node_id):
+        """ Tell if a node is a terminal.
+
+        :param node_id: The id of the node.
+        """
+        return self.labels[self.node_index[node_id]] is None
+
+    def terms(self, node_id):
+        """ Return the term ids of a terminal node.
+
+        :param node_id: The id of the node.
+        """
+        return self.terminal_terms[self.node_index[node_id]]
+
+    def parent(self, node_id):
+        """ Return the id of the parent of a node, or None for a root.
+
+        :param node_id: The id of the node.
+        """
+        parent = self.parents[self.node_index[node_id]]
+        return None if parent == NO_NODE else self.node_ids[parent]
+
+    def children(self, node_id):
+        """ Return the ids of the children of a node.
+
+        :param node_id: The id of the node.
+        """
+        index = self.node_index[node_id]
+        return [self.node_ids[child] for child in self.child_list[
+            self.child_offsets[index]:self.child_offsets[index + 1]]]
+
+    def head(self, node_id):
+        """ Return the id of the head child of a node, or None.
+
+        :param node_id: The id of the node.
+        """
+        head = self.head_children[self.node_index[node_id]]
+        return None if head == NO_NODE else self.node_ids[head]
+
+    def head_terminal(self, node_id):
+        """ Follow the head children down to a terminal and return its id,
+        or None if the chain of heads is broken.
+
+        :param node_id: The id of the node.
+        """
+        index = self.node_index[node_id]
+        for _ in self.node_ids:
+            if self.labels[index] is None:
+                return self.node_ids[index]
+            index = self.head_children[index]
+            if index == NO_NODE:
+                return None
+        return None
+
+    def span(self, node_id):
+        """ Return the half open range of word indexes covered by a node, or
+        None if it covers no words.
+
+        :param node_id: The id of the node.
+        """
+        index = self.node_index[node_id]
+        if self.span_starts[index] == NO_NODE:
+            return None
+        return self.span_starts[index], self.span_ends[index]
+
+    def spans(self):
+        """ Yield (node id, label, word span) for every node."""
+        for node_id in self.node_ids:
+            yield node_id, self.label(node_id), self.span(node_id)
+
+    def lowest_common_ancestor(self, first_id, second_id):
+        """ Return the id of the lowest common ancestor of two nodes, or
+        None if they are in different trees.
+
+        :param first_id: The id of the first node.
+        :param second_id: The id of the second node.
+        """
+        first = self.node_index[first_id]
+        second = self.node_index[second_id]
+        parents = self.parents
+        depths = self.depths
+        while depths[first] > depths[second]:
+            first = parents[first]
+        while depths[second] > depths[first]:
+            second = parents[second]
+        while first != second:
+            if depths[first] == 0:
+                return None
+            first = parents[first]
+            second = parents[second]
+        return self.node_ids[first]
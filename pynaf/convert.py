@@ -0,0 +1,322 @@
+from __future__ import unicode_literals
+
+"""Streaming conversion between the KAF and NAF formats. """
+
+import os
+import traceback
+from collections import OrderedDict
+from multiprocessing import Pool, cpu_count
+
+from lxml import etree
+
+from pynaf import KAFDocument, NAFDocument
+from pynaf.corpus import DocumentResult, _chunks, apply_in_order, \
+    output_path
+from pynaf.stream import XML_NAMESPACE
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+# The document class constants that are element tags
+TAGS = (
+    "KAF_TAG", "KAF_HEADER_TAG", "LINGUISTIC_PROCESSOR_HEAD",
+    "LINGUISTIC_PROCESSOR_OCCURRENCE_TAG", "RAW_LAYER_TAG", "TEXT_LAYER_TAG",
+    "WORD_OCCURRENCE_TAG", "TERMS_LAYER_TAG", "TERM_OCCURRENCE_TAG",
+    "CHUNKS_LAYER_TAG", "CHUNK_OCCURRENCE_TAG", "CONSTITUENCY_LAYER",
+    "CONSTITUENCY_TREE_TAG", "CONSTITUENCY_NON_TERMINALS",
+    "CONSTITUENCY_TERMINALS", "CONSTITUENCY_EDGES", "DEPENDENCY_LAYER_TAG",
+    "DEPENDENCY_OCCURRENCE_TAG", "COREFERENCE_LAYER_TAG",
+    "COREFERENCE_OCCURRENCE_TAG", "NAMED_ENTITIES_LAYER_TAG",
+    "NAMED_ENTITY_OCCURRENCE_TAG", "NAMED_ENTITY_REFERENCES_GROUP_TAG",
+    "SPAN_TAG", "TARGET_TAG", "EXTERNAL_REFERENCE_OCCURRENCE_TAG",
+    "EXTERNAL_REFERENCES_TAG",
+)
+# The document class constants that are attributes, with the constant of
+# the tag of the elements that have them
+ATTRIBUTES = (
+    ("KAF_TAG", "LANGUAGE_ATTRIBUTE"), ("KAF_TAG", "VERSION_ATTRIBUTE"),
+    ("LINGUISTIC_PROCESSOR_HEAD", "LAYER_ATTRIBUTE"),
+    ("LINGUISTIC_PROCESSOR_OCCURRENCE_TAG", "NAME_ATTRIBUTE"),
+    ("LINGUISTIC_PROCESSOR_OCCURRENCE_TAG", "VERSION_ATTRIBUTE"),
+    ("LINGUISTIC_PROCESSOR_OCCURRENCE_TAG", "BEGIN_TIMESTAMP_ATTRIBUTE"),
+    ("LINGUISTIC_PROCESSOR_OCCURRENCE_TAG", "END_TIMESTAMP_ATTRIBUTE"),
+    ("LINGUISTIC_PROCESSOR_OCCURRENCE_TAG", "HOSTNAME_ATTRIBUTE"),
+    ("WORD_OCCURRENCE_TAG", "WORD_ID_ATTRIBUTE"),
+    ("TERM_OCCURRENCE_TAG", "TERM_ID_ATTRIBUTE"),
+    ("TERM_OCCURRENCE_TAG", "NER_ATTRIBUTE"),
+    ("TERM_OCCURRENCE_TAG", "TYPE_ATTRIBUTE"),
+    ("TERM_OCCURRENCE_TAG", "LEMMA_ATTRIBUTE"),
+    ("TERM_OCCURRENCE_TAG", "POS_ATTRIBUTE"),
+    ("TERM_OCCURRENCE_TAG", "MORPHOFEAT_ATTRIBUTE"),
+    ("CHUNK_OCCURRENCE_TAG", "CHUNK_CASE_ATTRIBUTE"),
+    ("CHUNK_OCCURRENCE_TAG", "CHUNK_PHRASE_ATTRIBUTE"),
+    ("CHUNK_OCCURRENCE_TAG", "CHUNK_HEAD_ATTRIBUTE"),
+    ("CHUNK_OCCURRENCE_TAG", "CHUNK_ID_ATTRIBUTE"),
+    ("CONSTITUENCY_NON_TERMINALS", "CONSTITUENCY_ID_ATTRIBUTE"),
+    ("CONSTITUENCY_NON_TERMINALS", "CONSTITUENCY_LABEL_ATTRIBUTE"),
+    ("CONSTITUENCY_TERMINALS", "CONSTITUENCY_ID_ATTRIBUTE"),
+    ("CONSTITUENCY_EDGES", "CONSTITUENCY_EDGE_ID_ATTRIBUTE"),
+    ("CONSTITUENCY_EDGES", "CONSTITUENCY_EDGE_FORM_ATTRIBUTE"),
+    ("CONSTITUENCY_EDGES", "CONSTITUENCY_EDGE_TO_ATTRIBUTE"),
+    ("DEPENDENCY_OCCURRENCE_TAG", "DEPENDENCY_FROM_ATTRIBUTE"),
+    ("DEPENDENCY_OCCURRENCE_TAG", "DEPENDENCY_FUNCTION_ATTRIBUTE"),
+    ("DEPENDENCY_OCCURRENCE_TAG", "DEPENDENCY_TO_ATTRIBUTE"),
+    ("COREFERENCE_OCCURRENCE_TAG", "COREFERENCE_ID_ATTRIBUTE"),
+    ("NAMED_ENTITY_OCCURRENCE_TAG", "NAMED_ENTITY_ID_ATTRIBUTE"),
+    ("NAMED_ENTITY_OCCURRENCE_TAG", "NAMED_ENTITY_TYPE_ATTRIBUTE"),
+    ("TARGET_TAG", "TARGET_ID_ATTRIBUTE"),
+    ("TARGET_TAG", "TARGET_HEAD_ATTRIBUTE"),
+)
+
+
+class Converter(object):
+    """ Rewrite documents of one format in another, renaming the tags and
+    attributes whose constants differ between the two document classes.
+
+    Documents are read with iterparse and written with an incremental
+    writer: each element of a layer is renamed, written and released as
+    soon as it is parsed, so the memory used does not grow with the size of
+    the layers. Only the header and layers without child elements, like
+    the raw text, are kept whole. Whitespace inside the elements, comments
+    and the order of the attributes of the source are kept. The result is
+    the document pynaf would write in the other format, but not always the
+    same bytes: on Python 2 pynaf gives the attributes of the elements it
+    creates in arbitrary order.
+    """
+
+    def __init__(self, source_class=KAFDocument, target_class=NAFDocument):
+        """ Build the renaming tables.
+
+        :param source_class: The class of the documents read, KAFDocument
+        or NAFDocument.
+        :param target_class: The class of the documents written.
+        """
+        self.source_class = source_class
+        self.target_class = target_class
+        self.tags = {}
+        for name in TAGS:
+            source = getattr(source_class, name)
+            target = getattr(target_class, name)
+            if source != target:
+                self.tags[source] = target
+        # Source tag to a map of source attribute to target attribute
+        self.attributes = {}
+        for tag_name, name in ATTRIBUTES:
+            source = getattr(source_class, name)
+            target = getattr(target_class, name)
+            if source != target:
+                self.attributes.setdefault(
+                    getattr(source_class, tag_name), {})[source] = target
+        # Only the elements with these tags are visited when renaming
+        self.renamed_tags = tuple(set(self.tags) | set(self.attributes))
+        self.raw_tag = target_class.RAW_LAYER_TAG
+
+    def rename(self, element):
+        """ Rename in place the tags and attributes of an element and its
+        descendants.
+
+        :param element: The element of the source format.
+        """
+        if not self.renamed_tags:
+            return
+        tags = self.tags
+        attributes = self.attributes
+        for descendant in element.iter(*self.renamed_tags):
+            tag = descendant.tag
+            renames = attributes.get(tag)
+            if renames is not None and any(
+                    name in renames for name in descendant.attrib):
+                items = descendant.attrib.items()
+                descendant.attrib.clear()
+                for name, value in items:
+                    descendant.set(renames.get(name, name), value)
+            if tag in tags:
+                descendant.tag = tags[tag]
+
+    def _start(self, element):
+        """ Return the renamed tag and attributes of an element that is
+        written before its content is parsed."""
+        renames = self.attributes.get(element.tag, {})
+        # lxml incremental writer does not map the xml namespace to its
+        # reserved prefix, so it is given by hand.
+        attributes = OrderedDict(
+            (renames.get(name, name).replace(XML_NAMESPACE, "xml:"), value)
+            for name, value in element.attrib.items())
+        return self.tags.get(element.tag, element.tag), attributes
+
+    def convert(self, source, output, encoding="utf-8", huge_tree=True):
+        """ Convert a document.
+
+        :param source: A file name or a file type object opened in binary
+        mode.
+        :param output: A file type object opened in binary mode.
+        :param encoding: The encoding of the output.
+        :param huge_tree: Allow text nodes bigger than the lxml limits, needed
+        for the raw layer of very big documents.
+        """
+        with etree.xmlfile(output, encoding=encoding) as xml_file:
+            if encoding.upper() not in ("ASCII", "UTF-8", "UTF8", "US-ASCII"):
+                xml_file.write_declaration()
+            self._write(source, xml_file, huge_tree)
+        output.write(b"\n")
+
+    def _write(self, source, xml_file, huge_tree):
+        """ Parse the source and write its converted elements."""
+        depth = 0
+        root = None
+        root_writer = None
+        layer = None
+        layer_writer = None
+        for event, element in etree.iterparse(
+                source, events=("start", "end", "comment"),
+                remove_comments=False, huge_tree=huge_tree):
+            if event == "comment":
+                if depth in (1, 2):
+                    if depth == 2 and layer_writer is None:
+                        layer_writer = self._open_layer(xml_file, layer)
+                    xml_file.write("\n" + "  " * depth, element,
+                                   with_tail=False)
+                continue
+            if event == "start":
+                if depth == 0:
+                    root = element
+                    root_writer = xml_file.element(*self._start(element))
+                    root_writer.__enter__()
+                elif depth == 1:
+                    layer = element
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 2:
+                if layer_writer is None:
+                    layer_writer = self._open_layer(xml_file, layer)
+                self.rename(element)
+                xml_file.write("\n    ", element, with_tail=False)
+                element.clear()
+                while element.getprevious() is not None:
+                    del layer[0]
+            elif depth == 1:
+                if layer_writer is None:
+                    self.rename(element)
+                    if element.tag == self.raw_tag and element.text:
+                        element.text = etree.CDATA(element.text)
+                    xml_file.write("\n  ", element, with_tail=False)
+                else:
+                    xml_file.write("\n  ")
+                    layer_writer.__exit__(None, None, None)
+                    layer_writer = None
+                # The parser may still add the tail of the element, so only
+                # the previous ones are removed
+                element.clear()
+                while element.getprevious() is not None:
+                    del root[0]
+                layer = None
+            elif depth == 0:
+                xml_file.write("\n")
+                root_writer.__exit__(None, None, None)
+
+    def _open_layer(self, xml_file, layer):
+        """ Write the start of a layer and return its writer."""
+        xml_file.write("\n  ")
+        writer = xml_file.element(*self._start(layer))
+        writer.__enter__()
+        return writer
+
+
+def convert(source, output, source_class=KAFDocument,
+            target_class=NAFDocument, encoding="utf-8"):
+    """ Convert a document between formats with constant memory.
+
+    :param source: A file name or a file type object opened in binary
+    mode.
+    :param output: A file name or a file type object opened in binary mode.
+    :param source_class: The class of the source format, KAFDocument or
+    NAFDocument.
+    :param target_class: The class of the output format.
+    :param encoding: The encoding of the output.
+    """
+    converter = Converter(source_class, target_class)
+    if hasattr(output, "write"):
+        converter.convert(source, output, encoding)
+    else:
+        with open(output, "wb") as output_file:
+            converter.convert(source, output_file, encoding)
+
+
+def _convert_chunk(paths, input_directory, output_directory, extension,
+                   source_class, target_class, encoding):
+    """ Convert the files of a chunk and catch the errors of each file
+    separately."""
+    converter = Converter(source_class, target_class)
+    results = []
+    for path in paths:
+        written = None
+        try:
+            written = output_path(
+                output_directory, input_directory, path, extension)
+            directory = os.path.dirname(written)
+            if directory and not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError:
+                    if not os.path.isdir(directory):
+                        raise
+            with open(written, "wb") as output:
+                converter.convert(path, output, encoding)
+            results.append(DocumentResult(path, written, None))
+        except Exception:
+            results.append(DocumentResult(path, None, traceback.format_exc()))
+            # Do not leave half written files
+            if written is not None and os.path.exists(written):
+                os.remove(written)
+    return results
+
+
+def convert_corpus(paths, input_directory, output_directory,
+                   source_class=KAFDocument, target_class=NAFDocument,
+                   processes=None, chunksize=16, encoding="utf-8",
+                   max_pending=None):
+    """ Convert the files of a corpus in a pool of processes and yield a
+    DocumentResult for each one, in order, with the path of
+    the written file as value.
+
+    Each file is written in output_directory at the same relative path,
+    with the extension of the target format, like .naf; a file outside
+    input_directory is an error of its own. As in
+    pynaf.corpus.run, no more than max_pending chunks are in flight, so
+    corpora of any size are converted in bounded memory.
+
+    :param paths: An iterable of file paths.
+    :param input_directory: The common root of the paths.
+    :param output_directory: The directory where the files are written.
+    :param source_class: The class of the source format, KAFDocument or
+    NAFDocument.
+    :param target_class: The class of the output format.
+    :param processes: Number of worker processes. By default the number of
+    CPUs.
+    :param chunksize: Number of files sent to a worker at once.
+    :param encoding: The encoding of the output files.
+    :param max_pending: Maximum chunks in flight. By default twice the
+    number of processes.
+    """
+    extension = "." + target_class.KAF_TAG.lower()
+
+    def tasks():
+        for chunk in _chunks(paths, chunksize):
+            yield chunk, (chunk, input_directory, output_directory, extension,
+                          source_class, target_class, encoding)
+
+    if processes == 1:
+        for _, arguments in tasks():
+            for result in _convert_chunk(*arguments):
+                yield result
+        return
+    processes = processes or cpu_count()
+    pool = Pool(processes)
+    try:
+        for result in apply_in_order(
+                pool, _convert_chunk, tasks(), max_pending or processes * 2):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
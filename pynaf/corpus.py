@@ -0,0 +1,328 @@
+from __future__ import unicode_literals
+
+"""Apply a function over a corpus of NAF files with a pool of processes. """
+
+import fnmatch
+import os
+import pickle
+import sys
+import traceback
+from collections import deque, namedtuple
+from importlib import import_module
+from multiprocessing import Pool, cpu_count
+from multiprocessing.pool import ThreadPool
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+from pynaf import NAFDocument
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+_HAS_ERROR_CALLBACK = sys.version_info[0] > 2
+
+
+DocumentResult = namedtuple("DocumentResult", ("path", "value", "error"))
+""" The outcome of a document: the value returned by the function, or the
+formatted traceback in error if the document failed."""
+
+
+def find_files(directory, pattern="*.naf"):
+    """ Yield the files of a directory tree whose name matches a pattern.
+
+    :param directory: The root of the corpus.
+    :param pattern: A shell style file name pattern.
+    """
+    for path, directories, files in os.walk(directory):
+        directories.sort()
+        for name in sorted(fnmatch.filter(files, pattern)):
+            yield os.path.join(path, name)
+
+
+def load_function(name):
+    """ Import a function given as "package.module:function".
+
+    :param name: The function import path.
+    """
+    module_name, _, function_name = name.partition(":")
+    if not function_name:
+        raise ValueError("Function must be given as module:function")
+    return getattr(import_module(module_name), function_name)
+
+
+def imap_in_order(pool, function, items, max_pending):
+    """ Apply a function in a pool to each item and yield the results in
+    the order of the items, like pool.imap, but with no more than
+    max_pending items in flight, so a slow consumer stops the reading of
+    the items instead of piling results up in memory. The error of an item
+    is raised when its result is reached.
+
+    :param pool: A multiprocessing or thread pool.
+    :param function: The function applied in the pool.
+    :param items: An iterable of arguments of the function.
+    :param max_pending: Maximum items in flight.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(pool.apply_async(function, (item,)))
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def load_documents(file_names, threads=None, document_class=NAFDocument,
+                   max_pending=None, **kwargs):
+    """ Load many documents with a pool of threads and yield them in order.
+
+    lxml releases the GIL while parsing and each thread uses its own parser,
+    so parsing scales with the threads. No more than max_pending documents
+    are loaded ahead of the consumer. Errors are raised when the failed
+    document is reached.
+
+    :param file_names: An iterable of NAF file paths.
+    :param threads: Number of threads. By default the number of CPUs.
+    :param document_class: NAFDocument or KAFDocument.
+    :param max_pending: Maximum documents loading or loaded and not yet
+    yielded. By default twice the number of threads.
+    :param kwargs: Arguments for the document constructor, like
+    dtd_validation or cache.
+    """
+    def load(file_name):
+        return document_class(file_name=file_name, **kwargs)
+
+    threads = threads or cpu_count()
+    pool = ThreadPool(threads)
+    try:
+        for document in imap_in_order(
+                pool, load, file_names, max_pending or threads * 2):
+            yield document
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def output_path(output_directory, input_directory, path, extension=None):
+    """ Return the path where the output of a corpus file is written: its
+    path relative to the input directory, under the output directory.
+
+    ValueError is raised for a file outside the input directory, whose
+    output would be written outside the output directory.
+    :param output_directory: The directory of the outputs.
+    :param input_directory: The common root of the corpus files.
+    :param path: The corpus file.
+    :param extension: The extension of the output, like ".naf". By default
+    that of the file.
+    """
+    relative = os.path.relpath(path, input_directory)
+    if os.path.isabs(relative) or relative == os.pardir or \
+            relative.startswith(os.pardir + os.sep):
+        raise ValueError("{0} is not under the input directory {1}".format(
+            path, input_directory))
+    if extension is not None:
+        relative = os.path.splitext(relative)[0] + extension
+    return os.path.join(output_directory, relative)
+
+
+def _initialize_worker(memory_limit):
+    """ Set the address space limit of a worker process.
+
+    :param memory_limit: The limit in bytes, or None.
+    """
+    if memory_limit:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+def _process_chunk(function, paths, options):
+    """ Apply the function to each document of a chunk and catch the
+    errors of each document separately.
+
+    :param function: The function to apply to each document.
+    :param paths: The files of the chunk.
+    :param options: Dict with document_class, encoding, input_directory and
+    output_directory.
+    """
+    results = []
+    for path in paths:
+        try:
+            document = options["document_class"](file_name=path)
+            value = function(document)
+            if options["output_directory"]:
+                document_path = output_path(
+                    options["output_directory"],
+                    options["input_directory"], path)
+                output_directory = os.path.dirname(document_path)
+                if not os.path.isdir(output_directory):
+                    try:
+                        os.makedirs(output_directory)
+                    except OSError:
+                        if not os.path.isdir(output_directory):
+                            raise
+                with open(document_path, "wb") as output:
+                    document.write(output, options["encoding"])
+            # A value that cannot go back to the parent fails its document
+            # here instead of the whole chunk in the pool
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            results.append(DocumentResult(path, value, None))
+        except Exception:
+            results.append(DocumentResult(path, None, traceback.format_exc()))
+    return results
+
+
+def _failed_chunk(paths, error):
+    """ Return an error result for each document of a chunk that failed as
+    a whole, for instance because its task could not be pickled.
+
+    :param paths: The files of the chunk.
+    :param error: The exception raised by the pool.
+    """
+    message = "".join(traceback.format_exception_only(type(error), error))
+    return [DocumentResult(path, None, message) for path in paths]
+
+
+def _chunks(iterable, size):
+    """ Split an iterable in lists of a given size."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def apply_in_order(pool, function, tasks, max_pending):
+    """ Apply a function in a pool to the arguments of each task and yield
+    the DocumentResult lists it returns, in the order of the tasks.
+
+    No more than max_pending tasks are in flight: the next one is sent
+    only when the oldest is collected, so a slow consumer stops the
+    reading of the tasks instead of piling results up in memory. A task
+    that fails as a whole gives an error result for each of its paths.
+
+    :param pool: A multiprocessing pool.
+    :param function: The function applied in the pool.
+    :param tasks: An iterable of (paths, arguments) pairs.
+    :param max_pending: Maximum tasks in flight.
+    """
+    pending = deque()
+
+    def collect():
+        paths, result = pending.popleft()
+        try:
+            return result.get()
+        except Exception as error:
+            return _failed_chunk(paths, error)
+
+    for paths, arguments in tasks:
+        pending.append((paths, pool.apply_async(function, arguments)))
+        if len(pending) >= max_pending:
+            for result in collect():
+                yield result
+    while pending:
+        for result in collect():
+            yield result
+
+
+def _error_callback(finished, chunk):
+    """ Return the apply_async argument that puts the error results of a
+    failed chunk in the finished queue, so the runner does not wait for it
+    forever. Python 2 pools have no error_callback; there every failure
+    inside a chunk is already caught by _process_chunk.
+
+    :param finished: The queue of finished chunks.
+    :param chunk: The files of the chunk.
+    """
+    if _HAS_ERROR_CALLBACK:
+        return {"error_callback":
+                lambda error: finished.put(_failed_chunk(chunk, error))}
+    return {}
+
+
+def _apply_unordered(pool, function, paths, chunksize, options,
+                     max_pending):
+    """ Process the chunks of a corpus in a pool and yield their results as
+    the chunks finish, with no more than max_pending chunks in flight. See
+    run."""
+    finished = Queue()
+    in_flight = 0
+    for chunk in _chunks(paths, chunksize):
+        pool.apply_async(
+            _process_chunk, (function, chunk, options),
+            callback=finished.put, **_error_callback(finished, chunk))
+        in_flight += 1
+        if in_flight >= max_pending:
+            in_flight -= 1
+            for result in finished.get():
+                yield result
+    while in_flight:
+        in_flight -= 1
+        for result in finished.get():
+            yield result
+
+
+def run(function, paths, input_directory=None, output_directory=None,
+        processes=None, chunksize=16, ordered=False, max_pending=None,
+        maxtasksperchild=None, memory_limit=None,
+        document_class=NAFDocument, encoding="utf-8"):
+    """ Apply a function to each document of a corpus in a pool of processes
+    and yield a DocumentResult for each document.
+
+    Paths are sent to the workers in chunks, and no more than max_pending
+    chunks are in flight, so a slow consumer of the results stops the
+    reading of the corpus instead of piling results up in memory.
+
+    :param function: A picklable (module level) function that receives a
+    document. Its return value is given in the result; a value that cannot
+    be pickled is an error of its document. An unpicklable function fails
+    with the pickling error before any document is processed.
+    :param paths: An iterable of NAF file paths.
+    :param input_directory: The common root of the paths, used to place the
+    output files. By default the current directory. With an
+    output_directory, a path outside it is an error of its document.
+    :param output_directory: If given, each document is written there after
+    the function is applied.
+    :param processes: Number of worker processes. By default the number of
+    CPUs.
+    :param chunksize: Number of documents sent to a worker at once.
+    :param ordered: Yield the results in the order of the paths.
+    :param max_pending: Maximum chunks in flight. By default twice the
+    number of processes.
+    :param maxtasksperchild: Chunks processed by a worker before it is
+    replaced by a new one.
+    :param memory_limit: Address space limit of each worker in bytes.
+    Documents that exceed it fail with a MemoryError.
+    :param document_class: NAFDocument or KAFDocument.
+    :param encoding: The encoding of the output files.
+    """
+    processes = processes or cpu_count()
+    max_pending = max_pending or processes * 2
+    options = {
+        "document_class": document_class,
+        "encoding": encoding,
+        "input_directory": input_directory or os.curdir,
+        "output_directory": output_directory,
+    }
+    # Fail now, instead of in the pool, if a task could not be sent
+    pickle.dumps((function, options), pickle.HIGHEST_PROTOCOL)
+    pool = Pool(processes, _initialize_worker, (memory_limit,),
+                maxtasksperchild)
+    try:
+        if ordered:
+            for result in apply_in_order(pool, _process_chunk, (
+                    (chunk, (function, chunk, options))
+                    for chunk in _chunks(paths, chunksize)), max_pending):
+                yield result
+        else:
+            for result in _apply_unordered(
+                    pool, function, paths, chunksize, options, max_pending):
+                yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
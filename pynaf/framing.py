@@ -0,0 +1,269 @@
+from __future__ import unicode_literals
+
+"""A framed stream of many NAF documents, for long lived worker processes.
+
+Each frame is a header line followed by its payload:
+
+    <kind> <length> <name>\\n<payload>
+
+kind is D for a serialized document and E for the error message of a
+document that failed in an earlier stage, length is the size of the payload
+in bytes and name, that may be empty, identifies the document. Workers pass
+error frames through untouched, so a pipeline gives a frame for each
+document it was fed.
+"""
+
+import os
+import subprocess
+import sys
+import traceback
+from collections import namedtuple
+from contextlib import contextmanager
+from threading import Thread
+
+from pynaf import NAFDocument
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+DOCUMENT = "D"
+ERROR = "E"
+
+
+class Frame(namedtuple("Frame", ("kind", "name", "data"))):
+    """ A document or error of a stream. data is the payload as bytes."""
+    __slots__ = ()
+
+    def load(self, document_class=NAFDocument, **kwargs):
+        """ Parse the document of a document frame.
+
+        :param document_class: NAFDocument or KAFDocument.
+        :param kwargs: Other arguments of the document class.
+        """
+        if self.kind != DOCUMENT:
+            raise ValueError("Frame {0} is an error: {1}".format(
+                self.name, self.data.decode("utf-8", "replace")))
+        return document_class(input_stream=self.data, **kwargs)
+
+
+def binary_stream(stream):
+    """ Return the binary buffer of a text stream like sys.stdin, or the
+    stream itself."""
+    return getattr(stream, "buffer", stream)
+
+
+class FrameReader(object):
+    """ Read the frames of a binary stream one by one."""
+
+    def __init__(self, stream):
+        """ Prepare the reader.
+
+        :param stream: A binary file type object.
+        """
+        self.stream = stream
+
+    def read(self):
+        """ Return the next frame, or None at the end of the stream."""
+        line = self.stream.readline()
+        if not line:
+            return None
+        try:
+            kind, length, name = line.rstrip(b"\n").decode(
+                "utf-8").split(" ", 2)
+            length = int(length)
+        except ValueError:
+            raise ValueError("Malformed frame header {0!r}".format(line))
+        if kind not in (DOCUMENT, ERROR):
+            raise ValueError("Unknown frame kind {0}".format(kind))
+        data = self.stream.read(length)
+        if len(data) != length:
+            raise ValueError("Truncated frame {0}".format(name))
+        return Frame(kind, name, data)
+
+    def __iter__(self):
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+
+class FrameWriter(object):
+    """ Write frames to a binary stream, flushing after each one so the
+    next stage can start on it."""
+
+    def __init__(self, stream, encoding="utf-8", pretty_print=False):
+        """ Prepare the writer.
+
+        :param stream: A binary file type object.
+        :param encoding: The encoding of the written documents.
+        :param pretty_print: Indent the written documents.
+        """
+        self.stream = stream
+        self.encoding = encoding
+        self.pretty_print = pretty_print
+
+    def write(self, frame):
+        """ Write a frame.
+
+        :param frame: The Frame to write.
+        """
+        if "\n" in frame.name:
+            raise ValueError("Frame names cannot contain new lines")
+        self.stream.write("{0} {1} {2}\n".format(
+            frame.kind, len(frame.data), frame.name).encode("utf-8"))
+        self.stream.write(frame.data)
+        self.stream.flush()
+
+    def write_document(self, document, name=""):
+        """ Write a document frame.
+
+        :param document: The NAFDocument to write.
+        :param name: The name of the document.
+        """
+        self.write(Frame(DOCUMENT, name, document.to_string(
+            self.encoding, pretty_print=self.pretty_print)))
+
+    def write_error(self, message, name=""):
+        """ Write an error frame.
+
+        :param message: The description of the error.
+        :param name: The name of the failed document.
+        """
+        self.write(Frame(ERROR, name, message.encode("utf-8")))
+
+
+@contextmanager
+def _standard_output_frames():
+    """ Give a binary stream on the original standard output for the frames
+    and send everything else written to the standard output, like the
+    prints of the served function or of a library it calls, to the standard
+    error while serving. Both are restored at the end.
+    """
+    sys.stdout.flush()
+    frames_fd = os.dup(sys.stdout.fileno())
+    standard_output_fd = os.dup(sys.stdout.fileno())
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    standard_output = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        with os.fdopen(frames_fd, "wb") as stream:
+            yield stream
+    finally:
+        sys.stdout = standard_output
+        sys.stdout.flush()
+        os.dup2(standard_output_fd, sys.stdout.fileno())
+        os.close(standard_output_fd)
+
+
+def serve(function, input_stream=None, output_stream=None,
+          document_class=NAFDocument, encoding="utf-8"):
+    """ Apply a function to each document of a framed stream and write the
+    results to another, until the input ends.
+
+    A document whose load or function fails is replaced by an error frame
+    with the traceback, and error frames are copied through. Returns the
+    number of frames processed.
+
+    :param function: A function that receives each document and modifies
+    it; its return value is ignored.
+    :param input_stream: The binary input, by default the standard input.
+    :param output_stream: The binary output, by default the standard
+    output. Frames then go to the original standard output and anything
+    else printed while serving goes to the standard error, so it cannot
+    break the stream.
+    :param document_class: NAFDocument or KAFDocument.
+    :param encoding: The encoding of the written documents.
+    """
+    if output_stream is None:
+        with _standard_output_frames() as output_stream:
+            return serve(function, input_stream, output_stream,
+                         document_class, encoding)
+    reader = FrameReader(input_stream or binary_stream(sys.stdin))
+    writer = FrameWriter(output_stream, encoding)
+    count = 0
+    for frame in reader:
+        count += 1
+        if frame.kind == ERROR:
+            writer.write(frame)
+            continue
+        try:
+            document = frame.load(document_class)
+            function(document)
+        except Exception:
+            writer.write_error(traceback.format_exc(), frame.name)
+        else:
+            writer.write_document(document, frame.name)
+    return count
+
+
+def worker_command(function, document_class=NAFDocument, encoding="utf-8"):
+    """ Return the command line of a worker process that serves a function.
+
+    :param function: The function as module:function.
+    :param document_class: NAFDocument or KAFDocument.
+    :param encoding: The encoding of the written documents.
+    """
+    command = [sys.executable, "-m", "pynaf"]
+    if document_class.KAF_TAG != NAFDocument.KAF_TAG:
+        command.append("--kaf")
+    return command + ["--encoding", encoding, "worker", function]
+
+
+def run_pipeline(commands, frames):
+    """ Connect worker processes in a pipeline, feed it frames and yield
+    the frames that come out of the last worker, one per frame fed.
+
+    An error raised by the frames iterable, like an unreadable input file,
+    ends the feed and is raised again once the frames fed so far are out.
+    Each worker reads its standard input and writes its standard output
+    as framed streams, and is started once for all the documents.
+
+    :param commands: The command line of each worker, as lists, in order.
+    :param frames: An iterable of Frame to feed.
+    """
+    processes = []
+    source = subprocess.PIPE
+    for command in commands:
+        process = subprocess.Popen(
+            command, stdin=source, stdout=subprocess.PIPE)
+        if processes:
+            # Only the next worker must keep the pipe open
+            processes[-1].stdout.close()
+        processes.append(process)
+        source = process.stdout
+
+    feed_errors = []
+
+    def feed():
+        writer = FrameWriter(processes[0].stdin)
+        try:
+            for frame in frames:
+                try:
+                    writer.write(frame)
+                except (IOError, OSError):
+                    # A worker died, its exit status is reported below
+                    break
+        except Exception as error:
+            feed_errors.append(error)
+        finally:
+            try:
+                processes[0].stdin.close()
+            except (IOError, OSError):
+                pass
+
+    feeder = Thread(target=feed)
+    feeder.daemon = True
+    feeder.start()
+    try:
+        for frame in FrameReader(processes[-1].stdout):
+            yield frame
+    finally:
+        processes[-1].stdout.close()
+        feeder.join()
+        failed = [command for command, process in zip(commands, processes)
+                  if process.wait()]
+    if feed_errors:
+        raise feed_errors[0]
+    if failed:
+        raise RuntimeError("Workers failed: {0}".format(
+            ", ".join(" ".join(command) for command in failed)))
@@ -0,0 +1,160 @@
+from __future__ import unicode_literals
+
+"""Dependency graph of a NAF document stored in integer arrays. """
+
+from array import array
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+NO_HEAD = -1
+
+
+class DependencyGraph(object):
+    """ The dependencies of a document indexed by term position.
+
+    Terms are identified by their index in the terms layer. Each term keeps
+    its first head; children are stored as contiguous slices of a single
+    array. Depths and subtree spans are computed once, so head, children,
+    subtree and path queries do not search the document. The graph does not
+    follow later changes of the document; NAFDocument.get_dependency_graph
+    builds a new one after each change.
+    """
+
+    def __init__(self, document):
+        """ Build the graph of a document.
+
+        :param document: The NAFDocument whose dependencies are wanted.
+        """
+        self.term_ids = [
+            term.get(document.TERM_ID_ATTRIBUTE)
+            for term in document.get_terms()]
+        self.term_index = dict(
+            (tid, index) for index, tid in enumerate(self.term_ids))
+        size = len(self.term_ids)
+        self.heads = array("l", [NO_HEAD]) * size
+        self.relations = [None] * size
+
+        edges = []
+        for dependency in document.get_dependencies():
+            head = self.term_index[
+                dependency.get(document.DEPENDENCY_FROM_ATTRIBUTE)]
+            child = self.term_index[
+                dependency.get(document.DEPENDENCY_TO_ATTRIBUTE)]
+            edges.append((head, child))
+            if self.heads[child] == NO_HEAD:
+                self.heads[child] = head
+                self.relations[child] = dependency.get(
+                    document.DEPENDENCY_FUNCTION_ATTRIBUTE)
+
+        # Children of term i are child_list[child_offsets[i]:
+        # child_offsets[i + 1]], in document order.
+        self.child_offsets = array("l", [0]) * (size + 1)
+        for head, _ in edges:
+            self.child_offsets[head + 1] += 1
+        for index in range(size):
+            self.child_offsets[index + 1] += self.child_offsets[index]
+        self.child_list = array("l", [0]) * len(edges)
+        filled = array("l", self.child_offsets[:-1])
+        for head, child in edges:
+            self.child_list[filled[head]] = child
+            filled[head] += 1
+
+        self.depths = self._compute_depths()
+        self.subtree_starts = array("l", range(size))
+        self.subtree_ends = array("l", range(1, size + 1))
+        for index in sorted(range(size), key=self.depths.__getitem__,
+                            reverse=True):
+            head = self.heads[index]
+            if head != NO_HEAD and self.depths[head] < self.depths[index]:
+                if self.subtree_starts[index] < self.subtree_starts[head]:
+                    self.subtree_starts[head] = self.subtree_starts[index]
+                if self.subtree_ends[index] > self.subtree_ends[head]:
+                    self.subtree_ends[head] = self.subtree_ends[index]
+
+    def _compute_depths(self):
+        """ Return the distance of each term to its root. A term in a cycle
+        is taken as a root."""
+        heads = self.heads
+        depths = array("l", [NO_HEAD]) * len(heads)
+        for start in range(len(heads)):
+            chain = []
+            seen = set()
+            index = start
+            while index != NO_HEAD and depths[index] == NO_HEAD \
+                    and index not in seen:
+                seen.add(index)
+                chain.append(index)
+                index = heads[index]
+            depth = 0 if index == NO_HEAD or index in seen \
+                else depths[index] + 1
+            for index in reversed(chain):
+                depths[index] = depth
+                depth += 1
+        return depths
+
+    def index(self, tid):
+        """ Return the index of a term.
+
+        :param tid: The id of the term.
+        """
+        return self.term_index[tid]
+
+    def head(self, index):
+        """ Return the index of the head of a term, or NO_HEAD.
+
+        :param index: The index of the term.
+        """
+        return self.heads[index]
+
+    def relation(self, index):
+        """ Return the function of the dependency between a term and its
+        head.
+
+        :param index: The index of the term.
+        """
+        return self.relations[index]
+
+    def children(self, index):
+        """ Return the indexes of the dependents of a term.
+
+        :param index: The index of the term.
+        """
+        return self.child_list[
+            self.child_offsets[index]:self.child_offsets[index + 1]]
+
+    def subtree(self, index):
+        """ Return the half open range of term indexes covered by the
+        subtree of a term.
+
+        :param index: The index of the term.
+        """
+        return self.subtree_starts[index], self.subtree_ends[index]
+
+    def path(self, source, target):
+        """ Return the term indexes of the shortest path between two terms
+        through their lowest common ancestor, or None if they are not
+        connected.
+
+        :param source: The index of the first term.
+        :param target: The index of the second term.
+        """
+        heads = self.heads
+        depths = self.depths
+        up = [source]
+        down = [target]
+        while depths[source] > depths[target]:
+            source = heads[source]
+            up.append(source)
+        while depths[target] > depths[source]:
+            target = heads[target]
+            down.append(target)
+        while source != target:
+            if depths[source] == 0:
+                return None
+            source = heads[source]
+            target = heads[target]
+            up.append(source)
+            down.append(target)
+        down.pop()
+        up.extend(reversed(down))
+        return up
@@ -0,0 +1,134 @@
+from __future__ import unicode_literals
+
+"""Opt-in call counts and timings of the operations of NAF documents. """
+
+from functools import wraps
+from threading import Lock
+from timeit import default_timer
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+PARSE = "parse"
+# The document methods measured by default, besides parse
+OPERATIONS = (
+    "get_words", "get_words_by_id", "get_terms", "get_term",
+    "get_terms_words", "get_dependencies", "get_chunks", "get_chunk",
+    "get_entities", "get_entity", "get_coreference",
+    "get_coreference_cluster", "get_constituency_trees",
+    "get_span_resolver", "get_dependency_graph",
+    "get_constituency_tree_views", "add_word", "add_words", "add_term",
+    "add_terms", "add_dependency", "add_dependencies", "add_chunk",
+    "add_entity", "add_coreference", "add_constituency_tree", "to_string",
+    "write",
+)
+
+
+class Instrumentation(object):
+    """ Counts and cumulative seconds of the operations of the documents it
+    is attached to.
+
+    Attaching replaces the measured methods of a document by timed
+    wrappers in the document itself, so documents without instrumentation
+    run the plain methods and pay nothing. Operations called from other
+    measured operations, like to_string from write, are counted in both.
+    An instrumentation can be shared by documents of several threads. It is
+    not pickled with its documents: a pickled document drops its wrappers,
+    and one sent to another process is measured there only by the
+    instrumentation of its class, if any.
+    """
+
+    def __init__(self, operations=OPERATIONS, clock=default_timer):
+        """ Prepare empty counters.
+
+        :param operations: The names of the document methods to measure.
+        :param clock: The function that gives the current time in seconds.
+        """
+        self.operations = tuple(operations)
+        self.clock = clock
+        self._hooks = []
+        self._lock = Lock()
+        self.calls = {}
+        self.seconds = {}
+        self.reset()
+
+    def reset(self):
+        """ Set every counter to zero."""
+        with self._lock:
+            for operation in (PARSE,) + self.operations:
+                self.calls[operation] = 0
+                self.seconds[operation] = 0.0
+
+    def add_hook(self, hook):
+        """ Call a function after each measured operation.
+
+        :param hook: A function called with the operation name, the
+        seconds it took and the document. Its exceptions are not caught.
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """ Stop calling a hook.
+
+        :param hook: A function given to add_hook.
+        """
+        self._hooks.remove(hook)
+
+    def record(self, operation, seconds, document=None):
+        """ Count an operation and call the hooks.
+
+        :param operation: The name of the operation.
+        :param seconds: The time the operation took.
+        :param document: The document of the operation.
+        """
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            self.seconds[operation] = \
+                self.seconds.get(operation, 0.0) + seconds
+        for hook in self._hooks:
+            hook(operation, seconds, document)
+
+    def _timed(self, operation, method, document):
+        """ Return a wrapper of a bound method that records its calls."""
+        clock = self.clock
+        record = self.record
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(operation, clock() - start, document)
+        return timed
+
+    def attach(self, document):
+        """ Measure the operations of a document.
+
+        :param document: The NAFDocument to measure.
+        """
+        self.detach(document)
+        for operation in self.operations:
+            method = getattr(document, operation, None)
+            if method is not None:
+                setattr(document, operation,
+                        self._timed(operation, method, document))
+        document.instrumentation = self
+
+    def detach(self, document):
+        """ Stop measuring a document and restore its plain methods.
+
+        :param document: The NAFDocument measured.
+        """
+        attached = document.__dict__.get("instrumentation") or self
+        for operation in attached.operations:
+            document.__dict__.pop(operation, None)
+        document.instrumentation = None
+
+    def snapshot(self):
+        """ Return a dict of operation name to a dict with its calls and
+        seconds, for the operations called at least once."""
+        with self._lock:
+            return dict(
+                (operation, {"calls": calls,
+                             "seconds": self.seconds[operation]})
+                for operation, calls in self.calls.items() if calls)
@@ -0,0 +1,221 @@
+from __future__ import unicode_literals
+
+"""Referential integrity of the layers of a NAF document, checked in time
+linear in the size of the document. """
+
+from collections import namedtuple
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+MISSING_ID = "missing-id"
+DUPLICATE_ID = "duplicate-id"
+DANGLING_REFERENCE = "dangling-reference"
+
+
+class IntegrityProblem(namedtuple(
+        "IntegrityProblem",
+        ("kind", "layer", "element_id", "reference", "line"))):
+    """ A broken id or reference of a document.
+
+    kind is MISSING_ID, DUPLICATE_ID or DANGLING_REFERENCE, layer the tag of
+    the layer of the element, element_id its id, if it has one, reference
+    the id it points to that does not exist, None if the reference is
+    missing or the problem is not a reference, and line the line of the
+    element in the parsed file, or None for elements added later.
+    """
+    __slots__ = ()
+
+    def describe(self):
+        """ Return the problem as a line of text."""
+        where = "{0} {1}".format(self.layer, self.element_id or "element")
+        if self.line is not None:
+            where = "{0}: {1}".format(self.line, where)
+        if self.kind == DANGLING_REFERENCE:
+            if self.reference is None:
+                return "{0}: missing reference".format(where)
+            return "{0}: reference to unknown {1}".format(
+                where, self.reference)
+        return "{0}: {1}".format(where, self.kind.replace("-", " "))
+
+
+class IntegrityError(ValueError):
+    """ Raised by assert_integrity for a document with problems."""
+
+    def __init__(self, problems):
+        self.problems = problems
+        super(IntegrityError, self).__init__(
+            "{0} integrity problems, first: {1}".format(
+                len(problems), problems[0].describe()))
+
+
+class _Checker(object):
+    """ The state of one check: the problems found and the ids indexed so
+    far."""
+
+    def __init__(self, document):
+        self.document = document
+        self.problems = []
+        self.span_tag = document.SPAN_TAG
+        self.target_tag = document.TARGET_TAG
+        self.target_id = document.TARGET_ID_ATTRIBUTE
+
+    def problem(self, kind, layer, element, element_id=None, reference=None):
+        self.problems.append(IntegrityProblem(
+            kind, layer, element_id, reference, element.sourceline))
+
+    def index(self, layer, element, id_attribute, ids):
+        """ Add the id of an element to a set of ids, reporting it if it is
+        missing or repeated, and return it."""
+        element_id = element.get(id_attribute)
+        if element_id is None:
+            self.problem(MISSING_ID, layer, element)
+        elif element_id in ids:
+            self.problem(DUPLICATE_ID, layer, element, element_id)
+        else:
+            ids.add(element_id)
+        return element_id
+
+    def reference(self, layer, element, element_id, reference, ids):
+        """ Check that a reference points to one of a set of ids."""
+        if reference not in ids:
+            self.problem(
+                DANGLING_REFERENCE, layer, element, element_id, reference)
+
+    def spans(self, layer, element, element_id, ids):
+        """ Check the targets of the spans under an element."""
+        target_id = self.target_id
+        for span in element.iterchildren(self.span_tag):
+            for target in span.iterchildren(self.target_tag):
+                reference = target.get(target_id)
+                if reference not in ids:
+                    self.problem(DANGLING_REFERENCE, layer, target,
+                                 element_id, reference)
+
+    def layer(self, layer, occurrence_tag, id_attribute, ids, targets):
+        """ Index the ids of the elements of a layer and check the targets
+        of their spans, if targets is given."""
+        if layer is None:
+            return
+        for element in layer.iterchildren(occurrence_tag):
+            element_id = self.index(layer.tag, element, id_attribute, ids)
+            if targets is not None:
+                self.spans(layer.tag, element, element_id, targets)
+
+    def check(self):
+        document = self.document
+        word_ids = set()
+        term_ids = set()
+        self.layer(document.text, document.WORD_OCCURRENCE_TAG,
+                   document.WORD_ID_ATTRIBUTE, word_ids, None)
+        self.layer(document.terms, document.TERM_OCCURRENCE_TAG,
+                   document.TERM_ID_ATTRIBUTE, term_ids, word_ids)
+        self.dependencies(term_ids)
+        self.chunks(term_ids)
+        self.entities(term_ids)
+        self.layer(document.coreference, document.COREFERENCE_OCCURRENCE_TAG,
+                   document.COREFERENCE_ID_ATTRIBUTE, set(), term_ids)
+        self.constituency(term_ids)
+        return self.problems
+
+    def dependencies(self, term_ids):
+        document = self.document
+        layer = document.dependencies
+        if layer is None:
+            return
+        for dependency in layer.iterchildren(
+                document.DEPENDENCY_OCCURRENCE_TAG):
+            for attribute in (document.DEPENDENCY_FROM_ATTRIBUTE,
+                              document.DEPENDENCY_TO_ATTRIBUTE):
+                self.reference(layer.tag, dependency, None,
+                               dependency.get(attribute), term_ids)
+
+    def chunks(self, term_ids):
+        document = self.document
+        layer = document.chunks
+        if layer is None:
+            return
+        ids = set()
+        for chunk in layer.iterchildren(document.CHUNK_OCCURRENCE_TAG):
+            chunk_id = self.index(
+                layer.tag, chunk, document.CHUNK_ID_ATTRIBUTE, ids)
+            head = chunk.get(document.CHUNK_HEAD_ATTRIBUTE)
+            if head is not None:
+                self.reference(layer.tag, chunk, chunk_id, head, term_ids)
+            self.spans(layer.tag, chunk, chunk_id, term_ids)
+
+    def entities(self, term_ids):
+        document = self.document
+        layer = document.entities
+        if layer is None:
+            return
+        ids = set()
+        for entity in layer.iterchildren(
+                document.NAMED_ENTITY_OCCURRENCE_TAG):
+            entity_id = self.index(
+                layer.tag, entity, document.NAMED_ENTITY_ID_ATTRIBUTE, ids)
+            for references in entity.iterchildren(
+                    document.NAMED_ENTITY_REFERENCES_GROUP_TAG):
+                self.spans(layer.tag, references, entity_id, term_ids)
+
+    def constituency(self, term_ids):
+        """ Check the terminals of every tree and that its edges join nodes
+        of the same tree. Node ids must be unique in the layer and edge ids
+        in their tree."""
+        document = self.document
+        layer = document.constituency
+        if layer is None:
+            return
+        node_ids = set()
+        id_attribute = document.CONSTITUENCY_ID_ATTRIBUTE
+        edge_id_attribute = document.CONSTITUENCY_EDGE_ID_ATTRIBUTE
+        non_terminal_tag = document.CONSTITUENCY_NON_TERMINALS
+        for tree in layer.iterchildren(document.CONSTITUENCY_TREE_TAG):
+            tree_nodes = set()
+            for node in tree.iterchildren(non_terminal_tag):
+                tree_nodes.add(
+                    self.index(layer.tag, node, id_attribute, node_ids))
+            for node in tree.iterchildren(document.CONSTITUENCY_TERMINALS):
+                node_id = self.index(layer.tag, node, id_attribute, node_ids)
+                tree_nodes.add(node_id)
+                self.spans(layer.tag, node, node_id, term_ids)
+            tree_nodes.discard(None)
+            edge_ids = set()
+            for edge in tree.iterchildren(document.CONSTITUENCY_EDGES):
+                edge_id = edge.get(edge_id_attribute)
+                if edge_id is not None:
+                    if edge_id in edge_ids:
+                        self.problem(DUPLICATE_ID, layer.tag, edge, edge_id)
+                    edge_ids.add(edge_id)
+                for attribute in (document.CONSTITUENCY_EDGE_FORM_ATTRIBUTE,
+                                  document.CONSTITUENCY_EDGE_TO_ATTRIBUTE):
+                    self.reference(layer.tag, edge, edge_id,
+                                   edge.get(attribute), tree_nodes)
+
+
+def check_integrity(document):
+    """ Return the list of IntegrityProblem of a document, empty if every
+    id is present and unique and every reference points to an existing
+    element.
+
+    Every element is visited once: the ids of words and terms are indexed
+    in sets as their layers are read and the references of the later
+    layers are looked up in them, so the check takes time linear in the
+    size of the document. Checked are the ids of words, terms, chunks,
+    entities, coreferences and constituents, the word targets of terms,
+    the term targets of dependencies, chunks and their heads, entities,
+    coreference mentions and constituency terminals, and the nodes joined
+    by the edges of each constituency tree.
+
+    :param document: The NAFDocument or KAFDocument to check.
+    """
+    return _Checker(document).check()
+
+
+def assert_integrity(document):
+    """ Raise IntegrityError if a document has integrity problems.
+
+    :param document: The NAFDocument or KAFDocument to check.
+    """
+    problems = check_integrity(document)
+    if problems:
+        raise IntegrityError(problems)
@@ -0,0 +1,110 @@
+from __future__ import unicode_literals
+
+"""Inverted indexes from attribute values to the elements of a layer, to
+select terms and entities by their attributes without scanning the layer.
+"""
+
+from heapq import merge
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+def _accepted(value):
+    """ Return the set of values accepted by a condition: the value itself
+    or any of a list, tuple, set or frozenset of values."""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return frozenset(value)
+    return frozenset((value,))
+
+
+class AttributeIndex(object):
+    """ The elements of a layer in document order and, for each indexed
+    attribute, the positions of the elements with each value.
+
+    The index of an attribute is built the first time it is queried, with
+    one pass over the elements. Elements added at the end of the layer are
+    indexed with add, so the positions stay in document order.
+    """
+
+    def __init__(self, layer, occurrence_tag):
+        """ Read the elements of a layer.
+
+        :param layer: The layer element, or None if the document has not
+        the layer.
+        :param occurrence_tag: The tag of the elements of the layer.
+        """
+        if layer is None:
+            self.elements = []
+        else:
+            self.elements = list(layer.iterchildren(occurrence_tag))
+        self.attributes = {}
+
+    def _attribute(self, attribute):
+        """ Return the value to positions map of an attribute, building it
+        if it is not built yet."""
+        index = self.attributes.get(attribute)
+        if index is None:
+            index = self.attributes[attribute] = {}
+            for position, element in enumerate(self.elements):
+                value = element.get(attribute)
+                if value is not None:
+                    index.setdefault(value, []).append(position)
+        return index
+
+    def add(self, element):
+        """ Index an element added at the end of the layer.
+
+        :param element: The new element.
+        """
+        position = len(self.elements)
+        self.elements.append(element)
+        for attribute, index in self.attributes.items():
+            value = element.get(attribute)
+            if value is not None:
+                index.setdefault(value, []).append(position)
+
+    def positions(self, attribute, values):
+        """ Return the sorted positions of the elements whose attribute has
+        one of a set of values.
+
+        :param attribute: The attribute name.
+        :param values: The set of accepted values.
+        """
+        index = self._attribute(attribute)
+        lists = [index[value] for value in values if value in index]
+        if len(lists) == 1:
+            return lists[0]
+        return list(merge(*lists))
+
+    def select(self, conditions):
+        """ Return the elements, in document order, that match every
+        condition.
+
+        The positions of the most selective condition are read from its
+        index and the other conditions are checked on those elements only,
+        so the cost follows the size of the smallest candidate list and not
+        the size of the layer.
+        :param conditions: A dict from attribute name to a value or a
+        collection of accepted values.
+        """
+        if not conditions:
+            return list(self.elements)
+        candidates = None
+        checks = []
+        for attribute, value in conditions.items():
+            values = _accepted(value)
+            positions = self.positions(attribute, values)
+            if candidates is None or len(positions) < len(candidates):
+                if candidates is not None:
+                    checks.append(candidate_check)
+                candidates = positions
+                candidate_check = (attribute, values)
+            else:
+                checks.append((attribute, values))
+        elements = self.elements
+        if not checks:
+            return [elements[position] for position in candidates]
+        return [
+            elements[position] for position in candidates
+            if all(elements[position].get(attribute) in values
+                   for attribute, values in checks)]
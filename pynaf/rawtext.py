@@ -0,0 +1,216 @@
+from __future__ import unicode_literals
+
+"""Access to the raw text of a document by character offsets without
+copying or decoding the whole text. """
+
+import re
+from array import array
+from bisect import bisect_right
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+DECLARATION = re.compile(
+    br"""^\s*<\?xml[^>]*?encoding\s*=\s*["']([A-Za-z0-9._-]+)["']""")
+# The attributes of a start tag, with quoted values that may contain ">"
+ATTRIBUTES = br"""(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*\s*"""
+CDATA_START = b"<![CDATA["
+CDATA_END = b"]]>"
+NON_ASCII = re.compile(b"[\x80-\xff]")
+UTF8 = ("utf-8", "utf8", "ascii", "us-ascii")
+SINGLE_BYTE = re.compile(r"^(latin-?1|iso-?8859-\d+|cp125\d|windows-125\d)$")
+# Bytes between the entries of the character index of UTF-8 text
+BLOCK = 1024
+
+
+def declared_encoding(data):
+    """ Return the encoding of the XML declaration of a serialized document,
+    by default UTF-8.
+
+    :param data: The document as bytes or a buffer.
+    """
+    declaration = DECLARATION.match(data[:256])
+    if declaration is None:
+        return "utf-8"
+    return declaration.group(1).decode("ascii").lower()
+
+
+def _to_bytes(chunk):
+    """ Return the bytes of a slice of a buffer."""
+    if isinstance(chunk, memoryview):
+        return chunk.tobytes()
+    return chunk
+
+
+class RawText(object):
+    """ A character addressed view of encoded text.
+
+    The text is kept encoded in its buffer, that may be a memory map.
+    Slices are found by character offset and only the slices that are asked
+    for are decoded. Offsets of UTF-8 text with non ASCII characters are
+    resolved with an index of the characters at every BLOCK bytes, built on
+    first use; ASCII and single byte encodings need no index.
+    """
+
+    def __init__(self, data, start=0, end=None, encoding="utf-8"):
+        """ Wrap a range of a buffer.
+
+        :param data: The bytes, memory map or other buffer with the text.
+        :param start: The byte where the text starts.
+        :param end: The byte where the text ends, by default the end of
+        data.
+        :param encoding: The encoding of the text, UTF-8 or a single byte
+        encoding.
+        """
+        try:
+            self._memory = memoryview(data)
+        except TypeError:
+            # Python 2 memory maps have no buffer interface, their slices
+            # are copies of just the slice
+            self._memory = data
+        self.data = data
+        self.start = start
+        self.end = len(data) if end is None else end
+        self.encoding = encoding
+        if encoding.lower() in UTF8:
+            self._single_byte = NON_ASCII.search(
+                data, self.start, self.end) is None
+        elif SINGLE_BYTE.match(encoding.lower()):
+            self._single_byte = True
+        else:
+            raise ValueError("Encoding {0} is not supported".format(encoding))
+        self._block_bytes = None
+        self._block_chars = None
+        self._length = None
+
+    @classmethod
+    def from_string(cls, text):
+        """ Build a view of a text string, encoded once as UTF-8.
+
+        :param text: The text.
+        """
+        return cls(text.encode("utf-8"))
+
+    @classmethod
+    def from_document(cls, data, document_class):
+        """ Build a view of the raw layer of a serialized document, or
+        return None if the bytes of the layer are not the text as parsed:
+        if it has entities, carriage returns or several CDATA sections, or
+        an unsupported encoding.
+
+        :param data: The serialized document as bytes or a memory map.
+        :param document_class: The class whose constants define the format.
+        """
+        encoding = declared_encoding(data)
+        if encoding not in UTF8 and not SINGLE_BYTE.match(encoding):
+            return None
+        raw_tag = document_class.RAW_LAYER_TAG.encode("ascii")
+        raw = re.compile(br"<" + raw_tag + ATTRIBUTES + br"(/?)>").search(
+            data)
+        if raw is None:
+            return None
+        if raw.group(1):
+            return cls(b"")
+        start = raw.end()
+        end = data.find(b"</" + raw_tag, start)
+        if end < 0:
+            return None
+        if data[start:start + len(CDATA_START)] == CDATA_START:
+            start += len(CDATA_START)
+            end = data.find(CDATA_END, start)
+            if end < 0 or data[end + len(CDATA_END):end + len(CDATA_END) +
+                               len(raw_tag) + 3] != b"</" + raw_tag + b">":
+                return None
+        elif data.find(b"&", start, end) >= 0 or \
+                data.find(b"<", start, end) >= 0:
+            return None
+        if data.find(b"\r", start, end) >= 0:
+            return None
+        return cls(data, start, end, encoding)
+
+    def _build_index(self):
+        """ Index the character count at every BLOCK bytes, moved back to
+        the start of a character."""
+        data = self.data
+        block_bytes = array("l")
+        block_chars = array("l")
+        position = self.start
+        chars = 0
+        while position < self.end:
+            block_bytes.append(position)
+            block_chars.append(chars)
+            next_position = min(position + BLOCK, self.end)
+            while next_position < self.end and \
+                    0x80 <= ord(data[next_position:next_position + 1]) < 0xC0:
+                next_position -= 1
+            chars += len(_to_bytes(
+                self._memory[position:next_position]).decode("utf-8"))
+            position = next_position
+        block_bytes.append(self.end)
+        block_chars.append(chars)
+        self._block_bytes = block_bytes
+        self._block_chars = block_chars
+
+    def byte_offset(self, offset):
+        """ Return the position in the buffer of a character offset.
+
+        :param offset: The character offset in the text.
+        """
+        if offset < 0:
+            raise IndexError("Negative offset {0}".format(offset))
+        if self._single_byte:
+            return min(self.start + offset, self.end)
+        if self._block_bytes is None:
+            self._build_index()
+        block = bisect_right(self._block_chars, offset) - 1
+        position = self._block_bytes[block]
+        skip = offset - self._block_chars[block]
+        if skip == 0 or block + 1 == len(self._block_bytes):
+            return position
+        text = _to_bytes(self._memory[
+            position:self._block_bytes[block + 1]]).decode("utf-8")
+        return position + len(text[:skip].encode("utf-8"))
+
+    def __len__(self):
+        if self._length is None:
+            if self._single_byte:
+                self._length = self.end - self.start
+            else:
+                if self._block_chars is None:
+                    self._build_index()
+                self._length = self._block_chars[-1]
+        return self._length
+
+    def view(self, start, end):
+        """ Return the encoded bytes between two character offsets without
+        copying them, as a memoryview when the buffer supports it.
+
+        :param start: The offset of the first character.
+        :param end: The offset after the last character.
+        """
+        return self._memory[self.byte_offset(start):self.byte_offset(end)]
+
+    def text(self, start, end):
+        """ Return the text between two character offsets.
+
+        :param start: The offset of the first character.
+        :param end: The offset after the last character.
+        """
+        return _to_bytes(self.view(start, end)).decode(self.encoding)
+
+    def word(self, element):
+        """ Return the text under the offset and length of a word element.
+
+        :param element: A word element with offset and length attributes.
+        """
+        offset = int(element.get("offset"))
+        return self.text(offset, offset + int(element.get("length")))
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            if item.step not in (None, 1):
+                raise ValueError("Raw text slices cannot have steps")
+            start, end, _ = item.indices(len(self))
+            return self.text(start, max(start, end))
+        if item < 0:
+            item += len(self)
+        return self.text(item, item + 1)
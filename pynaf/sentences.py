@@ -0,0 +1,158 @@
+from __future__ import unicode_literals
+
+"""Grouping of the layers of a NAF document by sentence. """
+
+from collections import OrderedDict, namedtuple
+from copy import deepcopy
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+SENTENCE_ATTRIBUTE = "sent"
+
+
+class Sentence(namedtuple("Sentence", (
+        "sent", "words", "terms", "dependencies", "entities", "chunks"))):
+    """ The elements of a sentence: its words, the terms over them, the
+    dependencies between its terms and the entities and chunks whose first
+    term is in it. sent is the value of the sent attribute of the words.
+    """
+    __slots__ = ()
+
+
+def _group(document_class, items, layers=None, copy=False):
+    """ Group a sequence of (layer tag, element) in document order by
+    sentence.
+
+    Words give the sentence of each word id, terms take the sentence of
+    their first word and the rest of elements that of their first term.
+    Dependencies between terms of different sentences are left out. The
+    layers may come in any order after the layers they point to. Once every
+    one of the given layers has started, the current layer is the last one,
+    and when its elements reach a sentence every previous sentence is
+    complete and is yielded; the rest are yielded at the end. ValueError is
+    raised for a layer that comes before the layer it points to.
+
+    :param document_class: The class whose constants define the format.
+    :param items: Iterable of (layer tag, element) tuples, each layer in
+    one run.
+    :param layers: The grouped layers that items contain, if known.
+    :param copy: Keep copies of the elements, for elements that are freed
+    after being consumed.
+    """
+    text_layer = document_class.TEXT_LAYER_TAG
+    terms_layer = document_class.TERMS_LAYER_TAG
+    dependencies_layer = document_class.DEPENDENCY_LAYER_TAG
+    entities_layer = document_class.NAMED_ENTITIES_LAYER_TAG
+    chunks_layer = document_class.CHUNKS_LAYER_TAG
+    span_target = "{0}/{1}".format(
+        document_class.SPAN_TAG, document_class.TARGET_TAG)
+    entity_target = "{0}/{1}/{2}".format(
+        document_class.NAMED_ENTITY_REFERENCES_GROUP_TAG,
+        document_class.SPAN_TAG, document_class.TARGET_TAG)
+    target_id = document_class.TARGET_ID_ATTRIBUTE
+    fields = {text_layer: 1, terms_layer: 2, dependencies_layer: 3,
+              entities_layer: 4, chunks_layer: 5}
+    pointed = {terms_layer: text_layer, dependencies_layer: terms_layer,
+               entities_layer: terms_layer, chunks_layer: terms_layer}
+    pending = set(layers or ())
+    started = set()
+    last_layer = None
+
+    word_sentence = {}
+    term_sentence = {}
+    sentences = OrderedDict()
+    positions = {}
+
+    def first_target_sentence(element, path, sentence_map):
+        target = element.find(path)
+        if target is None:
+            return None
+        return sentence_map.get(target.get(target_id))
+
+    for layer, element in items:
+        if layer not in started and layer in fields:
+            started.add(layer)
+            if pointed.get(layer) in pending - started:
+                raise ValueError(
+                    "The {0} layer comes before the {1} layer it points "
+                    "to".format(layer, pointed[layer]))
+            if pending and pending <= started:
+                last_layer = layer
+        if layer == text_layer:
+            sent = element.get(SENTENCE_ATTRIBUTE)
+            word_sentence[element.get(document_class.WORD_ID_ATTRIBUTE)] = \
+                sent
+            if sent not in positions:
+                positions[sent] = len(positions)
+                sentences[sent] = (sent, [], [], [], [], [])
+        elif layer == terms_layer:
+            sent = first_target_sentence(element, span_target, word_sentence)
+            term_sentence[element.get(document_class.TERM_ID_ATTRIBUTE)] = \
+                sent
+        elif layer == dependencies_layer:
+            sent = term_sentence.get(element.get(
+                document_class.DEPENDENCY_FROM_ATTRIBUTE))
+            if sent != term_sentence.get(element.get(
+                    document_class.DEPENDENCY_TO_ATTRIBUTE)):
+                continue
+        elif layer == entities_layer:
+            sent = first_target_sentence(
+                element, entity_target, term_sentence)
+        elif layer == chunks_layer:
+            sent = first_target_sentence(element, span_target, term_sentence)
+        else:
+            continue
+        if sent not in sentences:
+            # Sentence already yielded or unknown
+            continue
+        sentences[sent][fields[layer]].append(
+            deepcopy(element) if copy else element)
+        if layer == last_layer:
+            position = positions[sent]
+            while positions[next(iter(sentences))] < position:
+                yield Sentence(*sentences.popitem(last=False)[1])
+    while sentences:
+        yield Sentence(*sentences.popitem(last=False)[1])
+
+
+def iter_sentences(document):
+    """ Yield a Sentence for each sentence of a document, in text order.
+
+    Each layer is read once.
+
+    :param document: The NAFDocument to group.
+    """
+    def items():
+        for layer, elements in (
+                (document.TEXT_LAYER_TAG, document.get_words()),
+                (document.TERMS_LAYER_TAG, document.get_terms()),
+                (document.DEPENDENCY_LAYER_TAG, document.get_dependencies()),
+                (document.NAMED_ENTITIES_LAYER_TAG, document.get_entities()),
+                (document.CHUNKS_LAYER_TAG, document.get_chunks())):
+            for element in elements:
+                yield layer, element
+    return _group(document.__class__, items())
+
+
+def iter_stream_sentences(reader):
+    """ Yield a Sentence for each sentence of a NAFReader, with copies of
+    the elements.
+
+    As NAF stores the layers one after another, a sentence is complete once
+    the last grouped layer requested to the reader (words, terms,
+    dependencies, entities or chunks) that appears in the file goes past
+    it, and only then it is yielded. Other layers, like coreferences, are
+    skipped. The earlier layers are kept until that point, so requesting
+    only the needed layers keeps the memory low; reading only words yields
+    each sentence as soon as its words are read. If one of those layers is
+    missing or empty in the file, the sentences are yielded at the end.
+
+    :param reader: A NAFReader.
+    """
+    document_class = reader.document_class
+    grouped = [layer for layer in reader.layers if layer in (
+        document_class.TEXT_LAYER_TAG, document_class.TERMS_LAYER_TAG,
+        document_class.DEPENDENCY_LAYER_TAG,
+        document_class.NAMED_ENTITIES_LAYER_TAG,
+        document_class.CHUNKS_LAYER_TAG)]
+    return _group(document_class, reader, grouped, True)
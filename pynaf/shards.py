@@ -0,0 +1,412 @@
+from __future__ import unicode_literals
+
+"""Split of a NAF document into shards of whole sentences, to annotate them
+in parallel, and merge of the annotated shards into one document. """
+
+from collections import OrderedDict
+from copy import deepcopy
+
+from lxml import etree
+
+from pynaf.sentences import SENTENCE_ATTRIBUTE
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+DIGITS = "0123456789"
+# Set on the pieces of a coreference cluster cut by split_document to the
+# id of the whole cluster, so merge_shards joins them again
+SPLIT_CLUSTER_ATTRIBUTE = "splitCluster"
+
+
+def _sentence_shards(words, sentences):
+    """ Return the shard of each word, every shard holding the given number
+    of consecutive sentences."""
+    shards = []
+    shard = -1
+    count = 0
+    last = object()
+    for word in words:
+        sent = word.get(SENTENCE_ATTRIBUTE)
+        if sent != last:
+            last = sent
+            if count % sentences == 0:
+                shard += 1
+            count += 1
+        shards.append(shard)
+    return shards
+
+
+def _layer(document, attribute, tag):
+    """ Return a layer of a document, adding it if it does not exist."""
+    layer = getattr(document, attribute)
+    if layer is None:
+        layer = etree.SubElement(document.root, tag)
+        setattr(document, attribute, layer)
+    return layer
+
+
+def _shard_of(references, index):
+    """ Return the shard of every reference, or None if they are in several
+    shards, none or are unknown."""
+    shard = None
+    for reference in references:
+        reference_shard = index.get(reference)
+        if reference_shard is None or \
+                shard is not None and reference_shard != shard:
+            return None
+        shard = reference_shard
+    return shard
+
+
+def _targets(element, document_class):
+    """ Return the ids of the targets under an element."""
+    target_id = document_class.TARGET_ID_ATTRIBUTE
+    return [target.get(target_id)
+            for target in element.iter(document_class.TARGET_TAG)]
+
+
+def split_document(document, sentences=100):
+    """ Split a document into shards of consecutive sentences and return
+    them as a list of documents of the same class.
+
+    Each shard has the header of the document, the slice of the raw text
+    from its first word to the first word of the next shard, so that the
+    raw texts of the shards joined are the original one, and its words with
+    their offsets moved to that slice. Terms, dependencies, chunks,
+    entities and constituency trees are given to the shard of their
+    targets and left out if these are in several shards; coreference
+    clusters are cut in a cluster for each shard with its mentions, and
+    the pieces of a cut cluster carry its id in SPLIT_CLUSTER_ATTRIBUTE so
+    that merge_shards joins them again. Ids are kept, so each shard is a
+    document on its own. Sentences are told apart by the sent attribute of
+    the words.
+
+    Merging the shards, annotated or not, gives back the words, terms,
+    dependencies, chunks, entities, coreference clusters and constituency
+    trees of the document, with ids renumbered in document order, as long
+    as no element but coreference clusters spans several shards.
+
+    :param document: The NAFDocument to split.
+    :param sentences: The number of sentences of each shard.
+    """
+    if sentences < 1:
+        raise ValueError("Shards need at least one sentence")
+    document_class = document.__class__
+    words = document.get_words()
+    word_shards = _sentence_shards(words, sentences)
+    count = word_shards[-1] + 1 if word_shards else 1
+    language = document.root.get(document.LANGUAGE_ATTRIBUTE)
+    version = document.root.get(document.VERSION_ATTRIBUTE)
+    shards = [
+        document_class(language=language, version=version,
+                       header=deepcopy(document.kaf_header),
+                       encoding=document.encoding)
+        for _ in range(count)]
+
+    raw_text = document.get_raw_text() or ""
+    starts = [0] * count
+    if raw_text:
+        previous = None
+        for word, shard in zip(words, word_shards):
+            if shard != previous:
+                previous = shard
+                offset = word.get("offset")
+                if offset is None:
+                    raise ValueError(
+                        "Words need offsets to split the raw text")
+                starts[shard] = int(offset) if shard else 0
+        ends = starts[1:] + [len(raw_text)]
+        for shard, start, end in zip(shards, starts, ends):
+            shard.add_raw_text(raw_text[start:end])
+
+    word_shard = {}
+    word_id = document.WORD_ID_ATTRIBUTE
+    for word, index in zip(words, word_shards):
+        word_shard[word.get(word_id)] = index
+        word = deepcopy(word)
+        offset = word.get("offset")
+        if offset is not None and starts[index]:
+            word.set("offset", str(int(offset) - starts[index]))
+        shards[index].text.append(word)
+
+    term_shard = {}
+    term_id = document.TERM_ID_ATTRIBUTE
+    for term in document.get_terms():
+        index = _shard_of(_targets(term, document_class), word_shard)
+        if index is not None:
+            term_shard[term.get(term_id)] = index
+            _layer(shards[index], "terms", document.TERMS_LAYER_TAG).append(
+                deepcopy(term))
+
+    for dependency in document.get_dependencies():
+        index = _shard_of(
+            (dependency.get(document.DEPENDENCY_FROM_ATTRIBUTE),
+             dependency.get(document.DEPENDENCY_TO_ATTRIBUTE)), term_shard)
+        if index is not None:
+            _layer(shards[index], "dependencies",
+                   document.DEPENDENCY_LAYER_TAG).append(deepcopy(dependency))
+
+    for chunk in document.get_chunks():
+        references = _targets(chunk, document_class)
+        head = chunk.get(document.CHUNK_HEAD_ATTRIBUTE)
+        if head is not None:
+            references.append(head)
+        index = _shard_of(references, term_shard)
+        if index is not None:
+            _layer(shards[index], "chunks", document.CHUNKS_LAYER_TAG).append(
+                deepcopy(chunk))
+
+    for entity in document.get_entities():
+        index = _shard_of(_targets(entity, document_class), term_shard)
+        if index is not None:
+            _layer(shards[index], "entities",
+                   document.NAMED_ENTITIES_LAYER_TAG).append(deepcopy(entity))
+
+    for coreference in document.get_coreference():
+        mentions = OrderedDict()
+        for mention in coreference.iterchildren(document.SPAN_TAG):
+            index = _shard_of(_targets(mention, document_class), term_shard)
+            if index is not None:
+                mentions.setdefault(index, []).append(mention)
+        for index, shard_mentions in mentions.items():
+            cluster = etree.Element(coreference.tag, coreference.attrib)
+            if len(mentions) > 1:
+                cluster.set(SPLIT_CLUSTER_ATTRIBUTE, coreference.get(
+                    document.COREFERENCE_ID_ATTRIBUTE))
+            for mention in shard_mentions:
+                cluster.append(deepcopy(mention))
+            for references in coreference.iterchildren(
+                    document.EXTERNAL_REFERENCES_TAG):
+                cluster.append(deepcopy(references))
+            _layer(shards[index], "coreference",
+                   document.COREFERENCE_LAYER_TAG).append(cluster)
+
+    for tree in document.get_constituency_trees():
+        index = _shard_of(_targets(tree, document_class), term_shard)
+        if index is not None:
+            _layer(shards[index], "constituency",
+                   document.CONSTITUENCY_LAYER).append(deepcopy(tree))
+    return shards
+
+
+class _Renumbering(object):
+    """ New ids for the elements of a layer, numbered from one for each id
+    prefix, and the map of the old ids of the current shard to them."""
+
+    def __init__(self):
+        self.counters = {}
+        self.ids = {}
+
+    def new(self, old_id):
+        """ Return the new id of an element, remembering it."""
+        if old_id is None:
+            raise ValueError("Element without id")
+        # The prefix of an id is kept
+        prefix = old_id.rstrip(DIGITS)
+        number = self.counters.get(prefix, 0) + 1
+        self.counters[prefix] = number
+        new_id = self.ids[old_id] = "{0}{1}".format(prefix, number)
+        return new_id
+
+    def get(self, old_id, shard):
+        """ Return the new id of an element of the current shard."""
+        try:
+            return self.ids[old_id]
+        except KeyError:
+            raise ValueError(
+                "Shard {0} refers to unknown element {1}".format(
+                    shard, old_id))
+
+
+class _Header(object):
+    """ The header of a merge and its linguistic processors by layer."""
+
+    def __init__(self, element):
+        self.element = element
+        self.groups = OrderedDict()
+        self.processors = {}
+
+
+def _merge_header(header, shard_header, document_class):
+    """ Add the linguistic processors of a shard to the merged header. A
+    processor repeated in several shards, with the same layer, name,
+    version and host, is kept once, with the earliest begin timestamp and
+    the latest end timestamp."""
+    processors = header.processors
+    begin = document_class.BEGIN_TIMESTAMP_ATTRIBUTE
+    end = document_class.END_TIMESTAMP_ATTRIBUTE
+    for group in shard_header.iterchildren(
+            document_class.LINGUISTIC_PROCESSOR_HEAD):
+        layer = group.get(document_class.LAYER_ATTRIBUTE)
+        for processor in group.iterchildren(
+                document_class.LINGUISTIC_PROCESSOR_OCCURRENCE_TAG):
+            key = (layer, processor.get(document_class.NAME_ATTRIBUTE),
+                   processor.get(document_class.VERSION_ATTRIBUTE),
+                   processor.get(document_class.HOSTNAME_ATTRIBUTE))
+            merged = processors.get(key)
+            if merged is None:
+                layer_group = header.groups.get(layer)
+                if layer_group is None:
+                    layer_group = header.groups[layer] = etree.SubElement(
+                        header.element, group.tag, group.attrib)
+                processors[key] = deepcopy(processor)
+                layer_group.append(processors[key])
+                continue
+            for attribute, pick in ((begin, min), (end, max)):
+                value = processor.get(attribute)
+                if value is not None:
+                    current = merged.get(attribute)
+                    merged.set(attribute, value if current is None
+                               else pick(current, value))
+
+
+def merge_shards(shards, document_class=None):
+    """ Merge annotated shards into one document and return it.
+
+    The raw texts are joined and the word offsets moved accordingly, the
+    elements of every layer are copied in shard order and all the ids are
+    renumbered, from one for each id prefix and layer, so that the ids
+    each shard gave do not collide; references are updated to the new
+    ids. The pieces of a coreference cluster cut by split_document are
+    joined in one cluster, in the place of its first piece. The header is
+    the one of the first shard with the linguistic
+    processors of all of them, see split_document. Layers pynaf does not
+    handle are left out. The merge takes time linear in the size of the
+    result.
+
+    :param shards: The shards in order, as documents.
+    :param document_class: The class of the result, by default that of the
+    first shard.
+    """
+    shards = list(shards)
+    if not shards:
+        raise ValueError("No shards to merge")
+    first = shards[0]
+    if document_class is None:
+        document_class = first.__class__
+    header_element = deepcopy(first.kaf_header)
+    for group in header_element.findall(
+            document_class.LINGUISTIC_PROCESSOR_HEAD):
+        header_element.remove(group)
+    document = document_class(
+        language=first.root.get(document_class.LANGUAGE_ATTRIBUTE),
+        version=first.root.get(document_class.VERSION_ATTRIBUTE),
+        header=header_element, encoding=first.encoding)
+    header = _Header(document.kaf_header)
+    c = document_class
+    target_id = c.TARGET_ID_ATTRIBUTE
+    words = _Renumbering()
+    terms = _Renumbering()
+    layers = dict(
+        (attribute, _Renumbering()) for attribute in (
+            "chunks", "entities", "coreference", "nodes", "edges"))
+
+    def copy(element, id_attribute, renumbering):
+        element = deepcopy(element)
+        element.set(id_attribute, renumbering.new(element.get(id_attribute)))
+        return element
+
+    def retarget(element, renumbering, shard):
+        for target in element.iter(c.TARGET_TAG):
+            target.set(target_id, renumbering.get(target.get(target_id), shard))
+
+    # The merged cluster of each cluster cut by split_document
+    split_clusters = {}
+    raw_texts = []
+    shift = 0
+    for position, shard in enumerate(shards):
+        _merge_header(header, shard.kaf_header, c)
+        words.ids = {}
+        terms.ids = {}
+        for word in shard.get_words():
+            word = copy(word, c.WORD_ID_ATTRIBUTE, words)
+            offset = word.get("offset")
+            if offset is not None and shift:
+                word.set("offset", str(int(offset) + shift))
+            document.text.append(word)
+        raw_text = shard.get_raw_text() or ""
+        raw_texts.append(raw_text)
+        shift += len(raw_text)
+
+        for term in shard.get_terms():
+            term = copy(term, c.TERM_ID_ATTRIBUTE, terms)
+            retarget(term, words, position)
+            _layer(document, "terms", c.TERMS_LAYER_TAG).append(term)
+
+        for dependency in shard.get_dependencies():
+            dependency = deepcopy(dependency)
+            for attribute in (c.DEPENDENCY_FROM_ATTRIBUTE,
+                              c.DEPENDENCY_TO_ATTRIBUTE):
+                dependency.set(attribute, terms.get(
+                    dependency.get(attribute), position))
+            _layer(document, "dependencies", c.DEPENDENCY_LAYER_TAG).append(
+                dependency)
+
+        layers["chunks"].ids = {}
+        for chunk in shard.get_chunks():
+            chunk = copy(chunk, c.CHUNK_ID_ATTRIBUTE, layers["chunks"])
+            head = chunk.get(c.CHUNK_HEAD_ATTRIBUTE)
+            if head is not None:
+                chunk.set(c.CHUNK_HEAD_ATTRIBUTE, terms.get(head, position))
+            retarget(chunk, terms, position)
+            _layer(document, "chunks", c.CHUNKS_LAYER_TAG).append(chunk)
+
+        layers["entities"].ids = {}
+        for entity in shard.get_entities():
+            entity = copy(
+                entity, c.NAMED_ENTITY_ID_ATTRIBUTE, layers["entities"])
+            retarget(entity, terms, position)
+            _layer(document, "entities", c.NAMED_ENTITIES_LAYER_TAG).append(
+                entity)
+
+        layers["coreference"].ids = {}
+        for coreference in shard.get_coreference():
+            split_id = coreference.get(SPLIT_CLUSTER_ATTRIBUTE)
+            merged = split_clusters.get(split_id)
+            if merged is not None:
+                coreference = deepcopy(coreference)
+                retarget(coreference, terms, position)
+                external = merged.find(c.EXTERNAL_REFERENCES_TAG)
+                for mention in coreference.findall(c.SPAN_TAG):
+                    if external is None:
+                        merged.append(mention)
+                    else:
+                        external.addprevious(mention)
+                continue
+            coreference = copy(
+                coreference, c.COREFERENCE_ID_ATTRIBUTE,
+                layers["coreference"])
+            if split_id is not None:
+                del coreference.attrib[SPLIT_CLUSTER_ATTRIBUTE]
+                split_clusters[split_id] = coreference
+            retarget(coreference, terms, position)
+            _layer(document, "coreference", c.COREFERENCE_LAYER_TAG).append(
+                coreference)
+
+        nodes = layers["nodes"]
+        edges = layers["edges"]
+        for tree in shard.get_constituency_trees():
+            tree = deepcopy(tree)
+            nodes.ids = {}
+            edges.ids = {}
+            for node in tree.iterchildren(
+                    c.CONSTITUENCY_NON_TERMINALS, c.CONSTITUENCY_TERMINALS):
+                node.set(c.CONSTITUENCY_ID_ATTRIBUTE,
+                         nodes.new(node.get(c.CONSTITUENCY_ID_ATTRIBUTE)))
+            retarget(tree, terms, position)
+            for edge in tree.iterchildren(c.CONSTITUENCY_EDGES):
+                edge_id = edge.get(c.CONSTITUENCY_EDGE_ID_ATTRIBUTE)
+                if edge_id is not None:
+                    edge.set(c.CONSTITUENCY_EDGE_ID_ATTRIBUTE,
+                             edges.new(edge_id))
+                for attribute in (c.CONSTITUENCY_EDGE_FORM_ATTRIBUTE,
+                                  c.CONSTITUENCY_EDGE_TO_ATTRIBUTE):
+                    edge.set(attribute,
+                             nodes.get(edge.get(attribute), position))
+            _layer(document, "constituency", c.CONSTITUENCY_LAYER).append(
+                tree)
+
+    raw_text = "".join(raw_texts)
+    if raw_text:
+        document.add_raw_text(raw_text)
+    return document
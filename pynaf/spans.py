@@ -0,0 +1,152 @@
+from __future__ import unicode_literals
+
+"""Resolution of term, entity, chunk and coreference spans to words. """
+
+from collections import namedtuple
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+class Span(namedtuple("Span", ("words", "start", "end"))):
+    """ The words covered by an annotation.
+
+    words are the sorted indexes of the words in the text layer, start and
+    end the character offsets of the first and last word in the raw text, or
+    None if the words have no offsets.
+    """
+    __slots__ = ()
+
+
+EMPTY_SPAN = Span((), None, None)
+
+
+class SpanResolver(object):
+    """ Precomputed spans of every term, entity, chunk and coreference
+    mention of a document.
+
+    Every span target is resolved once, when the resolver is built, so
+    lookups are dictionary accesses. The resolver does not follow later
+    changes of the document; NAFDocument.get_span_resolver builds a new one
+    after each change.
+    """
+
+    def __init__(self, document):
+        """ Resolve all the spans of a document.
+
+        :param document: The NAFDocument whose spans are wanted.
+        """
+        # A RawText, so the text of a span is decoded only when asked for
+        self.raw_text = document.get_raw_text_view()
+        target_id = document.TARGET_ID_ATTRIBUTE
+
+        words = document.get_words()
+        self.word_ids = [
+            word.get(document.WORD_ID_ATTRIBUTE) for word in words]
+        self.word_index = dict(
+            (wid, index) for index, wid in enumerate(self.word_ids))
+        self.word_offsets = []
+        for word in words:
+            offset = word.get("offset")
+            length = word.get("length")
+            if offset is None or length is None:
+                self.word_offsets.append(None)
+            else:
+                offset = int(offset)
+                self.word_offsets.append((offset, offset + int(length)))
+
+        word_index = self.word_index
+        term_words = {}
+        for term in document.get_terms():
+            term_words[term.get(document.TERM_ID_ATTRIBUTE)] = tuple(sorted(
+                word_index[target.get(target_id)]
+                for target in document.get_terms_words(term)))
+        self._term_words = term_words
+        self.terms = dict(
+            (tid, self._span(indexes))
+            for tid, indexes in term_words.items())
+
+        self.entities = {}
+        for entity in document.get_entities():
+            targets = []
+            for reference in document.get_entity_references(entity):
+                targets.extend(document.get_reference_span(reference))
+            self.entities[entity.get(document.NAMED_ENTITY_ID_ATTRIBUTE)] = \
+                self._terms_span(target.get(target_id) for target in targets)
+
+        self.chunks = dict(
+            (chunk.get(document.CHUNK_ID_ATTRIBUTE), self._terms_span(
+                target.get(target_id)
+                for target in document.get_chunk_terms(chunk)))
+            for chunk in document.get_chunks())
+
+        self.coreferences = dict(
+            (coreference.get(document.COREFERENCE_ID_ATTRIBUTE), [
+                self._terms_span(
+                    target.get(target_id)
+                    for target in document.get_reference_span(mention))
+                for mention in document.get_coreference_mentions(coreference)])
+            for coreference in document.get_coreference())
+
+    def _span(self, indexes):
+        """ Build the span of sorted word indexes."""
+        if not indexes:
+            return EMPTY_SPAN
+        first = self.word_offsets[indexes[0]]
+        last = self.word_offsets[indexes[-1]]
+        if first is None or last is None:
+            return Span(indexes, None, None)
+        return Span(indexes, first[0], last[1])
+
+    def _terms_span(self, tids):
+        """ Build the span of the words of a group of terms."""
+        term_words = self._term_words
+        indexes = set()
+        for tid in tids:
+            indexes.update(term_words[tid])
+        return self._span(tuple(sorted(indexes)))
+
+    def term(self, tid):
+        """ Return the span of a term.
+
+        :param tid: The id of the term.
+        """
+        return self.terms[tid]
+
+    def entity(self, eid):
+        """ Return the span of all the references of an entity.
+
+        :param eid: The id of the entity.
+        """
+        return self.entities[eid]
+
+    def chunk(self, cid):
+        """ Return the span of a chunk.
+
+        :param cid: The id of the chunk.
+        """
+        return self.chunks[cid]
+
+    def coreference(self, coid):
+        """ Return the list of spans of the mentions of a coreference
+        cluster.
+
+        :param coid: The id of the coreference cluster.
+        """
+        return self.coreferences[coid]
+
+    def words(self, span):
+        """ Return the ids of the words of a span.
+
+        :param span: A span given by the resolver.
+        """
+        return [self.word_ids[index] for index in span.words]
+
+    def text(self, span):
+        """ Return the raw text covered by a span, or None if its words have
+        no offsets.
+
+        :param span: A span given by the resolver.
+        """
+        if span.start is None:
+            return None
+        return self.raw_text.text(span.start, span.end)
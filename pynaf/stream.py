@@ -0,0 +1,411 @@
+from __future__ import unicode_literals
+
+"""Streaming access to NAF formatted files. """
+
+from collections import OrderedDict
+from copy import deepcopy
+from lxml import etree
+
+from pynaf import NAFDocument
+from pynaf.sentences import iter_stream_sentences
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+XML_NAMESPACE = "{http://www.w3.org/XML/1998/namespace}"
+
+
+class NAFReader(object):
+    """ Read a NAF document layer by layer without building the full tree.
+
+    The reader is single pass: each element is yielded once, in document
+    order, and is cleared and detached right after the consumer resumes the
+    iteration, so any data that is needed later must be copied out of it.
+    The elements of the layers that are not read are released in the same
+    way, and the input is not read past the last wanted layer. The header is
+    kept in memory and is available in `header` as soon as it is read.
+    """
+
+    def __init__(self, source, document_class=NAFDocument, layers=None,
+                 huge_tree=True):
+        """ Prepare the reader.
+
+        :param source: A file name or a file type object. Wrap in-memory
+        documents in a BytesIO.
+        :param document_class: The class whose constants define the format,
+        NAFDocument or KAFDocument.
+        :param layers: Layer tags to yield, in document order. By default
+        words, terms, dependencies, entities and coreferences. Chunks are
+        also available.
+        :param huge_tree: Allow text nodes bigger than the lxml limits, needed
+        for the raw layer of very big documents.
+        """
+        self.source = source
+        self.document_class = document_class
+        self.huge_tree = huge_tree
+        occurrences = {
+            document_class.TEXT_LAYER_TAG:
+                document_class.WORD_OCCURRENCE_TAG,
+            document_class.TERMS_LAYER_TAG:
+                document_class.TERM_OCCURRENCE_TAG,
+            document_class.CHUNKS_LAYER_TAG:
+                document_class.CHUNK_OCCURRENCE_TAG,
+            document_class.DEPENDENCY_LAYER_TAG:
+                document_class.DEPENDENCY_OCCURRENCE_TAG,
+            document_class.NAMED_ENTITIES_LAYER_TAG:
+                document_class.NAMED_ENTITY_OCCURRENCE_TAG,
+            document_class.COREFERENCE_LAYER_TAG:
+                document_class.COREFERENCE_OCCURRENCE_TAG,
+        }
+        if layers is None:
+            layers = (
+                document_class.TEXT_LAYER_TAG,
+                document_class.TERMS_LAYER_TAG,
+                document_class.DEPENDENCY_LAYER_TAG,
+                document_class.NAMED_ENTITIES_LAYER_TAG,
+                document_class.COREFERENCE_LAYER_TAG)
+        self.layers = tuple(layers)
+        self.occurrences = dict(
+            (layer, occurrences[layer]) for layer in layers)
+        self.header = None
+        self.language = None
+        self.version = None
+        self._pending = []
+        self._stream = self._parse()
+
+    def _parse(self):
+        """ Walk the document yielding (layer tag, element) tuples.
+
+        The children of every layer but the header are released as soon as
+        they end, yielded or not, and the walk stops once every wanted layer
+        has ended.
+        """
+        header_tag = self.document_class.KAF_HEADER_TAG
+        remaining = set(self.occurrences)
+        depth = 0
+        root = None
+        layer_tag = None
+        occurrence_tag = None
+        for event, element in etree.iterparse(
+                self.source, events=("start", "end"),
+                remove_comments=False, huge_tree=self.huge_tree):
+            if event == "start":
+                if depth == 0:
+                    root = element
+                    self.language = element.get(
+                        self.document_class.LANGUAGE_ATTRIBUTE)
+                    self.version = element.get(
+                        self.document_class.VERSION_ATTRIBUTE)
+                elif depth == 1:
+                    layer_tag = element.tag
+                    occurrence_tag = self.occurrences.get(layer_tag)
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 2 and layer_tag != header_tag:
+                if occurrence_tag is not None \
+                        and element.tag == occurrence_tag:
+                    yield layer_tag, element
+                self._free(element)
+            elif depth == 1:
+                if element.tag == header_tag:
+                    self.header = element
+                    root.remove(element)
+                else:
+                    element.clear()
+                    root.remove(element)
+                    remaining.discard(layer_tag)
+                    if not remaining:
+                        return
+                layer_tag = occurrence_tag = None
+
+    @staticmethod
+    def _free(element):
+        """ Release an already consumed element and its previous siblings.
+
+        :param element: The element to release.
+        """
+        element.clear()
+        parent = element.getparent()
+        while element.getprevious() is not None:
+            del parent[0]
+
+    def read_header(self):
+        """ Advance the reader until the header is read and return it."""
+        while self.header is None:
+            try:
+                self._pending.append(next(self._stream))
+            except StopIteration:
+                break
+        return self.header
+
+    def __iter__(self):
+        while self._pending:
+            yield self._pending.pop(0)
+        for item in self._stream:
+            yield item
+
+    def iter_layer(self, layer_tag):
+        """ Yield the elements of a layer.
+
+        Elements of other layers found before it are skipped. The iteration
+        stops at the first element of a following layer, so the layers can be
+        consumed one after another in document order. A layer the reader was
+        not asked for yields nothing and skips nothing.
+
+        :param layer_tag: The tag of the layer whose elements are wanted.
+        """
+        if layer_tag not in self.occurrences:
+            return
+        seen = False
+        while True:
+            if self._pending:
+                item = self._pending.pop(0)
+            else:
+                try:
+                    item = next(self._stream)
+                except StopIteration:
+                    return
+            if item[0] == layer_tag:
+                seen = True
+                yield item[1]
+            elif seen:
+                self._pending.insert(0, item)
+                return
+
+    def words(self):
+        """ Yield the words of the text layer."""
+        return self.iter_layer(self.document_class.TEXT_LAYER_TAG)
+
+    def terms(self):
+        """ Yield the terms of the terms layer."""
+        return self.iter_layer(self.document_class.TERMS_LAYER_TAG)
+
+    def chunks(self):
+        """ Yield the chunks of the chunks layer."""
+        return self.iter_layer(self.document_class.CHUNKS_LAYER_TAG)
+
+    def dependencies(self):
+        """ Yield the dependencies of the deps layer."""
+        return self.iter_layer(self.document_class.DEPENDENCY_LAYER_TAG)
+
+    def entities(self):
+        """ Yield the entities of the entities layer."""
+        return self.iter_layer(self.document_class.NAMED_ENTITIES_LAYER_TAG)
+
+    def coreferences(self):
+        """ Yield the coreference clusters of the coreferences layer."""
+        return self.iter_layer(self.document_class.COREFERENCE_LAYER_TAG)
+
+    def sentences(self):
+        """ Yield a Sentence bundle for each sentence. See
+        pynaf.sentences.iter_stream_sentences."""
+        return iter_stream_sentences(self)
+
+
+def _indented(element, level):
+    """ Indent a detached element as NAFDocument.to_string pretty prints it
+    at the given depth, and return it.
+
+    :param element: The element, not part of any document.
+    :param level: The depth of the element in the document.
+    """
+    etree.indent(element, space="  ", level=level)
+    return element
+
+
+class NAFWriter(object):
+    """ Write a NAF document element by element without building the full
+    tree.
+
+    The writer follows the NAFDocument API: each add_* call builds the
+    element as NAFDocument does, writes it to the output and releases it.
+    Layers are written in the order their elements are added, and the output
+    is the same that NAFDocument.write produces for a document built with the
+    same calls in the same order. Some libxml2 versions, such as 2.12, write
+    the non ASCII characters of attribute values as character references in
+    the incremental output; the document is the same, but not the bytes. Use
+    it as a context manager or call close when done.
+    """
+
+    def __init__(self, output, document_class=NAFDocument, language=None,
+                 version="2.0", header=None, encoding="utf-8"):
+        """ Prepare the document basic structure and start the output.
+
+        :param output: A file type object where the document is written.
+        :param document_class: The class that builds the elements,
+        NAFDocument or KAFDocument.
+        :param language: The language of the document.
+        :param version: The version of the document format.
+        :param header: Header elements, as in NAFDocument.
+        :param encoding: The encoding of the output.
+        """
+        self.output = output
+        self.document = document_class(
+            language=language, version=version, header=header,
+            encoding=encoding)
+        self._header_written = False
+        self._raw_written = False
+        self._text_written = False
+        self._layer_tag = None
+        self._layer = None
+
+        self._xmlfile = etree.xmlfile(output, encoding=encoding)
+        self._file = self._xmlfile.__enter__()
+        if encoding.upper() not in ("ASCII", "UTF-8", "UTF8", "US-ASCII"):
+            self._file.write_declaration()
+        # lxml incremental writer does not map the xml namespace to its
+        # reserved prefix, so it is given by hand.
+        root = self.document.root
+        root_attributes = OrderedDict(
+            (key.replace(XML_NAMESPACE, "xml:"), value)
+            for key, value in root.attrib.items())
+        self._root = self._file.element(root.tag, root_attributes)
+        self._root.__enter__()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+    def add_linguistic_processors(self, layer, name, version,
+                                  begin_timestamp, end_timestamp, hostname):
+        """Add a Linguistic processor to the head. The header must not be
+        written yet.
+
+        :param layer: Linguistic layer name.
+        :param name: Processor name.
+        :param version: Processor version.
+        :param begin_timestamp: Processing start timestamp
+        :param end_timestamp: Processing end timestamp
+        :param hostname: name of the procesing machine
+        """
+        if self._header_written:
+            raise Exception("Header already written")
+        self.document.add_linguistic_processors(
+            layer, name, version, begin_timestamp, end_timestamp, hostname)
+
+    def write_header(self):
+        """ Write the header. It is written automatically before the first
+        layer if not called."""
+        if self._header_written:
+            return
+        self._header_written = True
+        header = self.document.kaf_header
+        if header is None:
+            return
+        self._file.write(
+            "\n  ", _indented(deepcopy(header), 1), with_tail=False)
+
+    def add_raw_text(self, raw_text):
+        """Write the Raw layer.
+
+        :param raw_text: The original text.
+        """
+        if self._raw_written:
+            raise Exception("Raw layer already written")
+        self._advance(self.document.RAW_LAYER_TAG)
+        self.document.add_raw_text(raw_text)
+        self._write_layer(self.document.raw)
+        self._raw_written = True
+
+    def add_word(self, word, wid, **kwargs):
+        """Write a word. See NAFDocument.add_word."""
+        self._write_element(
+            self.document.TEXT_LAYER_TAG,
+            self.document.add_word(word, wid, **kwargs))
+
+    def add_term(self, *args, **kwargs):
+        """Write a term. See NAFDocument.add_term."""
+        self._write_element(
+            self.document.TERMS_LAYER_TAG,
+            self.document.add_term(*args, **kwargs))
+
+    def add_dependency(self, *args, **kwargs):
+        """Write a dependency. See NAFDocument.add_dependency."""
+        self._write_element(
+            self.document.DEPENDENCY_LAYER_TAG,
+            self.document.add_dependency(*args, **kwargs))
+
+    def add_chunk(self, *args, **kwargs):
+        """Write a chunk. See NAFDocument.add_chunk."""
+        self._write_element(
+            self.document.CHUNKS_LAYER_TAG,
+            self.document.add_chunk(*args, **kwargs))
+
+    def add_constituency_tree(self, *args, **kwargs):
+        """Write a constituency tree. See
+        NAFDocument.add_constituency_tree."""
+        self._write_element(
+            self.document.CONSTITUENCY_LAYER,
+            self.document.add_constituency_tree(*args, **kwargs))
+
+    def add_entity(self, *args, **kwargs):
+        """Write an entity. See NAFDocument.add_entity."""
+        self._write_element(
+            self.document.NAMED_ENTITIES_LAYER_TAG,
+            self.document.add_entity(*args, **kwargs))
+
+    def add_coreference(self, *args, **kwargs):
+        """Write a coreference cluster. See NAFDocument.add_coreference."""
+        self._write_element(
+            self.document.COREFERENCE_LAYER_TAG,
+            self.document.add_coreference(*args, **kwargs))
+
+    def _advance(self, layer_tag):
+        """ Close the open layer and write every layer that NAFDocument
+        always includes before the wanted one.
+
+        :param layer_tag: The layer that is going to be written.
+        """
+        if layer_tag is not None and self._layer_tag == layer_tag:
+            return
+        if self._layer is not None:
+            self._file.write("\n  ")
+            self._layer.__exit__(None, None, None)
+            self._layer = self._layer_tag = None
+        self.write_header()
+        if not self._raw_written and layer_tag != self.document.RAW_LAYER_TAG:
+            self._write_layer(self.document.raw)
+            self._raw_written = True
+        if not self._text_written and layer_tag not in (
+                self.document.RAW_LAYER_TAG, self.document.TEXT_LAYER_TAG):
+            self._write_layer(self.document.text)
+            self._text_written = True
+
+    def _write_layer(self, layer):
+        """ Write a complete layer.
+
+        :param layer: The layer element.
+        """
+        self._file.write(
+            "\n  ", _indented(deepcopy(layer), 1), with_tail=False)
+
+    def _write_element(self, layer_tag, element):
+        """ Write an element inside its layer and release it.
+
+        :param layer_tag: The tag of the layer of the element.
+        :param element: The element to write.
+        """
+        self._advance(layer_tag)
+        if self._layer is None:
+            if layer_tag == self.document.TEXT_LAYER_TAG:
+                self._text_written = True
+            self._file.write("\n  ")
+            self._layer = self._file.element(layer_tag)
+            self._layer.__enter__()
+            self._layer_tag = layer_tag
+        element.getparent().remove(element)
+        self._file.write("\n    ", _indented(element, 2), with_tail=False)
+
+    def close(self):
+        """ Finish the document and flush the output."""
+        if self._root is None:
+            return
+        self._advance(None)
+        self._file.write("\n")
+        self._root.__exit__(None, None, None)
+        self._root = None
+        self._xmlfile.__exit__(None, None, None)
+        self.output.write(b"\n")
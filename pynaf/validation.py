@@ -0,0 +1,150 @@
+from __future__ import unicode_literals
+
+"""Validation of NAF documents against DTD, RelaxNG and XML Schema files
+compiled once and reused. """
+
+import os
+from collections import namedtuple
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+from threading import local
+
+from lxml import etree
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+DTD = "dtd"
+RELAXNG = "relaxng"
+XSD = "xsd"
+VALIDATOR_CLASSES = {
+    DTD: etree.DTD,
+    RELAXNG: etree.RelaxNG,
+    XSD: etree.XMLSchema,
+}
+EXTENSIONS = {".dtd": DTD, ".rng": RELAXNG, ".xsd": XSD}
+
+_thread_state = local()
+
+ValidationResult = namedtuple(
+    "ValidationResult", ("source", "valid", "errors"))
+""" The outcome of validating a document: the path or document validated,
+if it is valid and the list of error messages."""
+
+
+def schema_kind(source, kind=None):
+    """ Return the kind of a schema, given or guessed from its extension.
+
+    :param source: The path of the schema.
+    :param kind: DTD, RELAXNG or XSD, or None to guess it.
+    """
+    if kind is None:
+        kind = EXTENSIONS.get(os.path.splitext(source)[1].lower())
+        if kind is None:
+            raise ValueError("Unknown schema kind of {0}".format(source))
+    elif kind not in VALIDATOR_CLASSES:
+        raise ValueError("Unknown schema kind {0}".format(kind))
+    return kind
+
+
+def get_validator(source, kind=None):
+    """ Return the compiled validator of a schema file, compiling it only
+    the first time it is asked for.
+
+    The errors of an lxml validator are kept in the validator itself, so
+    each thread keeps its own compiled copy and validations of different
+    threads do not mix their errors.
+    :param source: The path or URL of the schema.
+    :param kind: DTD, RELAXNG or XSD. By default guessed from the
+    extension.
+    """
+    kind = schema_kind(source, kind)
+    validators = getattr(_thread_state, "validators", None)
+    if validators is None:
+        validators = _thread_state.validators = {}
+    key = (kind, source)
+    validator = validators.get(key)
+    if validator is None:
+        if kind == DTD:
+            validator = validators[key] = etree.DTD(source)
+        else:
+            validator = validators[key] = VALIDATOR_CLASSES[kind](
+                etree.parse(source))
+    return validator
+
+
+def clear_validators():
+    """ Forget the compiled validators of the current thread, for instance
+    after a schema file changes."""
+    _thread_state.validators = {}
+
+
+def _parser():
+    """ Return the parser of the current thread for the validated files."""
+    parser = getattr(_thread_state, "parser", None)
+    if parser is None:
+        parser = _thread_state.parser = etree.XMLParser(
+            remove_comments=False, huge_tree=True)
+    return parser
+
+
+def validate(item, source, kind=None):
+    """ Validate a document and return a ValidationResult.
+
+    :param item: A NAFDocument, an element or the path of a NAF file. Files
+    are validated as they are, documents as they are now.
+    :param source: The path of the schema.
+    :param kind: DTD, RELAXNG or XSD. By default guessed from the
+    extension.
+    """
+    validator = get_validator(source, kind)
+    try:
+        if hasattr(item, "root"):
+            root = item.root
+        elif etree.iselement(item):
+            root = item
+        else:
+            root = etree.parse(item, _parser()).getroot()
+    except (IOError, etree.XMLSyntaxError) as error:
+        return ValidationResult(item, False, [str(error)])
+    valid = validator.validate(root)
+    return ValidationResult(item, valid, [
+        "{0}:{1}: {2}".format(error.line, error.column, error.message)
+        for error in validator.error_log] if not valid else [])
+
+
+def validate_documents(items, source, kind=None, threads=1,
+                       max_pending=None):
+    """ Validate many documents against one schema and yield a
+    ValidationResult for each, in order.
+
+    The schema is compiled once per thread. lxml releases the GIL while
+    parsing and validating, so files are checked in parallel with threads
+    greater than one, with no more than max_pending items read ahead of the
+    consumer.
+    :param items: An iterable of NAFDocument, elements or file paths.
+    :param source: The path of the schema.
+    :param kind: DTD, RELAXNG or XSD. By default guessed from the
+    extension.
+    :param threads: Number of threads, None for the number of CPUs.
+    :param max_pending: Maximum items in flight with threads. By default
+    twice the number of threads.
+    """
+    # pynaf.corpus imports pynaf, which imports this module
+    from pynaf.corpus import imap_in_order
+
+    kind = schema_kind(source, kind)
+    if threads == 1:
+        for item in items:
+            yield validate(item, source, kind)
+        return
+    threads = threads or cpu_count()
+    pool = ThreadPool(threads)
+    try:
+        for result in imap_in_order(
+                pool, lambda item: validate(item, source, kind), items,
+                max_pending or threads * 2):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,298 @@
+from __future__ import unicode_literals
+
+"""Light typed views of the words, terms, entities, dependencies and
+coreference mentions of a NAF document.
+
+A view wraps an element and decodes each attribute the first time it is
+read: numbers to ints and spans to tuples of ids. The decoded value is kept
+in a slot of the view, so later reads are plain attribute accesses. Views
+have no instance dict; an unread attribute takes no memory. They read the
+element once and do not follow later changes of it.
+"""
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+def _integer(value):
+    """ Decode an optional numeric attribute."""
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def _span(element, document_class):
+    """ Return the target ids of the spans right under an element."""
+    target_id = document_class.TARGET_ID_ATTRIBUTE
+    return tuple(
+        target.get(target_id)
+        for span in element.iterchildren(document_class.SPAN_TAG)
+        for target in span.iterchildren(document_class.TARGET_TAG))
+
+
+class View(object):
+    """ The element of a view and the document class whose constants name
+    its attributes."""
+    __slots__ = ("element", "document_class")
+
+    def __init__(self, element, document_class):
+        """ Wrap an element.
+
+        :param element: The element of the document.
+        :param document_class: NAFDocument or KAFDocument.
+        """
+        self.element = element
+        self.document_class = document_class
+
+
+class Word(View):
+    """ A word form of the text layer. Offsets and lengths are ints, or
+    None if missing."""
+    __slots__ = ("_id", "_form", "_offset", "_length", "_sent", "_para")
+
+    @property
+    def id(self):
+        try:
+            return self._id
+        except AttributeError:
+            self._id = self.element.get(self.document_class.WORD_ID_ATTRIBUTE)
+            return self._id
+
+    @property
+    def form(self):
+        try:
+            return self._form
+        except AttributeError:
+            self._form = self.element.text
+            return self._form
+
+    @property
+    def offset(self):
+        try:
+            return self._offset
+        except AttributeError:
+            self._offset = _integer(self.element.get("offset"))
+            return self._offset
+
+    @property
+    def length(self):
+        try:
+            return self._length
+        except AttributeError:
+            self._length = _integer(self.element.get("length"))
+            return self._length
+
+    @property
+    def end(self):
+        """ The offset after the last character, or None."""
+        if self.offset is None or self.length is None:
+            return None
+        return self.offset + self.length
+
+    @property
+    def sent(self):
+        try:
+            return self._sent
+        except AttributeError:
+            self._sent = self.element.get("sent")
+            return self._sent
+
+    @property
+    def para(self):
+        try:
+            return self._para
+        except AttributeError:
+            self._para = self.element.get("para")
+            return self._para
+
+
+class Term(View):
+    """ A term of the terms layer. span is the tuple of its word ids."""
+    __slots__ = ("_id", "_lemma", "_pos", "_morphofeat", "_type", "_ner",
+                 "_span")
+
+    @property
+    def id(self):
+        try:
+            return self._id
+        except AttributeError:
+            self._id = self.element.get(self.document_class.TERM_ID_ATTRIBUTE)
+            return self._id
+
+    @property
+    def lemma(self):
+        try:
+            return self._lemma
+        except AttributeError:
+            self._lemma = self.element.get(
+                self.document_class.LEMMA_ATTRIBUTE)
+            return self._lemma
+
+    @property
+    def pos(self):
+        try:
+            return self._pos
+        except AttributeError:
+            self._pos = self.element.get(self.document_class.POS_ATTRIBUTE)
+            return self._pos
+
+    @property
+    def morphofeat(self):
+        try:
+            return self._morphofeat
+        except AttributeError:
+            self._morphofeat = self.element.get(
+                self.document_class.MORPHOFEAT_ATTRIBUTE)
+            return self._morphofeat
+
+    @property
+    def type(self):
+        try:
+            return self._type
+        except AttributeError:
+            self._type = self.element.get(self.document_class.TYPE_ATTRIBUTE)
+            return self._type
+
+    @property
+    def ner(self):
+        try:
+            return self._ner
+        except AttributeError:
+            self._ner = self.element.get(self.document_class.NER_ATTRIBUTE)
+            return self._ner
+
+    @property
+    def span(self):
+        try:
+            return self._span
+        except AttributeError:
+            self._span = _span(self.element, self.document_class)
+            return self._span
+
+
+class Entity(View):
+    """ A named entity. references is a tuple with the term ids of each
+    reference span and span the term ids of all of them."""
+    __slots__ = ("_id", "_type", "_references", "_span")
+
+    @property
+    def id(self):
+        try:
+            return self._id
+        except AttributeError:
+            self._id = self.element.get(
+                self.document_class.NAMED_ENTITY_ID_ATTRIBUTE)
+            return self._id
+
+    @property
+    def type(self):
+        try:
+            return self._type
+        except AttributeError:
+            self._type = self.element.get(
+                self.document_class.NAMED_ENTITY_TYPE_ATTRIBUTE)
+            return self._type
+
+    @property
+    def references(self):
+        try:
+            return self._references
+        except AttributeError:
+            document_class = self.document_class
+            target_id = document_class.TARGET_ID_ATTRIBUTE
+            self._references = tuple(
+                tuple(target.get(target_id)
+                      for target in span.iterchildren(
+                          document_class.TARGET_TAG))
+                for group in self.element.iterchildren(
+                    document_class.NAMED_ENTITY_REFERENCES_GROUP_TAG)
+                for span in group.iterchildren(document_class.SPAN_TAG))
+            return self._references
+
+    @property
+    def span(self):
+        try:
+            return self._span
+        except AttributeError:
+            self._span = tuple(
+                tid for reference in self.references for tid in reference)
+            return self._span
+
+
+class Dependency(View):
+    """ A dependency between two terms, named like the arguments of
+    NAFDocument.add_dependency."""
+    __slots__ = ("_origen", "_to", "_rfunc")
+
+    @property
+    def origen(self):
+        """ The id of the governor term."""
+        try:
+            return self._origen
+        except AttributeError:
+            self._origen = self.element.get(
+                self.document_class.DEPENDENCY_FROM_ATTRIBUTE)
+            return self._origen
+
+    @property
+    def to(self):
+        """ The id of the dependent term."""
+        try:
+            return self._to
+        except AttributeError:
+            self._to = self.element.get(
+                self.document_class.DEPENDENCY_TO_ATTRIBUTE)
+            return self._to
+
+    @property
+    def rfunc(self):
+        """ The dependency function."""
+        try:
+            return self._rfunc
+        except AttributeError:
+            self._rfunc = self.element.get(
+                self.document_class.DEPENDENCY_FUNCTION_ATTRIBUTE)
+            return self._rfunc
+
+
+class CorefMention(View):
+    """ A mention of a coreference cluster. The element is the span of the
+    mention; span is the tuple of its term ids and head the id of the term
+    marked as head, or None."""
+    __slots__ = ("coid", "_span", "_head")
+
+    def __init__(self, element, document_class, coid):
+        """ Wrap a mention.
+
+        :param element: The span element of the mention.
+        :param document_class: NAFDocument or KAFDocument.
+        :param coid: The id of the cluster.
+        """
+        super(CorefMention, self).__init__(element, document_class)
+        self.coid = coid
+
+    @property
+    def span(self):
+        try:
+            return self._span
+        except AttributeError:
+            target_id = self.document_class.TARGET_ID_ATTRIBUTE
+            self._span = tuple(
+                target.get(target_id) for target in
+                self.element.iterchildren(self.document_class.TARGET_TAG))
+            return self._span
+
+    @property
+    def head(self):
+        try:
+            return self._head
+        except AttributeError:
+            document_class = self.document_class
+            self._head = None
+            for target in self.element.iterchildren(
+                    document_class.TARGET_TAG):
+                if target.get(document_class.TARGET_HEAD_ATTRIBUTE) == \
+                        document_class.TARGET_HEAD_YES:
+                    self._head = target.get(
+                        document_class.TARGET_ID_ATTRIBUTE)
+                    break
+            return self._head
@@ -26,6 +26,9 @@ setup(
         'Programming Language :: Python :: 2.7',
     ],
     keywords='NLP XML markup NAF',
-    install_requires=['lxml']
+    install_requires=['lxml'],
+    extras_require={
+        'arrays': ['numpy'],
+    }
 )
 
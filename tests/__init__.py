@@ -0,0 +1,18 @@
+from __future__ import unicode_literals
+
+"""Tests of pynaf. They run with python -m pytest or, where pytest is not
+installed, python -m unittest discover -s tests -t .
+
+The documents of the tests are made with the synthetic generator of the
+benchmarks, so the benchmarks directory is added to the import path.
+"""
+
+import os
+import sys
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+BENCHMARKS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+if BENCHMARKS not in sys.path:
+    sys.path.insert(0, BENCHMARKS)
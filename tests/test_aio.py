@@ -0,0 +1,111 @@
+from __future__ import unicode_literals
+
+"""Tests of the asyncio executor of pynaf.aio, which needs Python 3. """
+
+import threading
+import time
+import unittest
+
+try:
+    import asyncio
+    from pynaf.aio import NAFExecutor
+except (ImportError, SyntaxError):
+    NAFExecutor = None
+
+from generator import build, generate
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+class Counter(object):
+    """ A blocking job that records how many jobs run at the same time."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most = 0
+
+    def __call__(self, value):
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+        time.sleep(0.01)
+        with self.lock:
+            self.running -= 1
+        return value
+
+
+def run_in_new_loop(make):
+    """ Run the awaitable returned by make in a new event loop of the
+    current thread and close the loop.
+
+    :param make: A function without arguments that returns the awaitable,
+    called once the loop is set.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(make())
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+@unittest.skipIf(NAFExecutor is None, "pynaf.aio needs Python 3")
+class ExecutorTest(unittest.TestCase):
+
+    def test_limit(self):
+        counter = Counter()
+        executor = NAFExecutor(max_workers=4, max_concurrency=2)
+        try:
+            results = run_in_new_loop(lambda: asyncio.gather(
+                *[executor.run(counter, index) for index in range(10)]))
+        finally:
+            executor.close()
+        self.assertEqual(results, list(range(10)))
+        self.assertEqual(counter.most, 2)
+
+    def test_several_loops(self):
+        executor = NAFExecutor(max_workers=2, max_concurrency=1)
+        try:
+            for _ in range(3):
+                # More jobs than the limit, so they wait on the semaphore
+                results = run_in_new_loop(lambda: asyncio.gather(
+                    *[executor.run(Counter(), index) for index in range(3)]))
+                self.assertEqual(results, [0, 1, 2])
+        finally:
+            executor.close()
+
+    def test_loops_in_threads(self):
+        executor = NAFExecutor(max_workers=4, max_concurrency=1)
+        results = []
+
+        def serve():
+            results.append(run_in_new_loop(lambda: asyncio.gather(
+                *[executor.run(Counter(), index) for index in range(5)])))
+
+        threads = [threading.Thread(target=serve) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        executor.close()
+        self.assertEqual(results, [[0, 1, 2, 3, 4]] * 3)
+
+    def test_load_and_serialize(self):
+        built = build(generate(200))
+        data = built.to_string()
+        executor = NAFExecutor()
+        try:
+            document = run_in_new_loop(lambda: executor.load(data))
+            result = run_in_new_loop(
+                lambda: executor.serialize(document))
+        finally:
+            executor.close()
+        self.assertEqual(len(document.get_words()),
+                         len(built.get_words()))
+        self.assertEqual(result, document.to_string())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+from __future__ import unicode_literals
+
+"""Tests of the NumPy structured array views of the layers. """
+
+import sys
+import unittest
+
+from lxml import etree
+
+from pynaf import KAFDocument, NAFDocument
+from generator import build, generate
+
+try:
+    from pynaf import arrays
+except ImportError:
+    arrays = None
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+def layers(document, method="xml"):
+    """ Return the serialization of the text, terms and deps layers."""
+    return [etree.tostring(layer, method=method) for layer in (
+        document.text, document.terms, document.dependencies)]
+
+
+@unittest.skipIf(arrays is None, "numpy is not installed")
+class ArraysTest(unittest.TestCase):
+
+    def round_trip(self, document):
+        words, terms, dependencies = arrays.to_arrays(document)
+        return arrays.from_arrays(
+            words, terms, dependencies, document.__class__,
+            raw_text=document.get_raw_text())
+
+    def test_round_trip(self):
+        for document_class in (NAFDocument, KAFDocument):
+            document = build(generate(300), document_class)
+            self.assertEqual(layers(self.round_trip(document)),
+                             layers(document))
+
+    def test_parsed_round_trip(self):
+        data = (b'<NAF xml:lang="en" version="2.0"><nafHeader/><text>'
+                b'<wf sent="s1" offset="0" length="1" id="w1">a</wf>'
+                b'<wf sent="s1" offset="2" length="1" id="w2">b</wf>'
+                b'<wf sent="s2" page="iv" id="w3">c</wf>'
+                b'</text><terms>'
+                b'<term id="t1" lemma="a"><span><target id="w3"/>'
+                b'<target id="w1"/></span></term>'
+                b'<term id="t2" pos="N"/>'
+                b'</terms><deps><dep from="t1" to="t2" rfunc="x"/></deps>'
+                b'</NAF>')
+        document = NAFDocument(input_stream=data)
+        words, terms, _ = arrays.to_arrays(document)
+        self.assertEqual(words["sent"].tolist(), ["s1", "s1", "s2"])
+        self.assertEqual(words["offset"].tolist(), [0, 2, arrays.MISSING])
+        # The order of the span is kept, and the range covers the gap
+        self.assertEqual(terms["span"].tolist()[0], [2, 0])
+        self.assertEqual(terms["word_start"].tolist(), [0, arrays.MISSING])
+        self.assertEqual(terms["word_end"].tolist(), [3, arrays.MISSING])
+        # On Python 2 lxml sorts the attributes of new elements, so the
+        # order of the parsed ones is only kept on Python 3
+        method = "c14n" if sys.version_info[0] < 3 else "xml"
+        self.assertEqual(layers(self.round_trip(document), method),
+                         layers(document, method))
+
+    def test_dependencies(self):
+        document = build(generate(100))
+        words, terms, dependencies = arrays.to_arrays(document)
+        first = document.get_dependencies()[0]
+        self.assertEqual(
+            terms["id"][dependencies["head"][0]],
+            first.get(document.DEPENDENCY_FROM_ATTRIBUTE))
+        self.assertEqual(len(dependencies), len(document.get_dependencies()))
+
+
+if __name__ == "__main__":
+    unittest.main()
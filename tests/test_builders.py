@@ -0,0 +1,89 @@
+from __future__ import unicode_literals
+
+"""Tests of the bulk layer builders against the one by one methods. """
+
+import unittest
+
+from pynaf import KAFDocument, NAFDocument
+from generator import generate
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+class BuildersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.content = generate(200)
+
+    def one_by_one(self, document_class):
+        document = document_class()
+        for form, wid, attributes in self.content["words"]:
+            document.add_word(form, wid, **attributes)
+        for tid, term_type, lemma, pos, words in self.content["terms"]:
+            document.add_term(tid, pos=pos, lemma=lemma, term_type=term_type,
+                              words=words)
+        for origen, to, rfunc in self.content["dependencies"]:
+            document.add_dependency(origen, to, rfunc)
+        return document
+
+    def bulk(self, document_class):
+        document = document_class()
+        words = self.content["words"]
+        # Generators, to check that any iterable is accepted
+        document.add_words(
+            (form for form, _, _ in words), (wid for _, wid, _ in words),
+            **dict((name, [attributes[name] for _, _, attributes in words])
+                   for name in ("sent", "para", "offset", "length")))
+        terms = self.content["terms"]
+        document.add_terms(
+            (term[0] for term in terms),
+            pos=[term[3] for term in terms],
+            lemma=[term[2] for term in terms],
+            term_type=[term[1] for term in terms],
+            words=[term[4] for term in terms])
+        dependencies = self.content["dependencies"]
+        document.add_dependencies(
+            *zip(*dependencies))
+        return document
+
+    def test_same_document(self):
+        for document_class in (NAFDocument, KAFDocument):
+            self.assertEqual(self.bulk(document_class).to_string(),
+                             self.one_by_one(document_class).to_string())
+
+    def test_index_after_bulk(self):
+        document = self.bulk(NAFDocument)
+        self.assertEqual(document.get_term("t5").get("lemma"),
+                         self.content["terms"][4][2])
+        self.assertEqual(document.get_words_by_id("w5").text,
+                         self.content["words"][4][0])
+
+    def test_omitted_values(self):
+        document = NAFDocument()
+        document.add_words(["a", "b"], ["w1", "w2"], offset=["0", None])
+        self.assertEqual(document.get_words_by_id("w1").get("offset"), "0")
+        self.assertIsNone(document.get_words_by_id("w2").get("offset"))
+        document.add_terms(["t1", "t2"], lemma=["a", None])
+        self.assertIsNone(document.get_term("t2").get("lemma"))
+
+    def test_length_mismatch(self):
+        document = NAFDocument()
+        self.assertRaises(ValueError, document.add_words,
+                          ["a", "b"], ["w1"])
+        self.assertRaises(ValueError, document.add_words,
+                          ["a", "b"], ["w1", "w2"], offset=["0"])
+        self.assertRaises(ValueError, document.add_terms,
+                          ["t1", "t2"], pos=["N"])
+        self.assertRaises(ValueError, document.add_terms,
+                          ["t1"], words=[["w1"], ["w2"]])
+        self.assertRaises(ValueError, document.add_dependencies,
+                          ["t1", "t2"], ["t2", "t1"], ["nsubj"])
+        # Nothing is added by a failed call
+        self.assertEqual(document.get_words(), [])
+        self.assertEqual(document.get_terms(), [])
+        self.assertEqual(document.get_dependencies(), [])
+        self.assertIsNone(document.terms)
+
+
+if __name__ == "__main__":
+    unittest.main()
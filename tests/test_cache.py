@@ -0,0 +1,121 @@
+from __future__ import unicode_literals
+
+"""Tests of the sidecar cache of parsed files. """
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from lxml import etree
+
+from pynaf import NAFDocument
+from pynaf.cache import DocumentCache
+from generator import build, generate
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+DTD = """<!ELEMENT NAF (nafHeader, raw, text)>
+<!ATTLIST NAF xml:lang CDATA #IMPLIED version CDATA #IMPLIED>
+<!ELEMENT nafHeader EMPTY>
+<!ELEMENT raw (#PCDATA)>
+<!ELEMENT text (wf*)>
+<!ELEMENT wf (#PCDATA)>
+<!ATTLIST wf id ID #REQUIRED>
+"""
+VALID = b"""<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE NAF SYSTEM "naf.dtd">
+<NAF xml:lang="en" version="2.0"><nafHeader/><raw>a</raw>
+<text><wf id="w1">a</wf></text></NAF>
+"""
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = DocumentCache(
+            os.path.join(self.directory, "cache"), min_size=0)
+        self.path = self.write("document.naf", build(generate(100)).to_string())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, "wb") as output:
+            output.write(data)
+        return path
+
+    def load(self, path=None, **kwargs):
+        return NAFDocument(file_name=path or self.path, cache=self.cache,
+                           **kwargs)
+
+    def test_hits(self):
+        cold = self.load()
+        warm = self.load()
+        self.assertEqual((self.cache.misses, self.cache.hits), (1, 1))
+        self.assertEqual(warm.to_string(), cold.to_string())
+        self.assertEqual(warm.to_string(),
+                         NAFDocument(file_name=self.path).to_string())
+
+    def test_changed_file(self):
+        for key in ("mtime", "content"):
+            self.cache = DocumentCache(
+                os.path.join(self.directory, key), key=key, min_size=0)
+            self.load()
+            document = build(generate(50))
+            document.add_entity("e_" + key, "MISC", [["t1"]])
+            self.write("document.naf", document.to_string())
+            # A different size changes the mtime key as well
+            self.assertIsNotNone(self.load().get_entity("e_" + key))
+            self.assertEqual(self.cache.hits, 0)
+            self.load()
+            self.assertEqual(self.cache.hits, 1)
+
+    def test_invalidate(self):
+        self.load()
+        self.cache.invalidate(self.path)
+        self.load()
+        self.assertEqual((self.cache.misses, self.cache.hits), (2, 0))
+
+    def test_disabled(self):
+        self.cache.enabled = False
+        self.load()
+        self.load()
+        self.assertEqual((self.cache.misses, self.cache.hits), (0, 0))
+
+    def test_small_file(self):
+        self.cache.min_size = os.path.getsize(self.path) + 1
+        self.load()
+        self.load()
+        self.assertEqual((self.cache.misses, self.cache.hits), (0, 0))
+        self.assertEqual(os.listdir(self.cache.directory), [])
+
+    def test_eviction(self):
+        self.cache.max_size = 1
+        self.load()
+        self.assertEqual(os.listdir(self.cache.directory), [])
+
+    def test_validation_is_not_skipped(self):
+        # Filled by a load without validation, the cache must not let a
+        # document without DTD pass a validating load
+        self.load()
+        self.assertRaises(etree.XMLSyntaxError, self.load,
+                          dtd_validation=True)
+
+    def test_validated_sidecar(self):
+        self.write("naf.dtd", DTD.encode("utf-8"))
+        path = self.write("valid.naf", VALID)
+        self.load(path, dtd_validation=True)
+        self.load(path, dtd_validation=True)
+        self.load(path)
+        self.assertEqual((self.cache.misses, self.cache.hits), (1, 2))
+        invalid = self.write("invalid.naf", VALID.replace(b' id="w1"', b""))
+        self.load(invalid)
+        self.assertRaises(etree.XMLSyntaxError, self.load, invalid,
+                          dtd_validation=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
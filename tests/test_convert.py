@@ -0,0 +1,121 @@
+from __future__ import unicode_literals
+
+"""Tests of the streaming KAF and NAF converter. """
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from lxml import etree
+
+from pynaf import KAFDocument, NAFDocument
+from pynaf.convert import convert, convert_corpus
+from generator import build, generate
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+def canonical(data):
+    """ Return the canonical form of a serialized document, with the
+    attributes sorted."""
+    return etree.tostring(etree.fromstring(data), method="c14n")
+
+
+def converted(data, source_class, target_class):
+    output = io.BytesIO()
+    convert(io.BytesIO(data), output, source_class, target_class)
+    return output.getvalue()
+
+
+class ConvertTest(unittest.TestCase):
+
+    def setUp(self):
+        self.content = generate(300)
+
+    def test_same_document_as_pynaf(self):
+        for source_class, target_class in ((KAFDocument, NAFDocument),
+                                           (NAFDocument, KAFDocument)):
+            source = build(self.content, source_class).to_string()
+            expected = build(self.content, target_class).to_string()
+            self.assertEqual(
+                canonical(converted(source, source_class, target_class)),
+                canonical(expected))
+
+    def test_round_trip(self):
+        data = build(self.content, KAFDocument).to_string()
+        naf = converted(data, KAFDocument, NAFDocument)
+        self.assertEqual(converted(naf, NAFDocument, KAFDocument), data)
+
+    def test_comments_and_attribute_order(self):
+        data = (b'<KAF xml:lang="en" version="2.0"><kafHeader/>\n'
+                b'  <text>\n    <!-- note -->\n'
+                b'    <wf sent="1" wid="w1" offset="0">a</wf>\n'
+                b'  </text>\n</KAF>')
+        naf = converted(data, KAFDocument, NAFDocument)
+        self.assertIn(b"<!-- note -->", naf)
+        self.assertIn(b'<wf sent="1" id="w1" offset="0">a</wf>', naf)
+        document = NAFDocument(input_stream=naf)
+        self.assertEqual(document.get_words_by_id("w1").text, "a")
+
+
+class ConvertCorpusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input = os.path.join(self.directory, "input")
+        self.output = os.path.join(self.directory, "output")
+        os.makedirs(os.path.join(self.input, "sub"))
+        self.paths = []
+        for index in range(5):
+            path = os.path.join(self.input, "sub" if index % 2 else "",
+                                "{0}.kaf".format(index))
+            with open(path, "wb") as output:
+                output.write(build(generate(30, seed=index),
+                                   KAFDocument).to_string())
+            self.paths.append(path)
+        self.broken = os.path.join(self.input, "broken.kaf")
+        with open(self.broken, "wb") as output:
+            output.write(b"<KAF><text><wf wid='w1'>a</wf>")
+        self.paths.insert(2, self.broken)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_convert_corpus(self):
+        for processes in (1, 2):
+            results = list(convert_corpus(
+                self.paths, self.input, self.output, processes=processes,
+                chunksize=1, max_pending=1))
+            self.assertEqual([result.path for result in results], self.paths)
+            for path, result in zip(self.paths, results):
+                if path == self.broken:
+                    self.assertIsNotNone(result.error)
+                    self.assertFalse(os.path.exists(os.path.join(
+                        self.output, "broken.naf")))
+                    continue
+                self.assertIsNone(result.error)
+                self.assertTrue(result.value.endswith(".naf"))
+                with open(path, "rb") as source:
+                    expected = NAFDocument(input_stream=converted(
+                        source.read(), KAFDocument, NAFDocument))
+                self.assertEqual(
+                    NAFDocument(file_name=result.value).to_string(),
+                    expected.to_string())
+
+    def test_file_outside_the_input_directory(self):
+        outside = os.path.join(self.directory, "outside.kaf")
+        shutil.copy(self.paths[0], outside)
+        for processes in (1, 2):
+            results = list(convert_corpus(
+                [outside, self.paths[0]], self.input, self.output,
+                processes=processes))
+            self.assertIn("not under the input directory", results[0].error)
+            self.assertIsNone(results[1].error)
+            self.assertFalse(os.path.exists(
+                os.path.join(self.directory, "outside.naf")))
+
+
+if __name__ == "__main__":
+    unittest.main()
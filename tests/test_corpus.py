@@ -0,0 +1,142 @@
+from __future__ import unicode_literals
+
+"""Tests of the process pool corpus runner. """
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from pynaf import NAFDocument, corpus
+from pynaf.__main__ import main
+from generator import build, generate
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+def count_words(document):
+    return len(document.get_words())
+
+
+def unpicklable_value(document):
+    return lambda: None
+
+
+def broken_chunk(function, paths, options):
+    raise RuntimeError("broken chunk")
+
+
+class RunTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.paths = []
+        for index, size in enumerate((20, 40, 60, 80, 100)):
+            path = os.path.join(self.directory, "{0}.naf".format(index))
+            with open(path, "wb") as output:
+                build(generate(size, seed=index)).write(output, "utf-8")
+            self.paths.append(path)
+        self.sizes = [
+            len(NAFDocument(file_name=path).get_words())
+            for path in self.paths]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_corpus(self, function, ordered):
+        return list(corpus.run(
+            function, self.paths, processes=2, chunksize=2,
+            ordered=ordered))
+
+    def test_results(self):
+        for ordered in (False, True):
+            results = self.run_corpus(count_words, ordered)
+            if ordered:
+                self.assertEqual([result.path for result in results],
+                                 self.paths)
+            self.assertEqual(
+                sorted((result.path, result.value) for result in results),
+                list(zip(self.paths, self.sizes)))
+            self.assertFalse([result for result in results if result.error])
+
+    def test_output_directory(self):
+        output_directory = os.path.join(self.directory, "output")
+        list(corpus.run(
+            count_words, self.paths, input_directory=self.directory,
+            output_directory=output_directory, processes=2))
+        for path in self.paths:
+            self.assertTrue(os.path.isfile(os.path.join(
+                output_directory, os.path.basename(path))))
+
+    def test_file_outside_the_input_directory(self):
+        input_directory = os.path.join(self.directory, "input")
+        output_directory = os.path.join(self.directory, "output")
+        os.makedirs(input_directory)
+        inside = os.path.join(input_directory, "inside.naf")
+        shutil.copy(self.paths[0], inside)
+        results = list(corpus.run(
+            count_words, [self.paths[1], inside],
+            input_directory=input_directory,
+            output_directory=output_directory, processes=2, ordered=True))
+        self.assertIn("not under the input directory", results[0].error)
+        self.assertIsNone(results[1].error)
+        self.assertEqual(os.listdir(output_directory), ["inside.naf"])
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         sorted(["input", "output"] + [
+                             os.path.basename(path) for path in self.paths]))
+
+    def test_output_path(self):
+        self.assertEqual(
+            corpus.output_path("out", "in", os.path.join("in", "a", "b.kaf"),
+                               ".naf"),
+            os.path.join("out", "a", "b.naf"))
+        for path in (os.path.join("other", "b.naf"), os.pardir,
+                     os.path.join("in", os.pardir, os.pardir, "b.naf")):
+            with self.assertRaises(ValueError):
+                corpus.output_path("out", "in", path)
+
+    def test_unpicklable_value_fails_its_document(self):
+        for ordered in (False, True):
+            results = self.run_corpus(unpicklable_value, ordered)
+            self.assertEqual(len(results), len(self.paths))
+            for result in results:
+                self.assertIsNone(result.value)
+                self.assertIn("pickle", result.error.lower())
+
+    def test_unpicklable_function_raises(self):
+        with self.assertRaises(Exception):
+            self.run_corpus(lambda document: 0, False)
+
+    @unittest.skipIf(sys.version_info[0] < 3,
+                     "Python 2 pools have no error_callback")
+    def test_failed_chunk_gives_document_errors(self):
+        process_chunk = corpus._process_chunk
+        corpus._process_chunk = broken_chunk
+        try:
+            for ordered in (False, True):
+                results = self.run_corpus(count_words, ordered)
+                self.assertEqual(
+                    sorted(result.path for result in results), self.paths)
+                for result in results:
+                    self.assertIn("broken chunk", result.error)
+        finally:
+            corpus._process_chunk = process_chunk
+
+
+class MainTest(unittest.TestCase):
+
+    def test_command_required(self):
+        stderr = sys.stderr
+        sys.stderr = open(os.devnull, "w")
+        try:
+            with self.assertRaises(SystemExit) as raised:
+                main([])
+        finally:
+            sys.stderr.close()
+            sys.stderr = stderr
+        self.assertEqual(raised.exception.code, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
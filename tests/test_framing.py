@@ -0,0 +1,129 @@
+from __future__ import print_function, unicode_literals
+
+"""Tests of framed document streams, workers and pipelines. """
+
+import io
+import os
+import unittest
+
+from pynaf import NAFDocument, framing
+from generator import build, generate
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def add_entity(document):
+    document.add_entity("e_test", "MISC", [["t1"]])
+
+
+def noisy(document):
+    print("hello")
+    add_entity(document)
+
+
+def failing(document):
+    raise ValueError("failing worker")
+
+
+def documents(count):
+    return [build(generate(30, seed=seed)) for seed in range(count)]
+
+
+class FrameTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        stream = io.BytesIO()
+        writer = framing.FrameWriter(stream)
+        originals = documents(3)
+        for index, document in enumerate(originals):
+            writer.write_document(document, "d{0}".format(index))
+        writer.write_error("lost\nline", "bad")
+        stream.seek(0)
+        frames = list(framing.FrameReader(stream))
+        self.assertEqual([frame.name for frame in frames],
+                         ["d0", "d1", "d2", "bad"])
+        for frame, document in zip(frames, originals):
+            self.assertEqual(frame.data,
+                             document.to_string(pretty_print=False))
+        self.assertEqual(frames[-1].kind, framing.ERROR)
+        self.assertEqual(frames[-1].data, b"lost\nline")
+        self.assertRaises(ValueError, frames[-1].load)
+
+    def test_malformed_header(self):
+        reader = framing.FrameReader(io.BytesIO(b"hello\n"))
+        self.assertRaises(ValueError, reader.read)
+
+    def test_serve(self):
+        source = io.BytesIO()
+        writer = framing.FrameWriter(source)
+        writer.write_document(documents(1)[0], "good")
+        writer.write(framing.Frame(framing.DOCUMENT, "broken", b"<NAF"))
+        writer.write_error("earlier", "passed")
+        source.seek(0)
+        output = io.BytesIO()
+        self.assertEqual(framing.serve(add_entity, source, output), 3)
+        output.seek(0)
+        good, broken, passed = framing.FrameReader(output)
+        self.assertIsNotNone(good.load().get_entity("e_test"))
+        self.assertEqual(broken.kind, framing.ERROR)
+        self.assertEqual(passed, framing.Frame(
+            framing.ERROR, "passed", b"earlier"))
+
+
+class PipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        # The workers import the functions of this module
+        self.python_path = os.environ.get("PYTHONPATH")
+        os.environ["PYTHONPATH"] = os.pathsep.join(
+            [ROOT] + ([self.python_path] if self.python_path else []))
+
+    def tearDown(self):
+        if self.python_path is None:
+            del os.environ["PYTHONPATH"]
+        else:
+            os.environ["PYTHONPATH"] = self.python_path
+
+    def frames(self, count):
+        return [framing.Frame(framing.DOCUMENT, "d{0}".format(index),
+                              document.to_string())
+                for index, document in enumerate(documents(count))]
+
+    def test_worker_that_prints(self):
+        commands = [framing.worker_command("tests.test_framing:noisy"),
+                    framing.worker_command("tests.test_framing:add_entity")]
+        fed = self.frames(3)
+        frames = list(framing.run_pipeline(commands, fed))
+        self.assertEqual([frame.name for frame in frames], ["d0", "d1", "d2"])
+        for frame, original in zip(frames, fed):
+            self.assertEqual(frame.kind, framing.DOCUMENT)
+            self.assertEqual(
+                len(frame.load().get_entities()),
+                len(NAFDocument(input_stream=original.data).get_entities())
+                + 2)
+
+    def test_failing_document(self):
+        commands = [framing.worker_command("tests.test_framing:failing")]
+        frames = list(framing.run_pipeline(commands, self.frames(2)))
+        self.assertEqual([frame.kind for frame in frames],
+                         [framing.ERROR, framing.ERROR])
+        self.assertIn(b"failing worker", frames[0].data)
+
+    def test_feed_error_is_raised(self):
+        def frames():
+            for frame in self.frames(1):
+                yield frame
+            raise IOError("unreadable input")
+
+        commands = [framing.worker_command("tests.test_framing:add_entity")]
+        received = []
+        with self.assertRaises(IOError):
+            for frame in framing.run_pipeline(commands, frames()):
+                received.append(frame.name)
+        self.assertEqual(received, ["d0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+from __future__ import unicode_literals
+
+"""Tests of the id index of words, terms, chunks, entities and coreference
+clusters. """
+
+import unittest
+
+from pynaf import KAFDocument, NAFDocument
+from generator import build, generate
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+def layers(document):
+    """ Return (lookup method, elements, id attribute) for each indexed
+    layer of a document."""
+    return (
+        (document.get_words_by_id, document.get_words(),
+         document.WORD_ID_ATTRIBUTE),
+        (document.get_term, document.get_terms(),
+         document.TERM_ID_ATTRIBUTE),
+        (document.get_chunk, document.get_chunks(),
+         document.CHUNK_ID_ATTRIBUTE),
+        (document.get_entity, document.get_entities(),
+         document.NAMED_ENTITY_ID_ATTRIBUTE),
+        (document.get_coreference_cluster, document.get_coreference(),
+         document.COREFERENCE_ID_ATTRIBUTE))
+
+
+class IndexTest(unittest.TestCase):
+
+    def test_lookups(self):
+        for document_class in (NAFDocument, KAFDocument):
+            built = build(generate(500), document_class)
+            parsed = document_class(input_stream=built.to_string())
+            for document in (built, parsed):
+                for lookup, elements, id_attribute in layers(document):
+                    self.assertTrue(elements)
+                    for element in elements:
+                        self.assertIs(lookup(element.get(id_attribute)),
+                                      element)
+
+    def test_missing_ids(self):
+        document = build(generate(100))
+        self.assertIsNone(document.get_words_by_id("missing"))
+        self.assertIsNone(document.get_chunk("missing"))
+        self.assertIsNone(document.get_entity("missing"))
+        self.assertIsNone(document.get_coreference_cluster("missing"))
+        with self.assertRaises(KeyError):
+            document.get_term("missing")
+
+    def test_elements_added_after_a_lookup(self):
+        document = NAFDocument()
+        document.add_word("a", "w1")
+        document.add_term("t1", words=["w1"])
+        self.assertIsNone(document.get_words_by_id("w2"))
+        word = document.add_word("b", "w2")
+        term = document.add_term("t2", words=["w2"])
+        chunk = document.add_chunk("c1", "t2", "NP", terms=["t2"])
+        entity = document.add_entity("e1", "MISC", [["t2"]])
+        cluster = document.add_coreference("co1", [["t1"], ["t2"]])
+        self.assertIs(document.get_words_by_id("w2"), word)
+        self.assertIs(document.get_term("t2"), term)
+        self.assertIs(document.get_chunk("c1"), chunk)
+        self.assertIs(document.get_entity("e1"), entity)
+        self.assertIs(document.get_coreference_cluster("co1"), cluster)
+
+    def test_bulk_builders_after_a_lookup(self):
+        document = NAFDocument()
+        document.add_words(["a"], ["w1"])
+        self.assertIsNotNone(document.get_words_by_id("w1"))
+        document.add_words(["b", "c"], ["w2", "w3"])
+        document.add_terms(["t1", "t2"], words=[["w1"], ["w2", "w3"]])
+        self.assertEqual(document.get_words_by_id("w3").text, "c")
+        self.assertEqual(
+            document.get_term("t2").get(document.TERM_ID_ATTRIBUTE), "t2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+from __future__ import unicode_literals
+
+"""Tests of the call counts and timings of document operations. """
+
+import pickle
+import unittest
+
+from pynaf import KAFDocument, NAFDocument
+from pynaf.instrumentation import PARSE, Instrumentation
+from generator import build, generate
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+class Clock(object):
+    """ A clock that advances one second each time it is read."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 1.0
+        return self.now
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = build(generate(200)).to_string()
+
+    def test_counts(self):
+        instrumentation = Instrumentation(clock=Clock())
+        document = NAFDocument(input_stream=self.data,
+                               instrumentation=instrumentation)
+        document.get_terms()
+        document.get_terms()
+        document.to_string()
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(snapshot[PARSE]["calls"], 1)
+        self.assertEqual(snapshot["get_terms"],
+                         {"calls": 2, "seconds": 2.0})
+        self.assertEqual(snapshot["to_string"]["calls"], 1)
+        instrumentation.reset()
+        self.assertEqual(instrumentation.snapshot(), {})
+
+    def test_hooks_and_detach(self):
+        instrumentation = Instrumentation()
+        calls = []
+        instrumentation.add_hook(
+            lambda operation, seconds, document: calls.append(operation))
+        document = NAFDocument(input_stream=self.data)
+        instrumentation.attach(document)
+        document.get_words()
+        instrumentation.detach(document)
+        document.get_words()
+        self.assertEqual(calls, ["get_words"])
+        self.assertNotIn("get_words", document.__dict__)
+
+    def test_pickle(self):
+        for document_class in (NAFDocument, KAFDocument):
+            instrumentation = Instrumentation()
+            document = document_class(input_stream=self.data,
+                                      instrumentation=instrumentation)
+            document.get_words()
+            copy = pickle.loads(pickle.dumps(document, 2))
+            self.assertIsInstance(copy, document_class)
+            self.assertEqual(copy.to_string(), document.to_string())
+            self.assertIsNone(copy.instrumentation)
+            self.assertNotIn("get_words", copy.__dict__)
+            self.assertEqual(len(copy.get_words()),
+                             len(document.get_words()))
+            # The original stays measured
+            self.assertEqual(
+                instrumentation.snapshot()["get_words"]["calls"], 2)
+
+    def test_pickle_keeps_the_root(self):
+        document = NAFDocument(language="es", version="3.0")
+        document.add_word("a", "w1", sent="1")
+        copy = pickle.loads(pickle.dumps(document))
+        self.assertEqual(copy.to_string(), document.to_string())
+        self.assertEqual(copy.get_words()[0].get("sent"), "1")
+
+
+if __name__ == "__main__":
+    unittest.main()
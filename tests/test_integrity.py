@@ -0,0 +1,112 @@
+from __future__ import unicode_literals
+
+"""Tests of the referential integrity check of documents. """
+
+import unittest
+
+from pynaf import KAFDocument, NAFDocument
+from pynaf.integrity import DANGLING_REFERENCE, DUPLICATE_ID, MISSING_ID, \
+    IntegrityError, IntegrityProblem, assert_integrity, check_integrity
+from generator import build, generate
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+BROKEN = b"""<NAF xml:lang="en" version="2.0">
+<nafHeader/>
+<text>
+<wf id="w1">a</wf>
+<wf id="w1">b</wf>
+<wf>c</wf>
+</text>
+<terms>
+<term id="t1"><span><target id="w1"/></span></term>
+<term id="t2"><span><target id="w9"/></span></term>
+</terms>
+<deps>
+<dep from="t1" to="t3" rfunc="mod"/>
+</deps>
+<chunks>
+<chunk cid="c1" head="t5"><span><target id="t1"/></span></chunk>
+</chunks>
+<entities>
+<entity id="e1" type="MISC"><references><span><target id="t7"/></span>
+</references></entity>
+</entities>
+<coreferences>
+<coref id="co1"><span><target id="t8"/></span></coref>
+</coreferences>
+<constituency>
+<tree>
+<nt id="nter1" label="S"/>
+<t id="ter1"><span><target id="t1"/></span></t>
+<edge id="tre1" from="ter1" to="nter1"/>
+<edge id="tre1" from="ter1" to="nter9"/>
+</tree>
+</constituency>
+</NAF>
+"""
+
+
+class IntegrityTest(unittest.TestCase):
+
+    def test_valid_documents(self):
+        for document_class in (NAFDocument, KAFDocument):
+            document = build(generate(500), document_class)
+            self.assertEqual(check_integrity(document), [])
+            self.assertEqual(document.check_integrity(), [])
+            parsed = document_class(input_stream=document.to_string())
+            self.assertEqual(check_integrity(parsed), [])
+            assert_integrity(parsed)
+
+    def test_problems(self):
+        document = NAFDocument(input_stream=BROKEN)
+        self.assertEqual(check_integrity(document), [
+            IntegrityProblem(DUPLICATE_ID, "text", "w1", None, 5),
+            IntegrityProblem(MISSING_ID, "text", None, None, 6),
+            IntegrityProblem(DANGLING_REFERENCE, "terms", "t2", "w9", 10),
+            IntegrityProblem(DANGLING_REFERENCE, "deps", None, "t3", 13),
+            IntegrityProblem(DANGLING_REFERENCE, "chunks", "c1", "t5", 16),
+            IntegrityProblem(DANGLING_REFERENCE, "entities", "e1", "t7",
+                             19),
+            IntegrityProblem(DANGLING_REFERENCE, "coreferences", "co1",
+                             "t8", 23),
+            IntegrityProblem(DUPLICATE_ID, "constituency", "tre1", None,
+                             30),
+            IntegrityProblem(DANGLING_REFERENCE, "constituency", "tre1",
+                             "nter9", 30),
+        ])
+
+    def test_added_elements(self):
+        document = NAFDocument()
+        document.add_word("a", "w1")
+        document.add_term("t1", words=["w1", "w2"])
+        document.add_dependency("t1", "t2", "mod")
+        problems = check_integrity(document)
+        self.assertEqual(problems, [
+            IntegrityProblem(DANGLING_REFERENCE, "terms", "t1", "w2", None),
+            IntegrityProblem(DANGLING_REFERENCE, "deps", None, "t2", None)])
+        self.assertEqual(problems[0].describe(),
+                         "terms t1: reference to unknown w2")
+
+    def test_describe(self):
+        document = NAFDocument(input_stream=BROKEN)
+        problems = check_integrity(document)
+        self.assertEqual(problems[0].describe(), "5: text w1: duplicate id")
+        self.assertEqual(problems[1].describe(), "6: text element: missing id")
+        self.assertEqual(problems[3].describe(),
+                         "13: deps element: reference to unknown t3")
+        missing = IntegrityProblem(DANGLING_REFERENCE, "deps", None, None, 3)
+        self.assertEqual(missing.describe(),
+                         "3: deps element: missing reference")
+
+    def test_assert_integrity(self):
+        document = NAFDocument(input_stream=BROKEN)
+        with self.assertRaises(IntegrityError) as raised:
+            assert_integrity(document)
+        self.assertIsInstance(raised.exception, ValueError)
+        self.assertEqual(len(raised.exception.problems), 9)
+        self.assertIn("5: text w1: duplicate id", str(raised.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+from __future__ import unicode_literals
+
+"""Tests of the per thread parsers used to load documents. """
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from lxml import etree
+
+from pynaf import NAFDocument, get_parser
+from pynaf.corpus import load_documents
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+DTD = """<!ELEMENT NAF (nafHeader, raw, text)>
+<!ATTLIST NAF xml:lang CDATA #IMPLIED version CDATA #IMPLIED>
+<!ELEMENT nafHeader EMPTY>
+<!ELEMENT raw EMPTY>
+<!ELEMENT text (wf*)>
+<!ELEMENT wf (#PCDATA)>
+<!ATTLIST wf id ID #REQUIRED>
+"""
+THREADS = 8
+ROUNDS = 20
+
+
+class ParsersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, "naf.dtd"), "w") as output:
+            output.write(DTD)
+        document = NAFDocument(language="en")
+        document.add_words(["a"] * 200, ["w{0}".format(index)
+                                         for index in range(200)])
+        valid = b'<!DOCTYPE NAF SYSTEM "naf.dtd">\n' + document.to_string()
+        # A sent attribute is not declared in the DTD
+        document.add_word("b", "bad", sent="1")
+        invalid = b'<!DOCTYPE NAF SYSTEM "naf.dtd">\n' + document.to_string()
+        self.valid = os.path.join(self.directory, "valid.naf")
+        self.invalid = os.path.join(self.directory, "invalid.naf")
+        for path, data in ((self.valid, valid), (self.invalid, invalid)):
+            with open(path, "wb") as output:
+                output.write(data)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_settings_do_not_leak_between_threads(self):
+        outcomes = []
+        start = threading.Barrier(THREADS) if hasattr(
+            threading, "Barrier") else None
+
+        def load(validate):
+            if start is not None:
+                start.wait()
+            for _ in range(ROUNDS):
+                for path in (self.valid, self.invalid):
+                    try:
+                        NAFDocument(file_name=path, dtd_validation=validate)
+                        rejected = False
+                    except etree.XMLSyntaxError:
+                        rejected = True
+                    outcomes.append((validate, path, rejected))
+
+        threads = [threading.Thread(target=load, args=(index % 2 == 0,))
+                   for index in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(outcomes), THREADS * ROUNDS * 2)
+        for validate, path, rejected in outcomes:
+            self.assertEqual(rejected, validate and path == self.invalid,
+                             (validate, path))
+
+    def test_parser_per_thread_and_options(self):
+        parsers = []
+
+        def get():
+            parsers.append((get_parser(False), get_parser(True)))
+
+        thread = threading.Thread(target=get)
+        thread.start()
+        thread.join()
+        get()
+        (other_plain, other_validating), (plain, validating) = parsers
+        self.assertIsNot(plain, validating)
+        self.assertIsNot(plain, other_plain)
+        self.assertIsNot(validating, other_validating)
+        self.assertIs(get_parser(False), plain)
+
+    def test_default_parser_is_not_changed(self):
+        default = etree.get_default_parser()
+        NAFDocument(file_name=self.valid, dtd_validation=True)
+        self.assertIs(etree.get_default_parser(), default)
+
+    def test_load_documents(self):
+        paths = [self.valid] * 6
+        documents = list(load_documents(paths, threads=3))
+        self.assertEqual([len(document.get_words()) for document in documents],
+                         [200] * 6)
+        with self.assertRaises(etree.XMLSyntaxError):
+            list(load_documents([self.valid, self.invalid], threads=2,
+                                dtd_validation=True))
+
+    def test_load_documents_ahead(self):
+        read = []
+
+        def paths():
+            for _ in range(50):
+                read.append(None)
+                yield self.valid
+
+        documents = load_documents(paths(), threads=2, max_pending=3)
+        next(documents)
+        time.sleep(0.2)
+        # The loads wait for the consumer instead of reading the corpus
+        self.assertLessEqual(len(read), 4)
+        self.assertEqual(len(list(documents)), 49)
+        self.assertEqual(len(read), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+"""Tests of memory mapped documents and their raw text views. """
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from lxml import etree
+
+from pynaf import NAFDocument
+from generator import build, generate
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+DTD = """<!ELEMENT NAF (nafHeader, raw, text)>
+<!ATTLIST NAF xml:lang CDATA #IMPLIED version CDATA #IMPLIED>
+<!ELEMENT nafHeader EMPTY>
+<!ELEMENT raw (#PCDATA)>
+<!ELEMENT text (wf*)>
+<!ELEMENT wf (#PCDATA)>
+<!ATTLIST wf id ID #REQUIRED offset CDATA #IMPLIED length CDATA #IMPLIED>
+"""
+
+
+class MemoryMapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, "wb") as output:
+            output.write(data)
+        return path
+
+    def test_raw_text_view(self):
+        document = build(generate(300))
+        path = self.write("document.naf", document.to_string())
+        mapped = NAFDocument(file_name=path, memory_map=True)
+        view = mapped.get_raw_text_view()
+        self.assertEqual(view[:], document.get_raw_text())
+        for word in mapped.get_words()[:50]:
+            self.assertEqual(view.word(word), word.text)
+
+    def test_non_ascii_raw_text(self):
+        document = NAFDocument(language="es")
+        document.add_raw_text("El niño comió")
+        document.add_word("niño", "w1", offset="3", length="4")
+        path = self.write("document.naf", document.to_string())
+        mapped = NAFDocument(file_name=path, memory_map=True)
+        view = mapped.get_raw_text_view()
+        self.assertEqual(view[3:7], "niño")
+        self.assertEqual(view.word(mapped.get_words()[0]), "niño")
+
+    def test_relative_dtd(self):
+        self.write("naf.dtd", DTD.encode("ascii"))
+        document = NAFDocument(language="en")
+        document.add_raw_text("a b")
+        document.add_word("a", "w1", offset="0", length="1")
+        header = b'<!DOCTYPE NAF SYSTEM "naf.dtd">\n'
+        valid = self.write("valid.naf", header + document.to_string())
+        document.add_word("b", "w2", sent="1")
+        invalid = self.write("invalid.naf", header + document.to_string())
+        # The DTD is found next to the file, not in the working directory
+        other = tempfile.mkdtemp()
+        try:
+            os.chdir(other)
+            for memory_map in (False, True):
+                loaded = NAFDocument(file_name=valid, dtd_validation=True,
+                                     memory_map=memory_map)
+                self.assertEqual(loaded.get_raw_text_view()[:], "a b")
+                with self.assertRaises(etree.XMLSyntaxError):
+                    NAFDocument(file_name=invalid, dtd_validation=True,
+                                memory_map=memory_map)
+        finally:
+            os.chdir(self.cwd)
+            shutil.rmtree(other)
+
+
+if __name__ == "__main__":
+    unittest.main()
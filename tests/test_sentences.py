@@ -0,0 +1,116 @@
+from __future__ import unicode_literals
+
+"""Tests of the sentence grouped iteration of documents and streams. """
+
+import io
+import unittest
+
+from pynaf import KAFDocument, NAFDocument
+from pynaf.stream import NAFReader
+from generator import build, generate
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+class CountingStream(io.BytesIO):
+    """ A binary stream that remembers how far it was read."""
+
+    def __init__(self, data):
+        io.BytesIO.__init__(self, data)
+        self.read_bytes = 0
+
+    def read(self, size=-1):
+        data = io.BytesIO.read(self, size)
+        self.read_bytes += len(data)
+        return data
+
+
+def summary(sentence, document_class):
+    """ Return the ids of the elements of a sentence."""
+    return (sentence.sent,
+            [word.get(document_class.WORD_ID_ATTRIBUTE)
+             for word in sentence.words],
+            [term.get(document_class.TERM_ID_ATTRIBUTE)
+             for term in sentence.terms],
+            [(dependency.get(document_class.DEPENDENCY_FROM_ATTRIBUTE),
+              dependency.get(document_class.DEPENDENCY_TO_ATTRIBUTE))
+             for dependency in sentence.dependencies],
+            [entity.get(document_class.NAMED_ENTITY_ID_ATTRIBUTE)
+             for entity in sentence.entities])
+
+
+class SentencesTest(unittest.TestCase):
+
+    def test_sentences(self):
+        document = build(generate(300))
+        sentences = list(document.iter_sentences())
+        self.assertEqual(
+            [sentence.sent for sentence in sentences],
+            sorted(set(word.get("sent") for word in document.get_words()),
+                   key=int))
+        self.assertEqual(sum(len(sentence.words) for sentence in sentences),
+                         len(document.get_words()))
+        self.assertEqual(sum(len(sentence.terms) for sentence in sentences),
+                         len(document.get_terms()))
+        for sentence in sentences:
+            sent = set(word.get(document.WORD_ID_ATTRIBUTE)
+                       for word in sentence.words)
+            for term in sentence.terms:
+                for word in document.get_terms_words(term):
+                    self.assertIn(
+                        word.get(document.TARGET_ID_ATTRIBUTE), sent)
+
+    def test_stream_matches_document(self):
+        for document_class in (NAFDocument, KAFDocument):
+            document = build(generate(300), document_class)
+            expected = [summary(sentence, document_class)
+                        for sentence in document.iter_sentences()]
+            reader = NAFReader(io.BytesIO(document.to_string()),
+                               document_class)
+            self.assertEqual(
+                [summary(sentence, document_class)
+                 for sentence in reader.sentences()], expected)
+
+    def test_stream_yields_before_the_end(self):
+        data = build(generate(5000)).to_string()
+        # Only words: the first sentence comes out with the first words
+        # read. All the default layers: it comes out once the entities,
+        # the last grouped layer, go past it, before the coreferences.
+        for layers, limit in (
+                ((NAFDocument.TEXT_LAYER_TAG,), len(data) // 10),
+                (None, data.index(b"<coreferences>"))):
+            stream = CountingStream(data)
+            sentences = NAFReader(stream, layers=layers).sentences()
+            next(sentences)
+            self.assertLess(stream.read_bytes, limit)
+            self.assertGreater(len(list(sentences)), 100)
+
+    def test_stream_with_reordered_layers(self):
+        document = build(generate(3000))
+        expected = [summary(sentence, NAFDocument)
+                    for sentence in document.iter_sentences()]
+        # The dependencies after the entities
+        document.root.remove(document.dependencies)
+        document.entities.addnext(document.dependencies)
+        data = document.to_string()
+        self.assertLess(data.index(b"<entities>"), data.index(b"<deps>"))
+        stream = CountingStream(data)
+        sentences = NAFReader(stream).sentences()
+        first = next(sentences)
+        self.assertLess(stream.read_bytes, data.index(b"<coreferences>"))
+        self.assertEqual(
+            [summary(first, NAFDocument)] +
+            [summary(sentence, NAFDocument) for sentence in sentences],
+            expected)
+
+    def test_stream_layer_before_its_targets(self):
+        document = build(generate(300))
+        document.root.remove(document.dependencies)
+        document.terms.addprevious(document.dependencies)
+        reader = NAFReader(io.BytesIO(document.to_string()))
+        with self.assertRaises(ValueError):
+            list(reader.sentences())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+from __future__ import unicode_literals
+
+"""Tests of the serialization of documents built, parsed and streamed. """
+
+import io
+import unittest
+import warnings
+
+from pynaf import KAFDocument, NAFDocument
+from pynaf.stream import NAFWriter
+from generator import build, generate
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+def without_cdata(data):
+    """ Return a serialization with the raw text out of its CDATA section,
+    as a parsed document keeps it."""
+    return data.replace(b"<![CDATA[", b"").replace(b"]]>", b"")
+
+
+def write_stream(content, document_class):
+    """ Write the content given by generate with NAFWriter, in the order
+    of the generator build."""
+    output = io.BytesIO()
+    with NAFWriter(output, document_class, language="en") as writer:
+        writer.add_linguistic_processors(
+            "text", "pynaf-generator", "1.0", "2000-01-01T00:00:00Z",
+            "2000-01-01T00:00:00Z", "localhost")
+        writer.add_raw_text(content["raw"])
+        for form, wid, attributes in content["words"]:
+            writer.add_word(form, wid, **attributes)
+        for tid, term_type, lemma, pos, words in content["terms"]:
+            writer.add_term(tid, term_type=term_type, lemma=lemma, pos=pos,
+                            words=words)
+        for origen, to, rfunc in content["dependencies"]:
+            writer.add_dependency(origen, to, rfunc)
+        for cid, head, phrase, terms in content["chunks"]:
+            writer.add_chunk(cid, head, phrase, terms=terms)
+        for eid, entity_type, references in content["entities"]:
+            writer.add_entity(eid, entity_type, references)
+        for coid, references in content["coreferences"]:
+            writer.add_coreference(coid, references)
+        for non_terminals, terminals, edges in content["trees"]:
+            writer.add_constituency_tree(non_terminals, terminals, edges)
+    return output.getvalue()
+
+
+class SerializationTest(unittest.TestCase):
+
+    def test_to_string_leaves_the_tree(self):
+        document = build(generate(300))
+        compact = document.to_string(pretty_print=False)
+        pretty = document.to_string()
+        self.assertNotEqual(compact, pretty)
+        self.assertEqual(document.to_string(pretty_print=False), compact)
+        self.assertEqual(document.to_string(), pretty)
+
+    def test_parsed_document(self):
+        for document_class in (NAFDocument, KAFDocument):
+            data = build(generate(300), document_class).to_string()
+            parsed = document_class(input_stream=data)
+            # The indentation of the input is dropped and made again
+            self.assertEqual(parsed.to_string(), without_cdata(data))
+            again = document_class(input_stream=parsed.to_string())
+            self.assertEqual(again.to_string(), parsed.to_string())
+            output = io.BytesIO()
+            parsed.write(output, parsed.encoding)
+            self.assertEqual(output.getvalue(), parsed.to_string())
+
+    def test_writer_output(self):
+        for document_class in (NAFDocument, KAFDocument):
+            content = generate(300)
+            self.assertEqual(write_stream(content, document_class),
+                             build(content, document_class).to_string())
+
+    def test_indent_is_deprecated(self):
+        document = build(generate(50))
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            document._indent(document.root)
+        self.assertEqual([warning.category for warning in caught],
+                         [DeprecationWarning])
+
+
+if __name__ == "__main__":
+    unittest.main()
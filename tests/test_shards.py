@@ -0,0 +1,117 @@
+from __future__ import unicode_literals
+
+"""Tests of the split of documents in sentence shards and their merge. """
+
+import unittest
+from copy import deepcopy
+
+from lxml import etree
+
+from pynaf import KAFDocument, NAFDocument
+from pynaf.shards import SPLIT_CLUSTER_ATTRIBUTE, merge_shards, \
+    split_document
+from generator import build, generate
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+def clusters(document):
+    """ Return the term ids of the mentions of each coreference cluster."""
+    target_id = document.TARGET_ID_ATTRIBUTE
+    return [[[target.get(target_id)
+              for target in mention.iterchildren(document.TARGET_TAG)]
+             for mention in cluster.iterchildren(document.SPAN_TAG)]
+            for cluster in document.get_coreference()]
+
+
+def trees(document):
+    """ Return each constituency tree with its nodes numbered by position:
+    the labels of the non terminals, the term ids of the terminals and the
+    edges as pairs of node positions with their head mark."""
+    c = document
+    result = []
+    for tree in document.get_constituency_trees():
+        nodes = list(tree.iterchildren(
+            c.CONSTITUENCY_NON_TERMINALS, c.CONSTITUENCY_TERMINALS))
+        position = dict(
+            (node.get(c.CONSTITUENCY_ID_ATTRIBUTE), index)
+            for index, node in enumerate(nodes))
+        result.append((
+            [node.get("label") for node in nodes
+             if node.tag == c.CONSTITUENCY_NON_TERMINALS],
+            [[target.get(c.TARGET_ID_ATTRIBUTE)
+              for target in node.iter(c.TARGET_TAG)]
+             for node in nodes if node.tag == c.CONSTITUENCY_TERMINALS],
+            [(position[edge.get(c.CONSTITUENCY_EDGE_FORM_ATTRIBUTE)],
+              position[edge.get(c.CONSTITUENCY_EDGE_TO_ATTRIBUTE)],
+              edge.get(c.CHUNK_HEAD_ATTRIBUTE))
+             for edge in tree.iterchildren(c.CONSTITUENCY_EDGES)]))
+    return result
+
+
+def other_layers(document):
+    """ Return the serialization of a document without its coreference and
+    constituency layers, whose ids are renumbered by the merge."""
+    root = deepcopy(document.root)
+    for tag in (document.COREFERENCE_LAYER_TAG, document.CONSTITUENCY_LAYER):
+        for layer in root.findall(tag):
+            root.remove(layer)
+    return etree.tostring(root)
+
+
+class ShardsTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        for document_class in (NAFDocument, KAFDocument):
+            document = build(generate(2000), document_class)
+            shards = split_document(document, 7)
+            self.assertGreater(len(shards), 10)
+            merged = merge_shards(shards)
+            self.assertEqual(merged.get_raw_text(), document.get_raw_text())
+            # Header, words, terms, dependencies, chunks and entities
+            self.assertEqual(other_layers(merged), other_layers(document))
+            self.assertEqual(trees(merged), trees(document))
+            self.assertEqual(clusters(merged), clusters(document))
+            for cluster in merged.get_coreference():
+                self.assertIsNone(cluster.get(SPLIT_CLUSTER_ATTRIBUTE))
+            self.assertEqual(merged.check_integrity(), [])
+
+    def test_cut_clusters_are_marked(self):
+        document = build(generate(2000))
+        marked = [
+            cluster.get(SPLIT_CLUSTER_ATTRIBUTE)
+            for shard in split_document(document, 7)
+            for cluster in shard.get_coreference()]
+        cut = set(coid for coid in marked if coid is not None)
+        self.assertTrue(cut)
+        for cluster in document.get_coreference():
+            coid = cluster.get(document.COREFERENCE_ID_ATTRIBUTE)
+            self.assertEqual(coid in cut, marked.count(coid) > 1)
+
+    def test_annotated_shards(self):
+        document = build(generate(500))
+        shards = split_document(document, 5)
+        for shard in shards:
+            # Every shard gives the same new ids
+            first = shard.get_terms()[0].get(shard.TERM_ID_ATTRIBUTE)
+            shard.add_entity("new1", "MISC", [[first]])
+            shard.add_coreference("new1", [[first]])
+        merged = merge_shards(shards)
+        self.assertEqual(merged.check_integrity(), [])
+        self.assertEqual(
+            len(merged.find_entities("MISC")), len(shards))
+        self.assertEqual(len(merged.get_coreference()),
+                         len(document.get_coreference()) + len(shards))
+
+    def test_words_without_sentences(self):
+        document = NAFDocument()
+        document.add_raw_text("a b")
+        document.add_word("a", "w1", offset="0", length="1")
+        document.add_word("b", "w2", offset="2", length="1")
+        shards = split_document(document, 1)
+        self.assertEqual(len(shards), 1)
+        self.assertEqual(merge_shards(shards).get_raw_text(), "a b")
+
+
+if __name__ == "__main__":
+    unittest.main()
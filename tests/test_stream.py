@@ -0,0 +1,193 @@
+from __future__ import unicode_literals
+
+"""Tests of the streaming reader and writer of pynaf.stream. """
+
+import io
+import unittest
+
+from lxml import etree
+
+from pynaf import KAFDocument, NAFDocument
+from pynaf.stream import NAFReader, NAFWriter
+from generator import build, generate
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+
+def compact(element):
+    """ Return the serialization of an element without its tail."""
+    return etree.tostring(element, with_tail=False)
+
+
+class FreeingReader(NAFReader):
+    """ A reader that records the tags of the elements it releases."""
+
+    def __init__(self, *args, **kwargs):
+        NAFReader.__init__(self, *args, **kwargs)
+        self.freed = []
+
+    def _free(self, element):
+        self.freed.append(element.tag)
+        NAFReader._free(element)
+
+
+def canonical(data):
+    """ Return the canonical form of a serialized document."""
+    return etree.tostring(etree.fromstring(data), method="c14n")
+
+
+class ReaderTest(unittest.TestCase):
+
+    def test_elements(self):
+        for document_class in (NAFDocument, KAFDocument):
+            document = build(generate(500), document_class)
+            data = document.to_string()
+            # Parsed keeping the whitespace, as the reader does
+            root = etree.fromstring(data)
+            reader = NAFReader(io.BytesIO(data), document_class)
+            expected = [
+                (layer, compact(element))
+                for layer in reader.layers
+                for element in root.find(layer).iterchildren(
+                    reader.occurrences[layer])]
+            read = [(layer, compact(element)) for layer, element in reader]
+            self.assertEqual(len(read), len(expected))
+            self.assertEqual(read, expected)
+            self.assertEqual(
+                compact(reader.header),
+                compact(root.find(document_class.KAF_HEADER_TAG)))
+            self.assertEqual(reader.language, "en")
+            self.assertEqual(reader.version, "2.0")
+
+    def test_layers(self):
+        document = build(generate(300))
+        reader = NAFReader(io.BytesIO(document.to_string()),
+                           layers=(NAFDocument.TEXT_LAYER_TAG,
+                                   NAFDocument.CHUNKS_LAYER_TAG))
+        self.assertIsNotNone(reader.read_header())
+        wid = document.WORD_ID_ATTRIBUTE
+        cid = document.CHUNK_ID_ATTRIBUTE
+        words = [word.get(wid) for word in reader.words()]
+        # A layer the reader was not asked for gives nothing
+        self.assertEqual(list(reader.terms()), [])
+        chunks = [chunk.get(cid) for chunk in reader.chunks()]
+        self.assertEqual(words, [word.get(wid)
+                                 for word in document.get_words()])
+        self.assertEqual(chunks, [chunk.get(cid)
+                                  for chunk in document.get_chunks()])
+
+    def test_consecutive_layers(self):
+        document = build(generate(300))
+        reader = NAFReader(io.BytesIO(document.to_string()))
+        self.assertEqual(len(list(reader.words())),
+                         len(document.get_words()))
+        self.assertEqual(len(list(reader.terms())),
+                         len(document.get_terms()))
+        self.assertEqual(len(list(reader.entities())),
+                         len(document.get_entities()))
+        self.assertEqual(len(list(reader.coreferences())),
+                         len(document.get_coreference()))
+
+    def test_consumed_elements_are_released(self):
+        document = build(generate(300))
+        reader = NAFReader(io.BytesIO(document.to_string()))
+        consumed = []
+        for word in reader.words():
+            if consumed:
+                # The previous word is cleared and the ones before it are
+                # detached
+                self.assertEqual(len(consumed[-1].attrib), 0)
+                self.assertIsNone(consumed[-1].text)
+                self.assertIs(word.getprevious(), consumed[-1])
+                self.assertIsNone(consumed[-1].getprevious())
+            if len(consumed) > 1:
+                self.assertIsNone(consumed[-2].getparent())
+            consumed.append(word)
+        self.assertEqual(len(consumed), len(document.get_words()))
+
+    def test_layers_not_read_are_released(self):
+        document = build(generate(300))
+        data = document.to_string()
+        reader = FreeingReader(io.BytesIO(data),
+                               layers=(NAFDocument.COREFERENCE_LAYER_TAG,))
+        self.assertEqual(len(list(reader)),
+                         len(document.get_coreference()))
+        root = etree.fromstring(data)
+        # Every child of the layers up to the coreferences, but the header
+        layers = list(root)
+        layers = layers[1:layers.index(
+            root.find(NAFDocument.COREFERENCE_LAYER_TAG)) + 1]
+        self.assertEqual(reader.freed, [
+            element.tag for layer in layers
+            for element in layer.iterchildren(etree.Element)])
+        self.assertEqual(len(reader.header), len(document.kaf_header))
+
+    def test_stops_after_the_last_layer(self):
+        data = build(generate(5000)).to_string()
+        stream = io.BytesIO(data)
+        reader = NAFReader(stream, layers=(NAFDocument.TEXT_LAYER_TAG,))
+        self.assertTrue(list(reader.words()))
+        self.assertLess(stream.tell(), len(data) // 2)
+
+
+class WriterTest(unittest.TestCase):
+
+    def test_empty_document(self):
+        for document_class in (NAFDocument, KAFDocument):
+            output = io.BytesIO()
+            with NAFWriter(output, document_class, language="en"):
+                pass
+            self.assertEqual(output.getvalue(),
+                             document_class(language="en").to_string())
+
+    def test_encoding(self):
+        words = ["caf\xe9", "ni\xf1o", "&", "<a>"]
+        document = NAFDocument(language="es", encoding="ISO-8859-1")
+        output = io.BytesIO()
+        with NAFWriter(output, language="es",
+                       encoding="ISO-8859-1") as writer:
+            for target in (document, writer):
+                for index, word in enumerate(words):
+                    target.add_word(word, "w{0}".format(index), sent="1")
+                for index, word in enumerate(words):
+                    target.add_term("t{0}".format(index), lemma=word,
+                                    words=["w{0}".format(index)])
+        expected = io.BytesIO()
+        document.write(expected, "ISO-8859-1")
+        self.assertTrue(output.getvalue().startswith(b"<?xml"))
+        self.assertEqual(canonical(output.getvalue()),
+                         canonical(expected.getvalue()))
+        if etree.LIBXML_VERSION >= (2, 14):
+            # Older versions escape the non ASCII characters of attributes
+            self.assertEqual(output.getvalue(), expected.getvalue())
+
+    def test_layers_in_call_order(self):
+        output = io.BytesIO()
+        with NAFWriter(output) as writer:
+            writer.add_word("a", "w1")
+            writer.add_term("t1", words=["w1"])
+            writer.add_entity("e1", "MISC", [["t1"]])
+            writer.add_term("t2", words=["w1"])
+        root = etree.fromstring(output.getvalue())
+        self.assertEqual(
+            [layer.tag for layer in root],
+            ["nafHeader", "raw", "text", "terms", "entities", "terms"])
+
+    def test_header_written(self):
+        output = io.BytesIO()
+        writer = NAFWriter(output)
+        writer.add_linguistic_processors(
+            "text", "tokenizer", "1.0", "2000-01-01T00:00:00Z",
+            "2000-01-01T00:00:00Z", "localhost")
+        writer.add_word("a", "w1")
+        with self.assertRaises(Exception):
+            writer.add_linguistic_processors(
+                "terms", "tagger", "1.0", "2000-01-01T00:00:00Z",
+                "2000-01-01T00:00:00Z", "localhost")
+        writer.close()
+        document = NAFDocument(input_stream=output.getvalue())
+        self.assertEqual(len(document.kaf_header), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
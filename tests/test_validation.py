@@ -0,0 +1,85 @@
+from __future__ import unicode_literals
+
+"""Tests of the validation of documents against compiled schemas. """
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from pynaf import NAFDocument
+from pynaf.validation import validate, validate_documents
+
+__author__ = 'Rodrigo Agerri <rodrigo.agerri@ehu.es>'
+
+DTD = """<!ELEMENT NAF (nafHeader, raw, text)>
+<!ATTLIST NAF xml:lang CDATA #IMPLIED version CDATA #IMPLIED>
+<!ELEMENT nafHeader EMPTY>
+<!ELEMENT raw EMPTY>
+<!ELEMENT text (wf*)>
+<!ELEMENT wf (#PCDATA)>
+<!ATTLIST wf id ID #REQUIRED>
+"""
+
+
+class ValidationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dtd = os.path.join(self.directory, "naf.dtd")
+        with open(self.dtd, "w") as output:
+            output.write(DTD)
+        self.document = NAFDocument(language="en")
+        self.document.add_word("a", "w1")
+        self.valid = self.write("valid.naf")
+        self.document.add_word("b", "w2", sent="1")
+        self.invalid = self.write("invalid.naf")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name):
+        path = os.path.join(self.directory, name)
+        with open(path, "wb") as output:
+            output.write(self.document.to_string())
+        return path
+
+    def test_validate(self):
+        self.assertTrue(validate(self.valid, self.dtd).valid)
+        result = validate(self.invalid, self.dtd)
+        self.assertFalse(result.valid)
+        self.assertEqual(len(result.errors), 1)
+        self.assertFalse(validate(self.document, self.dtd).valid)
+        missing = validate(os.path.join(self.directory, "missing.naf"),
+                           self.dtd)
+        self.assertFalse(missing.valid)
+
+    def test_validate_documents(self):
+        paths = [self.valid, self.invalid] * 10
+        for threads in (1, 3):
+            results = list(validate_documents(paths, self.dtd,
+                                              threads=threads))
+            self.assertEqual([result.source for result in results], paths)
+            self.assertEqual([result.valid for result in results],
+                             [True, False] * 10)
+
+    def test_validate_documents_ahead(self):
+        read = []
+
+        def paths():
+            for _ in range(50):
+                read.append(None)
+                yield self.valid
+
+        results = validate_documents(paths(), self.dtd, threads=2,
+                                     max_pending=3)
+        next(results)
+        time.sleep(0.2)
+        # The validations wait for the consumer instead of reading ahead
+        self.assertLessEqual(len(read), 4)
+        self.assertEqual(len(list(results)), 49)
+
+
+if __name__ == "__main__":
+    unittest.main()